@@ -4,8 +4,9 @@ set -e
 
 download_models=false
 rebuild_model=true
+model_targets=()
 
-while getopts ":ds" opt; do
+while getopts ":dsf" opt; do
   case $opt in
     d)
       download_models=true
@@ -13,6 +14,10 @@ while getopts ":ds" opt; do
     s)
       rebuild_model=false
       ;;
+    f)
+      # URDF, the meshes the viewer loads with meshes.json and mesh-report.txt, no print resolution meshes or STEP
+      model_targets=("robot.urdf" "mesh-report.txt")
+      ;;
     \?)
       echo "Invalid option: -$OPTARG" >&2
       ;;
@@ -52,7 +57,16 @@ if [ "$rebuild_model" = true ] ; then
   cp -r web dist
   cp cad/XM430-W350-T.stp dist
 
-  (cd cad && freecad -c parts.py "../dist")
+  # A running build daemon (cad/daemon.py) saves the FreeCAD startup
+  status=0
+  python3 cad/client.py dist "${model_targets[@]}" || status=$?
+  if [ "$status" -eq 3 ]; then
+    (cd cad && freecad -c parts.py "../dist" "${model_targets[@]}")
+  elif [ "$status" -ne 0 ]; then
+    exit "$status"
+  fi
+  # Pre-compressed copies and manifest for the HTTP server
+  python3 cad/compress.py dist
 else
   echo "Skipping URDF building"
 fi
@@ -0,0 +1,56 @@
+from copy import deepcopy
+from mesh import Mesh, concatenate, cylinder, read_stl, transformed, write_stl
+from transform import origin_matrix
+import os
+import xml.etree.ElementTree as ET
+
+
+def visual_mesh(visual: ET.Element, dir: str, meshes: dict[str, Mesh]) -> Mesh:
+    """Geometry of a <visual> in link coordinates, loaded meshes are kept in meshes by file name."""
+    geometry = visual.find("geometry")[0]
+    if geometry.tag == "mesh":
+        filename = geometry.get("filename")
+        if filename not in meshes:
+            meshes[filename] = read_stl(f"{dir}/{filename}")
+        mesh = meshes[filename]
+    elif geometry.tag == "cylinder":
+        mesh = cylinder(float(geometry.get("radius")), float(geometry.get("length")))
+    else:
+        raise ValueError(f"Can't bake <{geometry.tag}> geometry")
+    return transformed(mesh, origin_matrix(visual.find("origin")))
+
+
+def material_key(visual: ET.Element) -> str:
+    """Named material or inline colour of a visual."""
+    material = visual.find("material")
+    color = material.find("color")
+    return material.get("name") if color is None else color.get("rgba")
+
+
+def bake_links(root: ET.Element, dir: str, prefix: str = "baked") -> ET.Element:
+    """
+    Copy of the robot where all visuals of each link sharing a material are
+    merged into a single pre-transformed mesh written to dir/prefix.
+    """
+    root = deepcopy(root)
+    meshes: dict[str, Mesh] = {}
+    os.makedirs(f"{dir}/{prefix}", exist_ok=True)
+    for link in root.iter("link"):
+        groups: dict[str, list[ET.Element]] = {}
+        for visual in link.findall("visual"):
+            groups.setdefault(material_key(visual), []).append(visual)
+            link.remove(visual)
+        colors = 0
+        for visuals in groups.values():
+            material = visuals[0].find("material")
+            name = material.get("name")
+            if not name:
+                name = f"color{colors}"
+                colors += 1
+            filename = f"{prefix}/{link.get('name')}-{name}.stl"
+            write_stl(f"{dir}/{filename}", concatenate([visual_mesh(visual, dir, meshes) for visual in visuals]))
+            visual = ET.SubElement(link, "visual")
+            ET.SubElement(visual, "origin", {"xyz": "0 0 0", "rpy": "0 0 0"})
+            ET.SubElement(ET.SubElement(visual, "geometry"), "mesh", {"filename": filename})
+            visual.append(material)
+    return root
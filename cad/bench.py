@@ -0,0 +1,168 @@
+"""
+Benchmarks of part builders, part exports, URDF generation, kinematics and
+inverse kinematics:
+
+    freecad -c bench.py results.json [baseline.json]
+
+Every benchmark runs KIAUKUTAS_BENCH_REPEAT times (default 5) and records
+median and 95th percentile wall time, exports also triangle counts and file
+sizes. Results are written as JSON. With a baseline, benchmarks whose median
+got slower by more than KIAUKUTAS_BENCH_THRESHOLD (default 0.2, i.e. 20%)
+are reported and the exit status is 1. Run with plain python only the URDF
+and kinematics stages are measured. Inverse kinematics uses the joint limits
+of the built robot.urdf (see ik.py) and is skipped without one.
+"""
+from argparse import ArgumentParser
+from math import ceil
+from statistics import median
+from tempfile import TemporaryDirectory
+from typing import Callable, Optional
+import json
+import numpy as np
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from ik import URDF, Solver  # noqa: E402
+from kinematics import Chain  # noqa: E402
+from mesh import read_stl  # noqa: E402
+from targets import script_args  # noqa: E402
+from urdf import make_urdf  # noqa: E402
+
+try:
+    import csg
+    import parts
+except ImportError:
+    parts = None
+
+REPEAT = int(os.environ.get("KIAUKUTAS_BENCH_REPEAT", 5))
+THRESHOLD = float(os.environ.get("KIAUKUTAS_BENCH_THRESHOLD", 0.2))
+# Changes below this many seconds are noise
+MIN_DIFFERENCE = 0.005
+# Joint configurations per kinematics benchmark
+CONFIGURATIONS = 100000
+# Tool poses per inverse kinematics benchmark
+TARGETS = 1000
+
+
+def measure(function: Callable, repeat: int = REPEAT) -> tuple[dict, object]:
+    """Timing statistics in seconds of calling function repeatedly and its last result."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    stats = {
+        "median": median(times),
+        "p95": times[ceil(0.95 * len(times)) - 1],
+        "min": times[0],
+        "runs": len(times),
+    }
+    return stats, result
+
+
+def bench_parts(dir: str, results: dict) -> None:
+    for name, (builder, *args) in parts.PARTS.items():
+        def build():
+            csg.clear()
+            return csg.evaluate(builder(*args))
+
+        results[f"build/{name}"], shape = measure(build)
+        for lod in parts.LODS:
+            path = f"{dir}/{parts.mesh_file(name, lod)}"
+            results[f"export/{name}/stl-{lod}"], _ = measure(lambda: parts.export_stl(shape, path, lod))
+            results[f"export/{name}/stl-{lod}"]["bytes"] = os.path.getsize(path)
+            results[f"export/{name}/stl-{lod}"]["triangles"] = len(read_stl(path).triangles)
+        path = f"{dir}/{name}.stp"
+        results[f"export/{name}/step"], _ = measure(lambda: shape.exportStep(path))
+        results[f"export/{name}/step"]["bytes"] = os.path.getsize(path)
+
+
+def bench_urdf(results: dict) -> None:
+    results["urdf/make"], root = measure(make_urdf)
+    results["urdf/serialize"], data = measure(lambda: ET.tostring(root))
+    results["urdf/serialize"]["bytes"] = len(data)
+
+
+def bench_kinematics(results: dict) -> None:
+    chain = Chain()
+    angles = np.random.default_rng(0).uniform(-np.pi / 2, np.pi / 2, (CONFIGURATIONS, len(chain.names)))
+    results["kinematics/forward"], _ = measure(lambda: chain.forward(angles))
+    results["kinematics/jacobian"], _ = measure(lambda: chain.jacobian(angles))
+    for name in ["kinematics/forward", "kinematics/jacobian"]:
+        results[name]["per_second"] = CONFIGURATIONS / results[name]["median"]
+
+
+def bench_ik(results: dict) -> None:
+    chain = Chain()
+    solver = Solver(chain)
+    rng = np.random.default_rng(0)
+    angles = rng.uniform(solver.lower, solver.upper, (TARGETS, len(chain.names)))
+    targets = chain.forward(angles)
+    nearby = chain.forward(np.clip(angles + rng.normal(scale=0.005, size=angles.shape), solver.lower, solver.upper))
+
+    def cold():
+        solver.cache.clear()
+        return solver.solve(targets)
+
+    results["ik/cold"], (_, converged) = measure(cold)
+    results["ik/cold"]["converged"] = float(converged.mean())
+    results["ik/warm"], (_, converged) = measure(lambda: solver.solve(nearby))
+    results["ik/warm"]["converged"] = float(converged.mean())
+    for name in ["ik/cold", "ik/warm"]:
+        results[name]["per_target"] = results[name]["median"] / TARGETS
+
+
+def compare(results: dict, baseline: dict, threshold: float = THRESHOLD) -> list[str]:
+    """Print results next to the baseline and return names of regressed benchmarks."""
+    regressions = []
+    print(f"{'benchmark':48} {'median ms':>10} {'p95 ms':>10} {'baseline':>10} {'change':>8}")
+    for name, stats in results.items():
+        line = f"{name:48} {stats['median'] * 1000:10.1f} {stats['p95'] * 1000:10.1f}"
+        if name in baseline:
+            before = baseline[name]["median"]
+            change = stats["median"] / before - 1 if before > 0 else 0
+            line += f" {before * 1000:10.1f} {change:+8.0%}"
+            if change > threshold and stats["median"] - before > MIN_DIFFERENCE:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+    return regressions
+
+
+def main(args: list[str]) -> int:
+    parser = ArgumentParser(
+        prog="bench.py",
+        description="Benchmark part builds, exports, URDF generation and (inverse) kinematics.",
+    )
+    parser.add_argument("results", help="JSON file to write")
+    parser.add_argument("baseline", nargs="?", help="JSON results of an earlier run to compare with")
+    args = parser.parse_args(args)
+    results: dict[str, dict] = {}
+    with TemporaryDirectory() as dir:
+        if parts is not None:
+            bench_parts(dir, results)
+    bench_urdf(results)
+    bench_kinematics(results)
+    if os.path.exists(URDF):
+        bench_ik(results)
+    else:
+        print(f"No {URDF}, skipping inverse kinematics")
+    toolchain: Optional[str] = parts.TOOLCHAIN if parts is not None else None
+    with open(args.results, "w") as f:
+        json.dump({"toolchain": toolchain, "repeat": REPEAT, "benchmarks": results}, f, indent=2)
+    baseline = {}
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["benchmarks"]
+    regressions = compare(results, baseline)
+    if regressions:
+        print(f"{len(regressions)} benchmarks slower than baseline by more than {THRESHOLD:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    exit(main(script_args()))
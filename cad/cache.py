@@ -0,0 +1,80 @@
+from hashlib import sha256
+from inspect import getsource
+from types import CodeType, FunctionType
+from typing import Callable
+import os
+import shutil
+
+CACHE_DIR = os.environ.get(
+    "KIAUKUTAS_CACHE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"),
+)
+
+
+def _names(code: CodeType) -> set[str]:
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            names |= _names(const)
+    return names
+
+
+def _hash_function(function: FunctionType, digest, seen: set[str]) -> None:
+    if function.__qualname__ in seen:
+        return
+    seen.add(function.__qualname__)
+    digest.update(getsource(function).encode())
+    digest.update(repr(function.__defaults__).encode())
+    for name in sorted(_names(function.__code__)):
+        if name not in function.__globals__:
+            continue
+        value = function.__globals__[name]
+        if isinstance(value, FunctionType) and value.__module__ == function.__module__:
+            _hash_function(value, digest, seen)
+        elif name.isupper():
+            digest.update(f"{name}={value!r}".encode())
+
+
+def fingerprint(builder: Callable, *args, salt: str = "") -> str:
+    """
+    Hash of the builder source, the source of module functions it calls, the
+    module level constants they read, the builder arguments and the salt.
+    """
+    digest = sha256(salt.encode())
+    _hash_function(builder, digest, set())
+    digest.update(repr(args).encode())
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """Persistent directory of build artifacts keyed by fingerprint."""
+
+    def __init__(self, directory: str = CACHE_DIR):
+        self.directory = directory
+
+    def contains(self, key: str, names: list[str]) -> bool:
+        """Whether files of all names are cached under key."""
+        return all(os.path.isfile(os.path.join(self.directory, key, name)) for name in names)
+
+    def restore(self, key: str, files: dict[str, str]) -> bool:
+        """Copy cached files (name -> destination path), return False on a miss."""
+        entry = os.path.join(self.directory, key)
+        if not self.contains(key, list(files)):
+            return False
+        for name, path in files.items():
+            shutil.copyfile(os.path.join(entry, name), path)
+        return True
+
+    def store(self, key: str, files: dict[str, str]) -> None:
+        """Copy built files (name -> source path) into the cache."""
+        entry = os.path.join(self.directory, key)
+        staging = f"{entry}.{os.getpid()}.tmp"
+        os.makedirs(staging, exist_ok=True)
+        for name, path in files.items():
+            shutil.copyfile(path, os.path.join(staging, name))
+        try:
+            os.replace(staging, entry)
+        except OSError:  # Entry already exists, merge into it
+            for name in os.listdir(staging):
+                os.replace(os.path.join(staging, name), os.path.join(entry, name))
+            os.rmdir(staging)
@@ -0,0 +1,84 @@
+"""
+Client of the build daemon, runs without FreeCAD:
+
+    python3 cad/client.py dist robot.urdf 'winch.*' --set PULLEY_RADIUS=5
+
+Exits with status 3 when no daemon is listening, so callers can fall back to
+"freecad -c parts.py". The socket path is taken from KIAUKUTAS_DAEMON
+environment variable, by default daemon.sock in the artifact cache.
+"""
+from argparse import ArgumentParser
+from typing import Any
+import ast
+import json
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cache import CACHE_DIR  # noqa: E402
+
+SOCKET = os.environ.get("KIAUKUTAS_DAEMON", os.path.join(CACHE_DIR, "daemon.sock"))
+# Exit status when no daemon is listening
+NOT_RUNNING = 3
+
+
+def request(dir: str, targets: list[str], overrides: dict[str, Any], path: str = SOCKET) -> dict:
+    """
+    Reply of the daemon to a build request, {"seconds": build time} or
+    {"error": message}. Raises OSError when no daemon is listening.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        message = {"dir": os.path.abspath(dir), "targets": targets, "overrides": overrides}
+        connection.sendall(json.dumps(message).encode() + b"\n")
+        connection.shutdown(socket.SHUT_WR)
+        reply = b""
+        while chunk := connection.recv(65536):
+            reply += chunk
+    return json.loads(reply)
+
+
+def parse_override(text: str) -> tuple[str, Any]:
+    """Constant name and Python literal value of NAME=VALUE."""
+    name, _, value = text.partition("=")
+    try:
+        return name, ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        raise ValueError(f"Invalid value of {name}: {value}")
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(prog="client.py", description="Build robot parts and URDF with the running build daemon.")
+    parser.add_argument("dir", help="output directory")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        default=["*"],
+        help="target names or glob patterns, e.g. robot.urdf '*.stl' (default: everything)",
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="override a constant of layout.py for this build",
+    )
+    args = parser.parse_args(args)
+    try:
+        overrides = dict(parse_override(text) for text in args.set)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        reply = request(args.dir, args.targets, overrides)
+    except OSError as e:
+        print(f"No build daemon at {SOCKET}: {e.strerror}", file=sys.stderr)
+        exit(NOT_RUNNING)
+    if "error" in reply:
+        print(reply["error"], file=sys.stderr, end="")
+        exit(1)
+    print(f"Built in {reply['seconds']:.1f} s by the daemon")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
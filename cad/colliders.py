@@ -0,0 +1,190 @@
+"""
+Simplified collision geometry of parts for <collision> elements of the URDF.
+A part is either a capsule, written as a cylinder and two spheres since URDF
+has no capsule, or a fixed number of convex hulls with a bounded number of
+vertices each. Physics engines test contacts of these far faster than of the
+triangles of the visual meshes.
+
+The convex decomposition starts from the hull of the whole mesh and splits
+the triangles of the part whose hull lies deepest below its surface in two
+halves across a principal axis, until the requested number of parts is
+reached.
+"""
+from dataclasses import dataclass
+from typing import Union
+from mesh import Mesh
+from transform import axis_frame, matrix_rpy, origin_matrix
+import numpy as np
+import os
+import xml.etree.ElementTree as ET
+
+HULL_VERTICES = 32
+
+
+@dataclass
+class Capsule:
+    """Points within radius of a line segment."""
+
+    start: np.ndarray
+    """First end of the segment, shape (3,)."""
+
+    end: np.ndarray
+    """Second end of the segment, shape (3,)."""
+
+    radius: float
+
+
+def directions(count: int) -> np.ndarray:
+    """Unit vectors spread evenly over the sphere on a Fibonacci spiral, shape (count, 3)."""
+    i = np.arange(count) + 0.5
+    z = 1 - 2 * i / count
+    angle = np.pi * (3 - np.sqrt(5)) * i
+    r = np.sqrt(1 - z * z)
+    return np.column_stack([r * np.cos(angle), r * np.sin(angle), z])
+
+
+def convex_hull(points: np.ndarray, max_vertices: int = HULL_VERTICES) -> Mesh:
+    """
+    Convex hull of points, of the extreme points in max_vertices directions,
+    so it lies within the exact hull. Raises ValueError for flat point sets.
+    """
+    points = np.unique(points[np.argmax(points @ directions(max_vertices).T, axis=0)], axis=0)
+    scale = np.abs(points).max() + np.ptp(points, axis=0).max()
+    epsilon = 1e-9 * scale
+
+    def normal(face: tuple[int, int, int]) -> tuple[np.ndarray, float]:
+        a, b, c = points[list(face)]
+        n = np.cross(b - a, c - a)
+        n /= np.linalg.norm(n)
+        return n, n @ a
+
+    def distance(face: tuple[int, int, int], point: np.ndarray) -> float:
+        n, offset = normal(face)
+        return n @ point - offset
+
+    # Initial tetrahedron of far apart points
+    a = int(np.argmin(points[:, 0]))
+    b = int(np.argmax(np.linalg.norm(points - points[a], axis=1)))
+    line = (points[b] - points[a]) / np.linalg.norm(points[b] - points[a])
+    offsets = points - points[a]
+    c = int(np.argmax(np.linalg.norm(offsets - np.outer(offsets @ line, line), axis=1)))
+    n = np.cross(points[b] - points[a], points[c] - points[a])
+    if np.linalg.norm(n) < epsilon * scale:
+        raise ValueError("Points are collinear")
+    heights = offsets @ (n / np.linalg.norm(n))
+    d = int(np.argmax(np.abs(heights)))
+    if abs(heights[d]) < epsilon:
+        raise ValueError("Points are coplanar")
+    if heights[d] > 0:
+        b, c = c, b
+    faces = [(a, b, c), (a, c, d), (a, d, b), (b, d, c)]
+    for p in range(len(points)):
+        visible = [face for face in faces if distance(face, points[p]) > epsilon]
+        if not visible:
+            continue
+        edges = {(face[i], face[(i + 1) % 3]) for face in visible for i in range(3)}
+        horizon = [(u, v) for u, v in edges if (v, u) not in edges]
+        faces = [face for face in faces if face not in visible] + [(u, v, p) for u, v in horizon]
+    used, triangles = np.unique(np.array(faces), return_inverse=True)
+    return Mesh(points[used], triangles.reshape(-1, 3))
+
+
+def depth(points: np.ndarray, hull: Mesh) -> float:
+    """Largest distance of points inside a hull to its surface."""
+    normals = hull.normals()
+    signed = points @ normals.T - np.einsum("ij,ij->i", normals, hull.corners()[:, 0])
+    return max(0.0, float(-signed.max(axis=1).min()))
+
+
+def _part(corners: np.ndarray, max_vertices: int) -> tuple[Mesh, float]:
+    """Hull of triangles given by corners and its depth below them."""
+    points = np.concatenate([corners.reshape(-1, 3), corners.mean(axis=1)])
+    hull = convex_hull(points, max_vertices)
+    return hull, depth(points, hull)
+
+
+def _split(corners: np.ndarray, max_vertices: int):
+    """Best halves of triangles across one of their principal axes with hulls and depths, None if all are flat."""
+    centroids = corners.mean(axis=1)
+    _, axes = np.linalg.eigh(np.cov(centroids.T))
+    best = None
+    for axis in axes.T[::-1]:
+        along = centroids @ axis
+        below = along < np.median(along)
+        if below.all() or not below.any():
+            continue
+        try:
+            halves = [(mask, *_part(corners[mask], max_vertices)) for mask in (below, ~below)]
+        except ValueError:
+            continue
+        if best is None or max(h[2] for h in halves) < max(h[2] for h in best):
+            best = halves
+    return best
+
+
+def decompose(mesh: Mesh, count: int, max_vertices: int = HULL_VERTICES) -> list[Mesh]:
+    """Approximate convex decomposition of a mesh into count hulls."""
+    corners = mesh.corners()
+    parts = [(np.arange(len(corners)), *_part(corners, max_vertices))]
+    while len(parts) < count:
+        for i in sorted(range(len(parts)), key=lambda i: (-parts[i][2], -len(parts[i][0]))):
+            halves = _split(corners[parts[i][0]], max_vertices)
+            if halves is not None:
+                triangles = parts.pop(i)[0]
+                parts += [(triangles[mask], hull, part_depth) for mask, hull, part_depth in halves]
+                break
+        else:
+            raise ValueError(f"Can't split mesh into {count} convex parts")
+    return [hull for _, hull, _ in parts]
+
+
+def fit_capsule(mesh: Mesh) -> Capsule:
+    """Capsule along the principal axis of a mesh enclosing its vertices radially and its length."""
+    center = mesh.vertices.mean(axis=0)
+    offsets = mesh.vertices - center
+    axis = np.linalg.eigh(np.cov(offsets.T))[1][:, -1]
+    along = offsets @ axis
+    radius = float(np.linalg.norm(offsets - np.outer(along, axis), axis=1).max())
+    low, high = along.min() + radius, along.max() - radius
+    if low > high:
+        low = high = (low + high) / 2
+    return Capsule(center + low * axis, center + high * axis, radius)
+
+
+def _add_collision(link: ET.Element, matrix: np.ndarray, tag: str, attributes: dict[str, str]) -> None:
+    collision = ET.SubElement(link, "collision")
+    ET.SubElement(collision, "origin", {
+        "xyz": " ".join(str(x) for x in matrix[:3, 3]),
+        "rpy": " ".join(str(x) for x in matrix_rpy(matrix[:3, :3])),
+    })
+    ET.SubElement(ET.SubElement(collision, "geometry"), tag, attributes)
+
+
+def add_collisions(root: ET.Element, colliders: dict[str, list[Union[Capsule, str]]]) -> ET.Element:
+    """
+    Add <collision> elements for every visual placing a part with colliders,
+    keyed by part name, capsules or file names of convex hull meshes.
+    """
+    for link in root.iter("link"):
+        for visual in link.findall("visual"):
+            mesh = visual.find("geometry/mesh")
+            if mesh is None:
+                continue
+            placement = origin_matrix(visual.find("origin"))
+            for collider in colliders.get(os.path.basename(mesh.get("filename")).split(".")[0], []):
+                if isinstance(collider, str):
+                    _add_collision(link, placement, "mesh", {"filename": collider})
+                    continue
+                axis = collider.end - collider.start
+                length = float(np.linalg.norm(axis))
+                frame = np.eye(4)
+                if length > 0:
+                    frame[:3, :3] = axis_frame(axis / length)
+                frame[:3, 3] = (collider.start + collider.end) / 2
+                radius = f"{collider.radius}"
+                _add_collision(link, placement @ frame, "cylinder", {"radius": radius, "length": f"{length}"})
+                for end in (collider.start, collider.end):
+                    frame = np.eye(4)
+                    frame[:3, 3] = end
+                    _add_collision(link, placement @ frame, "sphere", {"radius": radius})
+    return root
@@ -0,0 +1,486 @@
+"""
+Self-collision map of the arm. Link meshes are sampled into surface points
+with outward normals held in sphere trees. Every pair of links whose
+relative placement depends on at most MAX_JOINTS actuated joints is checked
+over a grid of those joints, which is then exact for any configuration of
+the others. Links closer than the clearance collide. Pairs already touching
+with all joints at zero, like meshing gears or shafts in their plates, are
+designed contacts: they collide where points of one link lie more than
+PENETRATION deeper inside the other than at rest, measured along the normal
+of the nearest sample. Joint limits are the collision free range around zero
+of pairs depending on a single joint.
+
+Map file format, all values little endian:
+
+    char[4]   magic "KCOL"
+    uint16    version (2)
+    uint16    joint count
+    uint16    pair count
+    uint16    reserved
+    uint32    size of link names
+    float32[joint count] lowest sampled angle of each joint
+    float32[joint count] highest sampled angle of each joint
+    uint16[joint count]  samples of each joint
+    char[]    link names separated by newlines, padded to a multiple of 4 bytes
+    per pair:
+        uint16    index of first link
+        uint16    index of second link
+        uint8     flags, 1 for pairs in contact at rest, colliding by penetration
+        uint8     count of joints moving the links relative to each other
+        uint8[6]  indices of those joints
+        bits of the row major grid over those joints, 1 for collision,
+        most significant bit first, padded to a multiple of 4 bytes
+"""
+from dataclasses import dataclass
+from itertools import combinations
+from math import radians
+from typing import Iterator, Optional
+import numpy as np
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bake import visual_mesh  # noqa: E402
+from kinematics import Chain, joint_limits  # noqa: E402
+from mesh import Mesh, concatenate  # noqa: E402
+from pool import JOBS, run_tasks  # noqa: E402
+
+MAGIC = b"KCOL"
+VERSION = 2
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("joint_count", "<u2"),
+    ("pair_count", "<u2"),
+    ("reserved", "<u2"),
+    ("names_size", "<u4"),
+])
+PAIR = np.dtype([
+    ("links", "<u2", 2),
+    ("flags", "u1"),
+    ("joint_count", "u1"),
+    ("joints", "u1", 6),
+])
+AT_REST = 1
+# Distance between surface samples and closest allowed distance between links in mm
+SPACING = 1.5
+CLEARANCE = 1.5
+# How much deeper than at rest links in contact at rest may interpenetrate in
+# mm, and farthest distance from the other link depths are measured at
+PENETRATION = 1.0
+MAX_DEPTH = 10.0
+STEP = radians(5)
+MAX_JOINTS = 2
+LEAF_SIZE = 16
+# Configurations checked together, bounds the size of the traversal frontier
+CHUNK = 64
+
+
+@dataclass
+class SphereTree:
+    """Bounding sphere hierarchy over points, node 0 is the root."""
+
+    centers: np.ndarray
+    """Sphere centers, shape (nodes, 3)."""
+
+    radii: np.ndarray
+    """Sphere radii, shape (nodes,)."""
+
+    children: np.ndarray
+    """Child nodes, shape (nodes, 2), -1 for leaves."""
+
+    leaves: np.ndarray
+    """Leaf index of each node, -1 for inner nodes."""
+
+    points: np.ndarray
+    """Points of each leaf padded with far away points, shape (leaves, LEAF_SIZE, 3)."""
+
+    normals: np.ndarray
+    """Outward unit normals of the points, zero for padding, shape (leaves, LEAF_SIZE, 3)."""
+
+
+def sample_surface(mesh: Mesh, spacing: float = SPACING) -> tuple[np.ndarray, np.ndarray]:
+    """Vertices and points spread over the triangles about spacing apart, and their outward unit normals."""
+    corners = mesh.corners()
+    cross = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    areas = np.linalg.norm(cross, axis=1) / 2
+    random = np.random.default_rng(0)
+    counts = np.floor(areas / spacing ** 2 + random.random(len(areas))).astype(int)
+    triangles = np.repeat(np.arange(len(corners)), counts)
+    u, v = random.random((2, len(triangles)))
+    flip = u + v > 1
+    u, v = np.where(flip, 1 - u, u), np.where(flip, 1 - v, v)
+    samples = corners[triangles]
+    points = samples[:, 0] + u[:, None] * (samples[:, 1] - samples[:, 0]) + v[:, None] * (samples[:, 2] - samples[:, 0])
+    # Vertices get the area weighted normal of their triangles
+    vertex_normals = np.zeros_like(mesh.vertices, dtype=float)
+    np.add.at(vertex_normals, mesh.triangles.ravel(), np.repeat(cross, 3, axis=0))
+    normals = np.concatenate([vertex_normals, mesh.normals()[triangles]])
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    return np.concatenate([mesh.vertices, points]), normals
+
+
+def sphere_tree(points: np.ndarray, normals: np.ndarray) -> SphereTree:
+    centers, radii, children, leaves, leaf_points, leaf_normals = [], [], [], [], [], []
+    stack = [(points, normals, -1, 0)]
+    while stack:
+        node_points, node_normals, parent, side = stack.pop()
+        node = len(centers)
+        if parent >= 0:
+            children[parent][side] = node
+        low, high = node_points.min(axis=0), node_points.max(axis=0)
+        center = (low + high) / 2
+        centers.append(center)
+        radii.append(np.linalg.norm(node_points - center, axis=1).max())
+        children.append([-1, -1])
+        if len(node_points) <= LEAF_SIZE:
+            leaves.append(len(leaf_points))
+            padded = np.full((LEAF_SIZE, 3), 1e9)
+            padded[:len(node_points)] = node_points
+            leaf_points.append(padded)
+            padded = np.zeros((LEAF_SIZE, 3))
+            padded[:len(node_normals)] = node_normals
+            leaf_normals.append(padded)
+            continue
+        leaves.append(-1)
+        axis = np.argmax(high - low)
+        order = np.argsort(node_points[:, axis], kind="stable")
+        half = len(order) // 2
+        stack.append((node_points[order[half:]], node_normals[order[half:]], node, 1))
+        stack.append((node_points[order[:half]], node_normals[order[:half]], node, 0))
+    return SphereTree(
+        np.array(centers),
+        np.array(radii),
+        np.array(children),
+        np.array(leaves),
+        np.array(leaf_points),
+        np.array(leaf_normals),
+    )
+
+
+def _leaf_pairs(
+        a: SphereTree,
+        b: SphereTree,
+        rotations: np.ndarray,
+        translations: np.ndarray,
+        distance: float,
+        done: np.ndarray,
+) -> Iterator[np.ndarray]:
+    """
+    Batches of configuration, leaf node of a and leaf node of b, shape (n, 3),
+    with spheres closer than distance. Configurations set in done, which may
+    change between batches, are skipped.
+    """
+    pairs = np.zeros((len(rotations), 3), dtype=int)
+    pairs[:, 0] = np.arange(len(rotations))
+    while len(pairs):
+        configuration, node_a, node_b = pairs.T
+        centers = np.einsum("nij,nj->ni", rotations[configuration], b.centers[node_b]) + translations[configuration]
+        distances = np.linalg.norm(centers - a.centers[node_a], axis=1)
+        near = (distances < a.radii[node_a] + b.radii[node_b] + distance) & ~done[configuration]
+        pairs = pairs[near]
+        configuration, node_a, node_b = pairs.T
+        both_leaves = (a.leaves[node_a] >= 0) & (b.leaves[node_b] >= 0)
+        if both_leaves.any():
+            yield pairs[both_leaves]
+        pairs = pairs[~both_leaves]
+        configuration, node_a, node_b = pairs.T
+        # Descend into the larger sphere unless it is a leaf
+        split_a = (b.leaves[node_b] >= 0) | ((a.leaves[node_a] < 0) & (a.radii[node_a] >= b.radii[node_b]))
+        pairs = np.concatenate([
+            np.column_stack([configuration[split_a], a.children[node_a[split_a], side], node_b[split_a]])
+            for side in [0, 1]
+        ] + [
+            np.column_stack([configuration[~split_a], node_a[~split_a], b.children[node_b[~split_a], side]])
+            for side in [0, 1]
+        ])
+
+
+def collide(a: SphereTree, b: SphereTree, transforms: np.ndarray, clearance: float = CLEARANCE) -> np.ndarray:
+    """Which placements of b in the frame of a, shape (n, 4, 4), bring them closer than clearance."""
+    result = np.zeros(len(transforms), dtype=bool)
+    for start in range(0, len(transforms), CHUNK):
+        rotations, translations = transforms[start:start + CHUNK, :3, :3], transforms[start:start + CHUNK, :3, 3]
+        colliding = result[start:start + CHUNK]
+        for leaf_pairs in _leaf_pairs(a, b, rotations, translations, clearance, colliding):
+            points_a = a.points[a.leaves[leaf_pairs[:, 1]]]
+            points_b = np.einsum(
+                "nij,nkj->nki", rotations[leaf_pairs[:, 0]], b.points[b.leaves[leaf_pairs[:, 2]]]
+            ) + translations[leaf_pairs[:, 0], None]
+            gaps = np.linalg.norm(points_a[:, :, None] - points_b[:, None], axis=3).min(axis=(1, 2))
+            colliding[leaf_pairs[gaps < clearance, 0]] = True
+    return result
+
+
+def _offsets(
+        a: SphereTree,
+        b: SphereTree,
+        rotations: np.ndarray,
+        translations: np.ndarray,
+        leaf_pairs: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Keys of the points of b in the leaf pairs, configuration, leaf and slot,
+    shape (pairs, LEAF_SIZE), their offsets from the points of a, shape
+    (pairs, LEAF_SIZE, LEAF_SIZE, 3), and the lengths of those.
+    """
+    configurations, leaves_a, leaves_b = leaf_pairs[:, 0], a.leaves[leaf_pairs[:, 1]], b.leaves[leaf_pairs[:, 2]]
+    points_b = np.einsum("nij,nkj->nki", rotations[configurations], b.points[leaves_b])
+    points_b += translations[configurations, None]
+    keys = (configurations * len(b.points) + leaves_b)[:, None] * LEAF_SIZE + np.arange(LEAF_SIZE)
+    offsets = points_b[:, :, None] - a.points[leaves_a][:, None]
+    return keys, offsets, np.linalg.norm(offsets, axis=3)
+
+
+def penetration(a: SphereTree, b: SphereTree, transforms: np.ndarray, max_depth: float = MAX_DEPTH) -> np.ndarray:
+    """
+    Depth of the deepest point of b inside a for placements of b in the
+    frame of a, shape (n, 4, 4), 0 when none is inside. Samples of a about
+    as near as the nearest one, up to SPACING farther, vote and a point is
+    as deep as it lies behind the tangent plane of the sample voting
+    shallowest, so sparse samples on another face don't put points on the
+    surface inside. Points farther than max_depth from every sample count as
+    outside.
+    """
+    result = np.zeros(len(transforms))
+    for start in range(0, len(transforms), CHUNK):
+        rotations, translations = transforms[start:start + CHUNK, :3, :3], transforms[start:start + CHUNK, :3, 3]
+        batches = list(_leaf_pairs(a, b, rotations, translations, max_depth, np.zeros(len(rotations), dtype=bool)))
+        if not batches:
+            continue
+        # Nearest sample and shallowest vote of every point of b in every configuration by leaf of a, in
+        # slices bounding the offsets of shape (pairs, LEAF_SIZE, LEAF_SIZE, 3)
+        leaf_keys, leaf_distances, leaf_depths = [], [], []
+        leaf_pairs = np.concatenate(batches)
+        for pairs in np.array_split(leaf_pairs, -(-len(leaf_pairs) // 1024)):
+            key, offset, lengths = _offsets(a, b, rotations, translations, pairs)
+            nearest = lengths.min(axis=2)
+            votes = -np.einsum("nkli,nli->nkl", offset, a.normals[a.leaves[pairs[:, 1]]])
+            votes[lengths > nearest[:, :, None] + SPACING] = np.inf
+            leaf_keys.append(key.ravel())
+            leaf_distances.append(nearest.ravel())
+            leaf_depths.append(votes.min(axis=2).ravel())
+        keys, inverse = np.unique(np.concatenate(leaf_keys), return_inverse=True)
+        leaf_distances, leaf_depths = np.concatenate(leaf_distances), np.concatenate(leaf_depths)
+        nearest = np.full(len(keys), np.inf)
+        np.minimum.at(nearest, inverse, leaf_distances)
+        # Leaves with samples about as near as the nearest one vote too
+        voting = leaf_distances <= nearest[inverse] + SPACING
+        depths = np.full(len(keys), np.inf)
+        np.minimum.at(depths, inverse[voting], leaf_depths[voting])
+        inside = (nearest < max_depth) & (depths > 0)
+        np.maximum.at(result[start:start + CHUNK], keys[inside] // (len(b.points) * LEAF_SIZE), depths[inside])
+    return result
+
+
+def link_meshes(root: ET.Element, dir: str) -> dict[str, Mesh]:
+    """Meshes of links in link coordinates without tendons."""
+    meshes: dict[str, Mesh] = {}
+    result = {}
+    for link in root.iter("link"):
+        visuals = [
+            visual for visual in link.findall("visual")
+            if not (visual.find("material").get("name") or "").startswith("tendon")
+        ]
+        if visuals:
+            result[link.get("name")] = concatenate([visual_mesh(visual, dir, meshes) for visual in visuals])
+    return result
+
+
+@dataclass
+class PairMap:
+    """Collisions of two links over a grid of the joints between them."""
+
+    links: tuple[int, int]
+    """Indices into CollisionMap.links."""
+
+    joints: tuple[int, ...]
+    """Actuated joints moving the links relative to each other."""
+
+    at_rest: bool
+    """Links touch with all joints at zero, they collide by penetrating deeper than at rest."""
+
+    colliding: np.ndarray
+    """Collision at each grid sample, bool array with a dimension per joint."""
+
+
+@dataclass
+class CollisionMap:
+    """Collisions of link pairs sampled uniformly over the joint ranges."""
+
+    links: list[str]
+
+    lower: np.ndarray
+    """Lowest sampled angle of each joint."""
+
+    upper: np.ndarray
+    """Highest sampled angle of each joint."""
+
+    samples: np.ndarray
+    """Samples of each joint."""
+
+    pairs: list[PairMap]
+
+    def grid(self, joints: tuple[int, ...]) -> list[np.ndarray]:
+        return [np.linspace(self.lower[j], self.upper[j], self.samples[j]) for j in joints]
+
+    def colliding(self, angles: np.ndarray) -> np.ndarray:
+        """Whether joint configurations of shape (..., joints) collide at the nearest grid sample, shape (...)."""
+        angles = np.asarray(angles, dtype=float)
+        # Joints with an empty range have a single sample
+        span = self.upper - self.lower
+        position = np.divide(angles - self.lower, span, out=np.zeros_like(angles), where=span > 0) * (self.samples - 1)
+        index = np.clip(np.round(position), 0, self.samples - 1).astype(int)
+        result = np.zeros(angles.shape[:-1], dtype=bool)
+        for pair in self.pairs:
+            result |= pair.colliding[tuple(index[..., j] for j in pair.joints)]
+        return result
+
+    def limits(self) -> np.ndarray:
+        """
+        Collision free range around zero of each joint, shape (2, joints).
+        Raises ValueError when the sample nearest to zero of a joint collides.
+        """
+        limits = np.array([self.lower, self.upper])
+        for joint in range(len(self.samples)):
+            blocked = np.zeros(self.samples[joint], dtype=bool)
+            for pair in self.pairs:
+                if pair.joints == (joint,):
+                    blocked |= pair.colliding
+            angles = self.grid((joint,))[0]
+            zero = np.argmin(np.abs(angles))
+            if blocked[zero]:
+                raise ValueError(f"Joint {joint} collides at {angles[zero]}, the sample nearest to zero")
+            below = np.flatnonzero(blocked[:zero])
+            above = np.flatnonzero(blocked[zero:])
+            if len(below):
+                limits[0, joint] = angles[below[-1] + 1]
+            if len(above):
+                limits[1, joint] = angles[zero + above[0] - 1]
+        # Zero itself is collision free also when it lies between samples
+        return np.array([np.minimum(limits[0], 0), np.maximum(limits[1], 0)])
+
+    def save(self, path: str) -> None:
+        names = "\n".join(self.links).encode()
+        header = np.zeros(1, HEADER)
+        header[0] = (MAGIC, VERSION, len(self.samples), len(self.pairs), 0, len(names))
+        with open(path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(self.lower.astype("<f4").tobytes())
+            f.write(self.upper.astype("<f4").tobytes())
+            f.write(self.samples.astype("<u2").tobytes())
+            f.write(names + bytes(-(f.tell() + len(names)) % 4))
+            for pair in self.pairs:
+                record = np.zeros(1, PAIR)
+                record[0]["links"] = pair.links
+                record[0]["flags"] = AT_REST if pair.at_rest else 0
+                record[0]["joint_count"] = len(pair.joints)
+                record[0]["joints"][:len(pair.joints)] = pair.joints
+                bits = np.packbits(pair.colliding.ravel()).tobytes()
+                f.write(record.tobytes())
+                f.write(bits + bytes(-len(bits) % 4))
+
+    @classmethod
+    def load(cls, path: str) -> "CollisionMap":
+        with open(path, "rb") as f:
+            data = f.read()
+        header = np.frombuffer(data, HEADER, 1)[0]
+        if header["magic"] != MAGIC or header["version"] != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} collision map")
+        joints = int(header["joint_count"])
+        offset = HEADER.itemsize
+        lower = np.frombuffer(data, "<f4", joints, offset).astype(np.float64)
+        upper = np.frombuffer(data, "<f4", joints, offset + 4 * joints).astype(np.float64)
+        samples = np.frombuffer(data, "<u2", joints, offset + 8 * joints).astype(int)
+        offset += 10 * joints
+        links = data[offset:offset + int(header["names_size"])].decode().split("\n")
+        offset += int(header["names_size"])
+        offset += -offset % 4
+        pairs = []
+        for _ in range(int(header["pair_count"])):
+            record = np.frombuffer(data, PAIR, 1, offset)[0]
+            offset += PAIR.itemsize
+            pair_joints = tuple(int(j) for j in record["joints"][:record["joint_count"]])
+            shape = tuple(samples[j] for j in pair_joints)
+            size = (int(np.prod(shape)) + 7) // 8
+            bits = np.unpackbits(np.frombuffer(data, np.uint8, size, offset))[:int(np.prod(shape))]
+            offset += size + -size % 4
+            pairs.append(PairMap(
+                (int(record["links"][0]), int(record["links"][1])),
+                pair_joints,
+                bool(record["flags"] & AT_REST),
+                bits.reshape(shape).astype(bool),
+            ))
+        return cls(links, lower, upper, samples, pairs)
+
+
+def collision_map(
+        root: ET.Element,
+        dir: str,
+        step: float = STEP,
+        max_joints: int = MAX_JOINTS,
+        workers: int = JOBS,
+) -> CollisionMap:
+    """Collision map of the arm in an URDF with meshes in dir, pairs are checked in parallel."""
+    chain = Chain()
+    lower, upper = joint_limits(root, chain.names)
+    samples = np.round((upper - lower) / step).astype(int) + 1
+    trees = {name: sphere_tree(*sample_surface(mesh)) for name, mesh in link_meshes(root, dir).items()}
+    links = [link for link in chain.links if link in trees]
+    result = CollisionMap(links, lower, upper, samples, [])
+    tasks = {}
+    for a, b in combinations(range(len(links)), 2):
+        first, second = chain.links.index(links[a]), chain.links.index(links[b])
+        joints = tuple(sorted({chain.actuated[k] for k in range(first, second)}))
+        if len(joints) <= max_joints:
+            result.pairs.append(PairMap((a, b), joints, False, np.zeros(0, dtype=bool)))
+            tasks[f"{links[a]}-{links[b]}"] = (
+                lambda first=first, second=second, joints=joints, a=a, b=b: _sweep_pair(
+                    chain, result, trees[links[a]], trees[links[b]], first, second, joints)
+            )
+    futures = run_tasks(tasks, workers)
+    for pair, future in zip(result.pairs, futures.values()):
+        pair.at_rest, pair.colliding = future.result()
+    return result
+
+
+def _sweep_pair(
+        chain: Chain,
+        result: CollisionMap,
+        a: SphereTree,
+        b: SphereTree,
+        first: int,
+        second: int,
+        joints: tuple[int, ...],
+) -> tuple[bool, np.ndarray]:
+    grids = np.meshgrid(*result.grid(joints), indexing="ij")
+    angles = np.zeros((grids[0].size + 1, len(chain.names)))
+    for joint, grid in zip(joints, grids):
+        angles[1:, joint] = grid.ravel()
+    frames = chain.link_frames(angles)
+    transforms = np.linalg.inv(frames[:, first]) @ frames[:, second]
+    at_rest = bool(collide(a, b, transforms[:1])[0])
+    if not at_rest:
+        colliding = collide(a, b, transforms[1:])
+    else:
+        inverses = np.linalg.inv(transforms)
+        rest = max(penetration(a, b, transforms[:1])[0], penetration(b, a, inverses[:1])[0])
+        # Points just deeper than allowed are found within two sample spacings
+        reach = min(rest + PENETRATION + 2 * SPACING, MAX_DEPTH)
+        depths = np.maximum(penetration(a, b, transforms[1:], reach), penetration(b, a, inverses[1:], reach))
+        colliding = depths > rest + PENETRATION
+    return at_rest, colliding.reshape(grids[0].shape)
+
+
+def apply_limits(root: ET.Element, limits: np.ndarray, names: Optional[list[str]] = None) -> None:
+    """Set limits of actuated joints, shape (2, joints), and of the joints mimicking them."""
+    names = Chain().names if names is None else names
+    for joint in root.iter("joint"):
+        mimic = joint.find("mimic")
+        name = joint.get("name") if mimic is None else mimic.get("joint")
+        if name in names:
+            limit = joint.find("limit")
+            limit.set("lower", f"{limits[0, names.index(name)]}")
+            limit.set("upper", f"{limits[1, names.index(name)]}")
@@ -0,0 +1,121 @@
+"""
+Pre-compressed copies and a manifest of the files served from dist:
+
+    python3 cad/compress.py dist
+
+Every file gets a gzip and, with the brotli module installed, a brotli
+compressed copy next to it, kept only when it is at least 10% smaller. The
+HTTP server picks one by Accept-Encoding and answers conditional requests
+with ETags of the content hash, suffixed -gz or -br for compressed copies,
+both from manifest.tsv holding a line per file with tab separated fields:
+
+    /path  SHA-256 hex  size  MIME type  gzip size  brotli size
+
+where sizes of missing copies are -. Compressed copies are cached by
+content, so only changed files are compressed again. Worker count is taken
+from KIAUKUTAS_JOBS and cache location from KIAUKUTAS_CACHE environment
+variables.
+"""
+from argparse import ArgumentParser
+from functools import partial
+from hashlib import sha256
+import gzip
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cache import ArtifactCache, fingerprint  # noqa: E402
+from pool import JOBS, run_tasks  # noqa: E402
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST = "manifest.tsv"
+# Suffix of compressed copies by encoding
+ENCODINGS = {"gzip": ".gz", "br": ".br"}
+# Largest size of a kept copy relative to the original
+MAX_RATIO = 0.9
+MIME_TYPES = {
+    ".css": "text/css",
+    ".glb": "model/gltf-binary",
+    ".html": "text/html",
+    ".js": "text/javascript",
+    ".json": "application/json",
+    ".stl": "model/stl",
+    ".stp": "model/step",
+    ".svg": "image/svg+xml",
+    ".txt": "text/plain",
+    ".urdf": "application/xml",
+}
+
+
+def compress(data: bytes) -> dict[str, bytes]:
+    """Compressed copies of data by encoding, at the highest levels."""
+    copies = {"gzip": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        copies["br"] = brotli.compress(data, quality=11)
+    return copies
+
+
+def compress_file(cache: ArtifactCache, path: str) -> tuple[str, int, dict[str, int]]:
+    """Write kept compressed copies of a file, return its hash, size and sizes of the copies by encoding."""
+    with open(path, "rb") as f:
+        data = f.read()
+    digest = sha256(data).hexdigest()
+    suffixes = {encoding: suffix for encoding, suffix in ENCODINGS.items() if encoding == "gzip" or brotli is not None}
+    files = {f"copy{suffix}": f"{path}{suffix}" for suffix in suffixes.values()}
+    key = fingerprint(compress, salt=f"{digest}, brotli {getattr(brotli, '__version__', None)}")
+    if not cache.restore(key, files):
+        for encoding, copy in compress(data).items():
+            with open(f"{path}{ENCODINGS[encoding]}", "wb") as f:
+                f.write(copy)
+        cache.store(key, files)
+    sizes = {}
+    for encoding, suffix in ENCODINGS.items():
+        if not os.path.isfile(f"{path}{suffix}"):
+            continue
+        size = os.path.getsize(f"{path}{suffix}")
+        if encoding in suffixes and size <= len(data) * MAX_RATIO:
+            sizes[encoding] = size
+        else:
+            os.remove(f"{path}{suffix}")
+    return digest, len(data), sizes
+
+
+def assets(dir: str) -> list[str]:
+    """Paths of files to serve relative to dir, without compressed copies and the manifest."""
+    paths = []
+    for parent, _, names in os.walk(dir):
+        for name in names:
+            path = os.path.relpath(os.path.join(parent, name), dir)
+            if not path.endswith(tuple(ENCODINGS.values())) and path != MANIFEST:
+                paths.append(path)
+    return sorted(paths)
+
+
+def write_manifest(dir: str, workers: int = JOBS) -> None:
+    cache = ArtifactCache()
+    paths = assets(dir)
+    futures = run_tasks({path: partial(compress_file, cache, os.path.join(dir, path)) for path in paths}, workers)
+    with open(os.path.join(dir, MANIFEST), "w") as f:
+        for path in paths:
+            digest, size, sizes = futures[path].result()
+            mime = MIME_TYPES.get(os.path.splitext(path)[1], "application/octet-stream")
+            copies = "\t".join(str(sizes.get(encoding, "-")) for encoding in ENCODINGS)
+            f.write(f"/{path}\t{digest}\t{size}\t{mime}\t{copies}\n")
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(
+        prog="compress.py",
+        description="Write pre-compressed copies and a manifest of the files in a directory served over HTTP.",
+    )
+    parser.add_argument("dir", help="directory to serve, e.g. dist")
+    args = parser.parse_args(args)
+    write_manifest(args.dir)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
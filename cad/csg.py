@@ -0,0 +1,133 @@
+"""
+Lazy constructive solid geometry on top of FreeCAD Part. Solids mirror the
+Part API used by the part builders but only record an expression graph:
+consecutive cuts or fuses are collected into one node evaluated as a single
+multi-tool boolean, and structurally identical sub-trees are evaluated once
+per process and shared between parts. Only the MAX_SHAPES most recently
+used shapes are kept, so a long running process building many layouts
+evicts the shapes of old ones.
+"""
+from cache import fingerprint
+from collections import OrderedDict
+from tracing import span
+from typing import Callable
+from weakref import WeakKeyDictionary
+import Part
+
+# Evaluated shapes kept, a full build evaluates about 60
+MAX_SHAPES = 500
+
+# Structural key -> evaluated shape, least recently used first
+_shapes: OrderedDict[tuple, Part.Shape] = OrderedDict()
+# Builder -> fingerprint, so builders reading other constants get other keys.
+# Builders of modules imported again are dropped with them.
+_builders: WeakKeyDictionary[Callable, str] = WeakKeyDictionary()
+
+
+def _key(value):
+    if isinstance(value, Solid):
+        return value.key
+    if isinstance(value, (list, tuple)):
+        return tuple(_key(v) for v in value)
+    if callable(value):
+        if value not in _builders:
+            _builders[value] = fingerprint(value)
+        return _builders[value]
+    if hasattr(value, "x") and hasattr(value, "y") and hasattr(value, "z"):
+        return ("Vector", value.x, value.y, value.z)
+    return value
+
+
+class Solid:
+    """Node of a lazily evaluated CSG expression."""
+
+    def __init__(self, op: str, args: tuple = (), children: tuple = ()):
+        self.op = op
+        self.args = args
+        self.children = children
+        self.key = (op, _key(args), tuple(child.key for child in children))
+
+    def fuse(self, other: "Solid") -> "Solid":
+        if self.op == "fuse":
+            return Solid("fuse", (), self.children + (other,))
+        return Solid("fuse", (), (self, other))
+
+    def cut(self, tool: "Solid") -> "Solid":
+        if self.op == "cut":
+            return Solid("cut", (), self.children + (tool,))
+        return Solid("cut", (), (self, tool))
+
+    def common(self, other: "Solid") -> "Solid":
+        return Solid("common", (), (self, other))
+
+    def translate(self, offset) -> "Solid":
+        return Solid("translate", (offset,), (self,))
+
+    def rotate(self, center, axis, angle: float) -> "Solid":
+        return Solid("rotate", (center, axis, angle), (self,))
+
+    def removeSplitter(self) -> "Solid":
+        return Solid("removeSplitter", (), (self,))
+
+    def shape(self) -> Part.Shape:
+        """Evaluated shape, shared with other solids so it must not be modified."""
+        if self.key in _shapes:
+            _shapes.move_to_end(self.key)
+            return _shapes[self.key]
+        if self.op.startswith("make"):
+            shape = self._evaluate()
+        else:
+            with span(self.args[0].__name__ if self.op == "call" else self.op, children=len(self.children)):
+                shape = self._evaluate()
+        _shapes[self.key] = shape
+        while len(_shapes) > MAX_SHAPES:
+            _shapes.popitem(last=False)
+        return shape
+
+    def _evaluate(self) -> Part.Shape:
+        children = [child.shape() for child in self.children]
+        if self.op == "call":
+            function, args = self.args
+            return function(*args)
+        if self.op in ["fuse", "cut"]:
+            base, tools = children[0], children[1:]
+            operation = base.fuse if self.op == "fuse" else base.cut
+            return operation(tools[0] if len(tools) == 1 else tools)
+        if self.op == "common":
+            return children[0].common(children[1])
+        if self.op in ["translate", "rotate"]:
+            return getattr(children[0].copy(), self.op)(*self.args)
+        if self.op == "removeSplitter":
+            return children[0].removeSplitter()
+        return getattr(Part, self.op)(*self.args)
+
+
+def makeBox(*args) -> Solid:
+    return Solid("makeBox", args)
+
+
+def makeCylinder(*args) -> Solid:
+    return Solid("makeCylinder", args)
+
+
+def makeCone(*args) -> Solid:
+    return Solid("makeCone", args)
+
+
+def makeTorus(*args) -> Solid:
+    return Solid("makeTorus", args)
+
+
+def call(builder: Callable[..., Part.Shape], *args) -> Solid:
+    """Shape of a builder not using this module, built once per process for the same arguments."""
+    return Solid("call", (builder, args))
+
+
+def clear() -> None:
+    """Forget evaluated shapes."""
+    _shapes.clear()
+
+
+def evaluate(shape) -> Part.Shape:
+    """Shape of a solid, other shapes are returned as they are."""
+    return shape.shape() if isinstance(shape, Solid) else shape
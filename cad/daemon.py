@@ -0,0 +1,177 @@
+"""
+Long-running build worker, saving the startup of FreeCAD and the import of
+freecad.gears and the part builders on every build:
+
+    (cd cad && freecad -c daemon.py)
+
+It listens on a Unix socket for builds sent by client.py, one JSON request
+per connection:
+
+    {"dir": absolute output directory, "targets": [names or patterns], "overrides": {layout constant: value}}
+
+and replies {"seconds": build time} or {"error": message}. Requests are
+built one after another. Every request executes layout.py with its overrides
+and imports the modules under cad again, like sweep.py does for variants,
+apart from csg and cache which keep the most recently used CSG shapes while
+their sources are unchanged, and the FreeCAD document of parts.py is reused.
+Shapes of parts missing from the artifact cache are evaluated by the daemon
+itself, so they stay in memory for later requests and the forked workers
+only export them. The socket path is taken from
+KIAUKUTAS_DAEMON environment variable, worker count from KIAUKUTAS_JOBS,
+artifact cache location from KIAUKUTAS_CACHE and trace file from
+KIAUKUTAS_TRACE.
+"""
+from argparse import ArgumentParser
+from glob import glob
+from typing import Any
+import json
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cache import ArtifactCache  # noqa: E402
+from client import SOCKET  # noqa: E402
+from sweep import constants, load_layout  # noqa: E402
+from targets import Target, script_args  # noqa: E402
+
+DIR = os.path.dirname(os.path.abspath(__file__))
+# Modules keeping state for the whole process, never imported again
+KEPT_MODULES = {"__main__", "daemon", "tracing"}
+# Modules not reading layout constants whose state, the shapes evaluated by
+# csg, is kept while their sources are unchanged
+MEMO_MODULES = {"csg", "cache"}
+
+
+def source_times() -> dict[str, float]:
+    """Modification times of Python files under cad by module name."""
+    return {os.path.basename(path).removesuffix(".py"): os.path.getmtime(path) for path in glob(f"{DIR}/*.py")}
+
+
+class Daemon:
+    def __init__(self):
+        self.sources = source_times()
+        import parts  # noqa: F401 imports FreeCAD and freecad.gears once
+
+    def _unload(self) -> None:
+        """Drop modules under cad apart from KEPT_MODULES, and MEMO_MODULES unless any of them changed."""
+        sources = source_times()
+        kept = set(KEPT_MODULES)
+        if all(sources.get(name) == self.sources.get(name) for name in MEMO_MODULES):
+            kept |= MEMO_MODULES
+        else:
+            print("CSG sources changed, forgetting evaluated shapes")
+        self.sources = sources
+        for name, module in list(sys.modules.items()):
+            if os.path.dirname(getattr(module, "__file__", None) or "") == DIR and name not in kept:
+                del sys.modules[name]
+
+    def load(self, overrides: dict[str, Any]) -> types.ModuleType:
+        """Module parts against layout.py with overridden constants, imported again as needed."""
+        self._unload()
+        unknown = set(overrides) - set(constants())
+        if unknown:
+            raise ValueError(f"Unknown constants of layout.py: {', '.join(sorted(unknown))}")
+        load_layout(overrides)
+        import parts
+        return parts
+
+    def evaluate_parts(
+            self,
+            parts: types.ModuleType,
+            cache: ArtifactCache,
+            targets: dict[str, Target],
+            names: list[str],
+    ) -> None:
+        """Evaluate shapes of parts with targets among names missing from the cache."""
+        import csg
+        from tracing import span
+        missing = {}
+        for name in names:
+            recipe = targets[name].recipe
+            if getattr(recipe, "func", None) is parts.export_part:
+                _, part, builder, args = recipe.args
+                key = parts.part_key(builder, args)
+                if not cache.contains(parts.mass_key(key) if name.endswith(".mass.json") else key, [name]):
+                    missing[part] = (builder, args)
+        for part, (builder, args) in missing.items():
+            with span(f"build {part}"):
+                csg.evaluate(builder(*args))
+
+    def build(self, dir: str, patterns: list[str], overrides: dict[str, Any]) -> None:
+        parts = self.load(overrides)
+        from targets import build, resolve
+        from tracing import finish
+        cache = ArtifactCache()
+        targets = parts.make_targets(cache)
+        self.evaluate_parts(parts, cache, targets, resolve(targets, patterns))
+        build(targets, patterns, dir)
+        finish()
+
+    def handle(self, request: dict) -> dict:
+        start = time.perf_counter()
+        targets = request.get("targets") or ["*"]
+        try:
+            self.build(request["dir"], targets, request.get("overrides", {}))
+        except Exception:
+            message = traceback.format_exc()
+            print(message, end="")
+            return {"error": message}
+        seconds = time.perf_counter() - start
+        print(f"Built {' '.join(targets)} in {request['dir']} in {seconds:.1f} s")
+        return {"seconds": seconds}
+
+    def serve(self, path: str) -> None:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            try:
+                server.connect(path)
+                raise RuntimeError(f"Another daemon is listening at {path}")
+            except (FileNotFoundError, ConnectionRefusedError):
+                pass
+        if os.path.exists(path):
+            os.remove(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(path)
+            server.listen()
+            print(f"Listening at {path}")
+            try:
+                while True:
+                    connection, _ = server.accept()
+                    with connection:
+                        message = b""
+                        while chunk := connection.recv(65536):
+                            message += chunk
+                        try:
+                            reply = self.handle(json.loads(message))
+                        except (ValueError, KeyError) as e:
+                            reply = {"error": f"Invalid request: {e}\n"}
+                        try:
+                            connection.sendall(json.dumps(reply).encode() + b"\n")
+                        except OSError:
+                            pass  # Client gone
+            finally:
+                os.remove(path)
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(
+        prog="daemon.py",
+        description="Build robot parts and URDF for requests of client.py, keeping FreeCAD loaded between them.",
+    )
+    parser.add_argument("--socket", default=SOCKET, help=f"Unix socket path (default: {SOCKET})")
+    args = parser.parse_args(args)
+    # Recipes read files relative to cad
+    os.chdir(DIR)
+    # Remove the socket also when terminated
+    signal.signal(signal.SIGTERM, lambda *_: exit(0))
+    Daemon().serve(args.socket)
+
+
+if __name__ == "__main__":
+    main(script_args())
+    exit(0)
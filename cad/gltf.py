@@ -0,0 +1,238 @@
+"""
+Binary glTF export of the URDF robot. Nodes follow the URDF tree: every link
+is a node parented to a node of the joint leading to it. Joint nodes carry the
+joint origin and describe the joint in extras, so viewers articulate a joint
+by multiplying its rotation with a rotation about extras.axis. Visuals of a
+link sharing geometry become one mesh node instanced with
+EXT_mesh_gpu_instancing, instances differing in colour get it from the
+_COLOR_0 instance attribute. Units are millimeters like in the URDF.
+"""
+from mesh import Mesh, cylinder, read_stl, vertex_normals
+from transform import matrix_quaternion, origin_matrix
+import json
+import numpy as np
+import xml.etree.ElementTree as ET
+
+INSTANCING = "EXT_mesh_gpu_instancing"
+ARRAY_BUFFER = 34962
+ELEMENT_ARRAY_BUFFER = 34963
+COMPONENT_TYPES = {np.dtype("<f4"): 5126, np.dtype("<u2"): 5123, np.dtype("<u4"): 5125}
+ACCESSOR_TYPES = {1: "SCALAR", 3: "VEC3", 4: "VEC4"}
+
+
+def srgb_to_linear(color: np.ndarray) -> np.ndarray:
+    return np.where(color <= 0.04045, color / 12.92, ((color + 0.055) / 1.055) ** 2.4)
+
+
+class GlbWriter:
+    """Accumulates glTF JSON and its single binary buffer."""
+
+    def __init__(self):
+        self.gltf = {
+            "asset": {"version": "2.0", "generator": "kiaukutas"},
+            "scene": 0,
+            "scenes": [{"nodes": []}],
+            "nodes": [],
+            "meshes": [],
+            "materials": [],
+            "accessors": [],
+            "bufferViews": [],
+            "buffers": [{"byteLength": 0}],
+        }
+        self.binary = bytearray()
+        self.geometries: dict[tuple, tuple[int, int, int]] = {}
+        self.meshes: dict[tuple, int] = {}
+        self.materials: dict[str, int] = {}
+
+    def accessor(self, data: np.ndarray, target: int = None, bounds: bool = False) -> int:
+        self.binary += bytes(-len(self.binary) % 4)
+        view = {"buffer": 0, "byteOffset": len(self.binary), "byteLength": data.nbytes}
+        if target is not None:
+            view["target"] = target
+        self.binary += data.tobytes()
+        self.gltf["bufferViews"].append(view)
+        accessor = {
+            "bufferView": len(self.gltf["bufferViews"]) - 1,
+            "componentType": COMPONENT_TYPES[data.dtype],
+            "count": len(data),
+            "type": ACCESSOR_TYPES[data.shape[1] if data.ndim > 1 else 1],
+        }
+        if bounds:
+            accessor["min"] = data.min(axis=0).tolist()
+            accessor["max"] = data.max(axis=0).tolist()
+        self.gltf["accessors"].append(accessor)
+        return len(self.gltf["accessors"]) - 1
+
+    def geometry(self, key: tuple, mesh: Mesh) -> tuple[int, int, int]:
+        """Position, normal and index accessors shared by all materials."""
+        if key not in self.geometries:
+            mesh, normals = vertex_normals(mesh)
+            index_type = "<u2" if len(mesh.vertices) <= 0x10000 else "<u4"
+            self.geometries[key] = (
+                self.accessor(mesh.vertices.astype("<f4"), ARRAY_BUFFER, bounds=True),
+                self.accessor(normals.astype("<f4"), ARRAY_BUFFER),
+                self.accessor(mesh.triangles.reshape(-1).astype(index_type), ELEMENT_ARRAY_BUFFER),
+            )
+        return self.geometries[key]
+
+    def material(self, name: str, rgba: tuple[float, float, float, float]) -> int:
+        key = name or " ".join(f"{c}" for c in rgba)
+        if key not in self.materials:
+            material = {
+                "pbrMetallicRoughness": {
+                    "baseColorFactor": [*srgb_to_linear(np.array(rgba[:3])).tolist(), rgba[3]],
+                    "metallicFactor": 0,
+                    "roughnessFactor": 0.8,
+                },
+            }
+            if name:
+                material["name"] = name
+            if rgba[3] < 1:
+                material["alphaMode"] = "BLEND"
+            self.gltf["materials"].append(material)
+            self.materials[key] = len(self.gltf["materials"]) - 1
+        return self.materials[key]
+
+    def mesh(self, key: tuple, mesh: Mesh, material: int) -> int:
+        if (key, material) not in self.meshes:
+            position, normal, indices = self.geometry(key, mesh)
+            self.gltf["meshes"].append({
+                "primitives": [{
+                    "attributes": {"POSITION": position, "NORMAL": normal},
+                    "indices": indices,
+                    "material": material,
+                }],
+            })
+            self.meshes[(key, material)] = len(self.gltf["meshes"]) - 1
+        return self.meshes[(key, material)]
+
+    def node(self, node: dict, parent: int = None) -> int:
+        index = len(self.gltf["nodes"])
+        self.gltf["nodes"].append(node)
+        if parent is None:
+            self.gltf["scenes"][0]["nodes"].append(index)
+        else:
+            self.gltf["nodes"][parent].setdefault("children", []).append(index)
+        return index
+
+    def write(self, path: str) -> None:
+        self.binary += bytes(-len(self.binary) % 4)
+        self.gltf["buffers"][0]["byteLength"] = len(self.binary)
+        for name in ["meshes", "materials", "accessors", "bufferViews"]:
+            if not self.gltf[name]:
+                del self.gltf[name]
+        content = json.dumps(self.gltf, separators=(",", ":")).encode()
+        content += b" " * (-len(content) % 4)
+        with open(path, "wb") as f:
+            f.write(np.array([0x46546C67, 2, 28 + len(content) + len(self.binary)], "<u4").tobytes())
+            f.write(np.array([len(content), 0x4E4F534A], "<u4").tobytes())
+            f.write(content)
+            f.write(np.array([len(self.binary), 0x004E4942], "<u4").tobytes())
+            f.write(self.binary)
+
+
+def trs(matrix: np.ndarray, scale: np.ndarray = np.ones(3)) -> dict:
+    """glTF node TRS properties of a rigid transform followed by a scale."""
+    return {
+        "translation": matrix[:3, 3].tolist(),
+        "rotation": matrix_quaternion(matrix[:3, :3]).tolist(),
+        "scale": scale.tolist(),
+    }
+
+
+def write_glb(root: ET.Element, dir: str, path: str) -> None:
+    """Write robot described by URDF root element, mesh file names are relative to dir."""
+    writer = GlbWriter()
+    colors = {
+        material.get("name"): material.find("color").get("rgba")
+        for material in root.findall("material") if material.find("color") is not None
+    }
+    stls: dict[str, Mesh] = {}
+    cylinders: dict[float, Mesh] = {}
+
+    def add_link(link: ET.Element, parent: int) -> None:
+        node = writer.node({"name": link.get("name")}, parent)
+        # Geometry and opacity -> geometry mesh and instance transforms, scales and materials
+        batches: dict[tuple, tuple[Mesh, list[np.ndarray], list[np.ndarray], list[tuple]]] = {}
+        for visual in link.findall("visual"):
+            geometry = visual.find("geometry")[0]
+            scale = np.ones(3)
+            if geometry.tag == "mesh":
+                key = ("mesh", geometry.get("filename"))
+                if key[1] not in stls:
+                    stls[key[1]] = read_stl(f"{dir}/{key[1]}")
+                mesh = stls[key[1]]
+            elif geometry.tag == "cylinder":
+                # Unit length cylinder stretched along z per instance
+                radius = float(geometry.get("radius"))
+                key = ("cylinder", radius)
+                if radius not in cylinders:
+                    cylinders[radius] = cylinder(radius, 1)
+                mesh = cylinders[radius]
+                scale = np.array([1, 1, float(geometry.get("length"))])
+            else:
+                raise ValueError(f"Can't export <{geometry.tag}> geometry")
+            material = visual.find("material")
+            color = material.find("color")
+            name = material.get("name")
+            rgba = tuple(float(c) for c in (color.get("rgba") if color is not None else colors[name]).split())
+            _, matrices, scales, materials = batches.setdefault((key, rgba[3]), (mesh, [], [], []))
+            matrices.append(origin_matrix(visual.find("origin")))
+            scales.append(scale)
+            materials.append((name, rgba))
+        for (key, alpha), (mesh, matrices, scales, materials) in batches.items():
+            if len(matrices) == 1:
+                index = writer.mesh(key, mesh, writer.material(*materials[0]))
+                writer.node({"mesh": index, **trs(matrices[0], scales[0])}, node)
+                continue
+            matrices = np.array(matrices)
+            attributes = {
+                "TRANSLATION": writer.accessor(matrices[:, :3, 3].astype("<f4")),
+                "ROTATION": writer.accessor(
+                    np.array([matrix_quaternion(matrix[:3, :3]) for matrix in matrices], dtype="<f4")),
+                "SCALE": writer.accessor(np.array(scales, dtype="<f4")),
+            }
+            if len(set(materials)) == 1:
+                material = writer.material(*materials[0])
+            else:
+                # Differently coloured instances, e.g. tendons, share a white material tinted per instance
+                material = writer.material("", (1, 1, 1, alpha))
+                rgb = np.array([rgba[:3] for _, rgba in materials])
+                attributes["_COLOR_0"] = writer.accessor(srgb_to_linear(rgb).astype("<f4"))
+            writer.node({
+                "mesh": writer.mesh(key, mesh, material),
+                "extensions": {INSTANCING: {"attributes": attributes}},
+            }, node)
+        for joint in root.findall("joint"):
+            if joint.find("parent").get("link") == link.get("name"):
+                add_joint(joint, node)
+
+    def add_joint(joint: ET.Element, parent: int) -> None:
+        extras = {"type": joint.get("type")}
+        axis = joint.find("axis")
+        extras["axis"] = [float(x) for x in (axis.get("xyz") if axis is not None else "1 0 0").split()]
+        limit = joint.find("limit")
+        if limit is not None:
+            extras["lower"] = float(limit.get("lower", 0))
+            extras["upper"] = float(limit.get("upper", 0))
+        mimic = joint.find("mimic")
+        if mimic is not None:
+            extras["mimic"] = mimic.get("joint")
+            extras["multiplier"] = float(mimic.get("multiplier", 1))
+            extras["offset"] = float(mimic.get("offset", 0))
+        node = writer.node({
+            "name": joint.get("name"),
+            **trs(origin_matrix(joint.find("origin"))),
+            "extras": extras,
+        }, parent)
+        child = joint.find("child").get("link")
+        add_link(next(link for link in root.findall("link") if link.get("name") == child), node)
+
+    children = {joint.find("child").get("link") for joint in root.findall("joint")}
+    for link in root.findall("link"):
+        if link.get("name") not in children:
+            add_link(link, writer.node({"name": root.get("name")}))
+    if any(INSTANCING in node.get("extensions", {}) for node in writer.gltf["nodes"]):
+        writer.gltf["extensionsUsed"] = [INSTANCING]
+        writer.gltf["extensionsRequired"] = [INSTANCING]
+    writer.write(path)
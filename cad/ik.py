@@ -0,0 +1,210 @@
+"""
+Batched inverse kinematics of the arm by damped least squares. Targets are
+tool positions, shape (..., 3), or poses, shape (..., 4, 4), in mm in the
+base link frame. All targets are iterated together, converged ones drop out
+of the batch. Damping grows with the error, so the steps are those of
+gradient descent far from a target and of Gauss-Newton close to it. Targets
+stuck in a local minimum restart from random angles, all restarts of a round
+in one batch. Solutions are kept in a spatial cache and later targets in the
+same or a neighbouring cell start from its solution, so in steady state most
+targets converge within a few iterations.
+
+Joint limits are those of the built robot.urdf, narrowed by the build to
+keep links clear of each other, at KIAUKUTAS_URDF or by default
+dist/robot.urdf in the repository.
+"""
+from collections import OrderedDict
+from itertools import product
+from typing import Optional
+import numpy as np
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from kinematics import Chain, joint_limits  # noqa: E402
+
+URDF = os.environ.get(
+    "KIAUKUTAS_URDF", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dist", "robot.urdf"))
+
+
+def rotation_error(current: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Rotation vectors taking rotations of shape (n, 3, 3) to targets, in the base frame, shape (n, 3)."""
+    difference = target @ current.transpose(0, 2, 1)
+    skew = np.stack([
+        difference[:, 2, 1] - difference[:, 1, 2],
+        difference[:, 0, 2] - difference[:, 2, 0],
+        difference[:, 1, 0] - difference[:, 0, 1],
+    ], axis=1) / 2
+    angle = np.arccos(np.clip((np.trace(difference, axis1=1, axis2=2) - 1) / 2, -1, 1))
+    sin = np.linalg.norm(skew, axis=1)
+    scale = np.where(sin > 1e-9, angle / np.maximum(sin, 1e-9), 1)[:, None]
+    # Half turns have no skew part, the axis is the column of largest diagonal of difference + I
+    half = (angle > np.pi / 2) & (sin < 1e-6)
+    if half.any():
+        symmetric = (difference[half] + np.eye(3)) / 2
+        column = np.argmax(np.diagonal(symmetric, axis1=1, axis2=2), axis=1)
+        axis = symmetric[np.arange(len(column)), :, column]
+        skew[half] = axis / np.linalg.norm(axis, axis=1)[:, None] * angle[half][:, None]
+        scale[half] = 1
+    return skew * scale
+
+
+class Solver:
+    """Damped least squares solver with joint limits and a warm start cache."""
+
+    def __init__(
+            self,
+            chain: Optional[Chain] = None,
+            root: Optional[ET.Element] = None,
+            damping: float = 0.01,
+            error_damping: float = 0.1,
+            orientation_weight: float = 100.0,
+            position_tolerance: float = 1e-3,
+            orientation_tolerance: float = 1e-5,
+            iterations: int = 100,
+            patience: int = 5,
+            progress: float = 0.01,
+            max_step: float = 0.5,
+            restarts: int = 48,
+            restarts_per_round: int = 16,
+            cell: float = 10.0,
+            cache_size: int = 100000,
+    ):
+        """
+        Joint limits are read from root, the built URDF by default. Damping
+        is in mm and its square grows by error_damping times the squared
+        error, orientation errors are weighted by mm per radian, steps turn
+        no joint by more than max_step radians and the cache keeps the latest
+        solution per cube of cell mm. A target whose error shrinks by less
+        than progress for patience iterations is given up on and restarts, in
+        rounds of restarts_per_round random starts up to restarts in total.
+        """
+        self.chain = Chain() if chain is None else chain
+        root = ET.parse(URDF).getroot() if root is None else root
+        self.lower, self.upper = joint_limits(root, self.chain.names)
+        self.damping = damping
+        self.error_damping = error_damping
+        self.orientation_weight = orientation_weight
+        self.position_tolerance = position_tolerance
+        self.orientation_tolerance = orientation_tolerance
+        self.iterations = iterations
+        self.patience = patience
+        self.progress = progress
+        self.max_step = max_step
+        self.restarts = restarts
+        self.restarts_per_round = restarts_per_round
+        self.cell = cell
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple, np.ndarray] = OrderedDict()
+        self.random = np.random.default_rng(0)
+
+    def _keys(self, positions: np.ndarray) -> list[tuple]:
+        return [tuple(cell) for cell in np.floor(positions / self.cell).astype(int).tolist()]
+
+    def _lookup(self, key: tuple) -> Optional[np.ndarray]:
+        """Cached solution of the cell of a key or else of a neighbouring cell."""
+        for offset in [(0, 0, 0)] + list(product([-1, 0, 1], repeat=3)):
+            neighbour = (key[0] + offset[0], key[1] + offset[1], key[2] + offset[2])
+            if neighbour in self.cache:
+                self.cache.move_to_end(neighbour)
+                return self.cache[neighbour]
+        return None
+
+    @staticmethod
+    def _step(jacobians: np.ndarray, error: np.ndarray, damping: np.ndarray) -> np.ndarray:
+        transposed = jacobians.transpose(0, 2, 1)
+        return (transposed @ np.linalg.solve(jacobians @ transposed + damping, error[:, :, None]))[:, :, 0]
+
+    def _iterate(
+            self,
+            angles: np.ndarray,
+            positions: np.ndarray,
+            rotations: Optional[np.ndarray],
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Refine angles in place towards the targets, return which converged."""
+        converged = np.zeros(len(angles), dtype=bool)
+        active = np.arange(len(angles))
+        rows = 3 if rotations is None else 6
+        identity = np.eye(rows)
+        best = np.full(len(angles), np.inf)
+        stalled = np.zeros(len(angles), dtype=int)
+        for _ in range(self.iterations):
+            frames, jacobians = self.chain.jacobian(angles[active])
+            error = positions[active] - frames[:, :3, 3]
+            done = np.linalg.norm(error, axis=1) < self.position_tolerance
+            if rotations is not None:
+                rotation = rotation_error(frames[:, :3, :3], rotations[active])
+                done &= np.linalg.norm(rotation, axis=1) < self.orientation_tolerance
+                error = np.concatenate([error, rotation * self.orientation_weight], axis=1)
+                jacobians = jacobians.copy()
+                jacobians[:, 3:] *= self.orientation_weight
+            converged[active[done]] = True
+            # Targets whose error stops shrinking sit in a local minimum or against limits, restarts may reach them
+            norm = np.linalg.norm(error, axis=1)
+            improved = norm < best[active] * (1 - self.progress)
+            stalled[active] = np.where(improved, 0, stalled[active] + 1)
+            best[active] = np.minimum(best[active], norm)
+            keep = ~done & (stalled[active] < self.patience)
+            active, error, jacobians, norm = active[keep], error[keep], jacobians[keep, :rows], norm[keep]
+            if len(active) == 0:
+                break
+            damping = (self.damping ** 2 + self.error_damping * norm ** 2)[:, None, None] * identity
+            step = self._step(jacobians, error, damping)
+            # Joints at a limit and pushed beyond it are held there and the others solve for the error
+            current = angles[active]
+            held = ((current <= self.lower) & (step < 0)) | ((current >= self.upper) & (step > 0))
+            if held.any():
+                step = self._step(jacobians * ~held[:, None, :], error, damping)
+            # Far from the target linearization does not hold, large steps overshoot
+            step *= np.minimum(1, self.max_step / np.maximum(np.abs(step).max(axis=1), 1e-12))[:, None]
+            angles[active] = np.clip(current + step, self.lower, self.upper)
+        return angles, converged
+
+    def solve(self, targets: np.ndarray, seeds: Optional[np.ndarray] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Joint angles reaching targets and which of them converged, shapes
+        (..., joints) and (...). Targets without a cached solution start from
+        seeds, all zero by default, and unconverged ones restart from random
+        angles up to restarts times.
+        """
+        targets = np.asarray(targets, dtype=float)
+        pose = targets.shape[-2:] == (4, 4)
+        shape = targets.shape[:-2] if pose else targets.shape[:-1]
+        if pose:
+            targets = targets.reshape(-1, 4, 4)
+            positions, rotations = targets[:, :3, 3], targets[:, :3, :3]
+        else:
+            positions, rotations = targets.reshape(-1, 3), None
+        n, joints = len(positions), len(self.chain.names)
+        angles = np.zeros((n, joints)) if seeds is None else np.array(seeds, dtype=float).reshape(n, joints)
+        keys = self._keys(positions)
+        for i, key in enumerate(keys):
+            cached = self._lookup(key)
+            if cached is not None:
+                angles[i] = cached
+        angles, converged = self._iterate(angles, positions, rotations)
+        remaining = self.restarts
+        while remaining > 0:
+            retry = np.flatnonzero(~converged)
+            if len(retry) == 0:
+                break
+            # Restarts of all unconverged targets in a round are iterated as one batch
+            count = min(self.restarts_per_round, remaining)
+            remaining -= count
+            candidates = np.repeat(retry, count)
+            starts = self.random.uniform(self.lower, self.upper, (len(candidates), joints))
+            starts, reached = self._iterate(
+                starts, positions[candidates], None if rotations is None else rotations[candidates])
+            # First converged restart of every target
+            reached = reached.reshape(len(retry), count)
+            found = reached.any(axis=1)
+            chosen = starts.reshape(len(retry), count, joints)[np.arange(len(retry)), np.argmax(reached, axis=1)]
+            angles[retry[found]] = chosen[found]
+            converged[retry[found]] = True
+        for i in np.flatnonzero(converged):
+            self.cache[keys[i]] = angles[i].copy()
+            self.cache.move_to_end(keys[i])
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return angles.reshape(shape + (joints,)), converged.reshape(shape)
@@ -0,0 +1,134 @@
+"""
+Mass properties of parts and links. Parts are stored at unit density, so
+densities can change without building the parts again, as JSON:
+
+    {"mass": volume in mm³, "center": [x, y, z] in mm, "inertia": 3x3 in mm⁵ about the center}
+
+Links sum the properties of the parts their visuals place and get <inertial>
+elements with mass in kg and inertia in kg mm², lengths stay in mm like in
+the rest of the URDF.
+"""
+from dataclasses import dataclass
+from typing import Optional
+from mesh import Mesh
+from transform import origin_matrix
+import json
+import numpy as np
+import os
+import xml.etree.ElementTree as ET
+
+# Covariance of the unit tetrahedron with a corner at the origin per determinant
+CANONICAL_COVARIANCE = np.array([[2, 1, 1], [1, 2, 1], [1, 1, 2]]) / 120
+
+
+@dataclass
+class MassProperties:
+    """Mass, centre of mass and inertia tensor of a rigid body."""
+
+    mass: float
+    """Mass in g, or volume in mm³ at unit density."""
+
+    center: np.ndarray
+    """Centre of mass in mm, shape (3,)."""
+
+    inertia: np.ndarray
+    """Inertia tensor about the centre of mass in g mm², shape (3, 3)."""
+
+    def scaled(self, density: float) -> "MassProperties":
+        return MassProperties(self.mass * density, self.center, self.inertia * density)
+
+    def transformed(self, matrix: np.ndarray) -> "MassProperties":
+        """Properties of the body moved by a homogeneous 4x4 transform."""
+        rotation = matrix[:3, :3]
+        return MassProperties(self.mass, rotation @ self.center + matrix[:3, 3], rotation @ self.inertia @ rotation.T)
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump({"mass": self.mass, "center": self.center.tolist(), "inertia": self.inertia.tolist()}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "MassProperties":
+        with open(path) as f:
+            properties = json.load(f)
+        return cls(properties["mass"], np.array(properties["center"]), np.array(properties["inertia"]))
+
+
+def combine(bodies: list[MassProperties]) -> MassProperties:
+    """Properties of rigidly connected bodies, by the parallel axis theorem."""
+    mass = sum(body.mass for body in bodies)
+    center = sum(body.mass * body.center for body in bodies) / mass
+    inertia = np.zeros((3, 3))
+    for body in bodies:
+        offset = body.center - center
+        inertia += body.inertia + body.mass * (offset @ offset * np.eye(3) - np.outer(offset, offset))
+    return MassProperties(mass, center, inertia)
+
+
+def shape_properties(shape) -> MassProperties:
+    """Properties of the solids of a FreeCAD shape at unit density."""
+    return combine([
+        MassProperties(
+            solid.Volume,
+            np.array(solid.CenterOfMass),
+            np.array([[getattr(solid.MatrixOfInertia, f"A{i}{j}") for j in range(1, 4)] for i in range(1, 4)]),
+        )
+        for solid in shape.Solids
+    ])
+
+
+def mesh_properties(mesh: Mesh) -> MassProperties:
+    """Properties of a closed mesh at unit density, summed over tetrahedra from the origin to every triangle."""
+    corners = mesh.corners()
+    determinants = np.einsum("ij,ij->i", corners[:, 0], np.cross(corners[:, 1], corners[:, 2]))
+    volume = determinants.sum() / 6
+    center = (determinants[:, None] * corners.sum(axis=1)).sum(axis=0) / 24 / volume
+    # Second moments about the origin, then about the centre
+    covariance = np.einsum("n,nai,ab,nbj->ij", determinants, corners, CANONICAL_COVARIANCE, corners)
+    covariance -= volume * np.outer(center, center)
+    return MassProperties(volume, center, np.trace(covariance) * np.eye(3) - covariance)
+
+
+def cylinder_properties(radius: float, length: float) -> MassProperties:
+    """Properties of an URDF cylinder, centred on the origin along z, at unit density."""
+    volume = np.pi * radius ** 2 * length
+    side = volume * (3 * radius ** 2 + length ** 2) / 12
+    return MassProperties(volume, np.zeros(3), np.diag([side, side, volume * radius ** 2 / 2]))
+
+
+def link_properties(
+        link: ET.Element,
+        parts: dict[str, MassProperties],
+        cylinder_density: float,
+) -> Optional[MassProperties]:
+    """Sum of the parts placed by visuals of a link in link coordinates, None if it has none."""
+    bodies = []
+    for visual in link.findall("visual"):
+        geometry = visual.find("geometry")[0]
+        if geometry.tag == "cylinder":
+            body = cylinder_properties(float(geometry.get("radius")), float(geometry.get("length")))
+            body = body.scaled(cylinder_density)
+        else:
+            body = parts.get(os.path.basename(geometry.get("filename")).split(".")[0])
+        if body is not None:
+            bodies.append(body.transformed(origin_matrix(visual.find("origin"))))
+    return combine(bodies) if bodies else None
+
+
+def add_inertials(root: ET.Element, parts: dict[str, MassProperties], cylinder_density: float) -> ET.Element:
+    """
+    Add <inertial> to every link placing any of parts, keyed by part name with
+    their real density, cylinders are of cylinder_density in g/mm³.
+    """
+    for link in root.iter("link"):
+        body = link_properties(link, parts, cylinder_density)
+        if body is None:
+            continue
+        inertial = ET.Element("inertial")
+        ET.SubElement(inertial, "origin", {"xyz": " ".join(str(x) for x in body.center), "rpy": "0 0 0"})
+        ET.SubElement(inertial, "mass", {"value": f"{body.mass / 1000}"})
+        inertia = body.inertia / 1000
+        ET.SubElement(inertial, "inertia", {
+            f"i{'xyz'[i]}{'xyz'[j]}": f"{inertia[i, j]}" for i, j in [(0, 0), (0, 1), (0, 2), (1, 1), (1, 2), (2, 2)]
+        })
+        link.insert(0, inertial)
+    return root
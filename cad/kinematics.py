@@ -0,0 +1,119 @@
+"""
+Batched forward kinematics and geometric Jacobians of the arm. Joint angles
+are given per actuated joint, shape (..., joints), every mimic joint turns
+with the joint it follows. Transforms are in mm in the base link frame.
+
+Batches are evaluated as arrays of shape (3, 3, n) and (3, n) so composing
+transforms are matrix products and elementwise operations on contiguous
+arrays. Joint axes are
+folded into the constant origins, every joint then turns about z.
+"""
+from typing import Optional
+import numpy as np
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from transform import axis_frame  # noqa: E402
+from urdf import ArmJoint, arm_joints, make_urdf  # noqa: E402
+
+
+def joint_limits(root: Optional[ET.Element] = None, names: Optional[list[str]] = None) -> np.ndarray:
+    """Lower and upper limits of joints of an URDF, the actuated arm joints by default, shape (2, joints)."""
+    root = make_urdf() if root is None else root
+    names = [joint.name for joint in arm_joints() if joint.mimic is None] if names is None else names
+    limits = [root.find(f"joint[@name='{name}']/limit") for name in names]
+    return np.array([[float(limit.get("lower")) for limit in limits], [float(limit.get("upper")) for limit in limits]])
+
+
+class Chain:
+    """Serial chain of revolute joints from the base link to the tool."""
+
+    def __init__(self, joints: Optional[list[ArmJoint]] = None, tool: Optional[np.ndarray] = None):
+        joints = arm_joints() if joints is None else joints
+        self.names = [joint.name for joint in joints if joint.mimic is None]
+        self.links = [joints[0].parent] + [joint.child for joint in joints]
+        # Actuated joint index of every joint
+        self.actuated = [self.names.index(joint.mimic or joint.name) for joint in joints]
+        tool = np.eye(4) if tool is None else tool
+        # Origins of the joints and the tool in the z aligned frame of the previous joint
+        self.rotations, self.translations, self.frames = [], [], []
+        previous = np.eye(3)
+        for joint in joints:
+            axis = np.array([float(x) for x in joint.axis.split()])
+            frame = axis_frame(axis / np.linalg.norm(axis))
+            self.frames.append(frame)
+            origin = joint.placement.matrix()
+            self.rotations.append(previous.T @ origin[:3, :3] @ frame)
+            self.translations.append(previous.T @ origin[:3, 3])
+            previous = frame
+        self.rotations.append(previous.T @ tool[:3, :3])
+        self.translations.append(previous.T @ tool[:3, 3])
+
+    def _forward(
+            self,
+            angles: np.ndarray,
+            jacobian: bool = False,
+            links: bool = False,
+    ) -> tuple[np.ndarray, Optional[np.ndarray], Optional[np.ndarray]]:
+        angles = np.asarray(angles, dtype=float)
+        shape = angles.shape[:-1]
+        angles = angles.reshape(-1, len(self.names)).T
+        n = angles.shape[1]
+        cos, sin = np.cos(angles), np.sin(angles)
+        rotation = np.zeros((3, 3, n))
+        rotation[0, 0] = rotation[1, 1] = rotation[2, 2] = 1
+        position = np.zeros((3, n))
+        axes, origins = [], []
+        link_frames = None
+        if links:
+            link_frames = np.zeros((len(self.links), 4, 4, n))
+            link_frames[:, 0, 0] = link_frames[:, 1, 1] = link_frames[:, 2, 2] = link_frames[:, 3, 3] = 1
+        for i, (origin_rotation, translation) in enumerate(zip(self.rotations, self.translations)):
+            position = position + translation @ rotation
+            rotation = origin_rotation.T @ rotation
+            if i == len(self.actuated):
+                break
+            if jacobian:
+                axes.append(rotation[:, 2])
+                origins.append(position)
+            c, s = cos[self.actuated[i]], sin[self.actuated[i]]
+            x = rotation[:, 0] * c + rotation[:, 1] * s
+            rotation[:, 1] = rotation[:, 1] * c - rotation[:, 0] * s
+            rotation[:, 0] = x
+            if links:
+                link_frames[i + 1, :3, :3] = self.frames[i] @ rotation
+                link_frames[i + 1, :3, 3] = position
+        frames = np.zeros((n, 4, 4))
+        frames[:, :3, :3] = rotation.transpose(2, 0, 1)
+        frames[:, :3, 3] = position.T
+        frames[:, 3, 3] = 1
+        columns = None
+        if jacobian:
+            columns = np.zeros((6, len(self.names), n))
+            for axis, origin, index in zip(axes, origins, self.actuated):
+                arm = position - origin
+                columns[0, index] += axis[1] * arm[2] - axis[2] * arm[1]
+                columns[1, index] += axis[2] * arm[0] - axis[0] * arm[2]
+                columns[2, index] += axis[0] * arm[1] - axis[1] * arm[0]
+                columns[3:, index] += axis
+            columns = columns.transpose(2, 0, 1).reshape(shape + (6, len(self.names)))
+        if links:
+            link_frames = link_frames.transpose(3, 0, 1, 2).reshape(shape + (len(self.links), 4, 4))
+        return frames.reshape(shape + (4, 4)), columns, link_frames
+
+    def forward(self, angles: np.ndarray) -> np.ndarray:
+        """Tool transforms of joint configurations, shape (..., 4, 4)."""
+        return self._forward(angles)[0]
+
+    def link_frames(self, angles: np.ndarray) -> np.ndarray:
+        """Transforms of all links in the order of Chain.links, shape (..., links, 4, 4)."""
+        return self._forward(angles, links=True)[2]
+
+    def jacobian(self, angles: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Tool transforms and geometric Jacobians, linear velocity in mm/rad over
+        angular velocity, of joint configurations, shapes (..., 4, 4) and (..., 6, joints).
+        """
+        return self._forward(angles, jacobian=True)[:2]
@@ -0,0 +1,83 @@
+"""
+Compact binary mesh format, all values little endian:
+
+    char[4]   magic "KMSH"
+    uint16    version (1)
+    uint16    index size in bytes (2 or 4)
+    uint32    vertex count
+    uint32    index count
+    float32[3] bounding box minimum
+    float32[3] bounding box maximum
+    uint16[vertex count][3] positions quantized within the bounding box
+    int8[vertex count][2]   octahedral encoded unit normals
+    padding to a multiple of 4 bytes
+    uint16/uint32[index count] vertex indices of counter clockwise triangles
+"""
+from mesh import Mesh, vertex_normals
+import numpy as np
+
+MAGIC = b"KMSH"
+VERSION = 1
+HEADER = np.dtype([
+    ("magic", "S4"),
+    ("version", "<u2"),
+    ("index_size", "<u2"),
+    ("vertex_count", "<u4"),
+    ("index_count", "<u4"),
+    ("min", "<f4", 3),
+    ("max", "<f4", 3),
+])
+
+
+def encode_octahedral(normals: np.ndarray) -> np.ndarray:
+    n = normals / np.abs(normals).sum(axis=1, keepdims=True)
+    sign = np.where(n[:, :2] >= 0, 1.0, -1.0)
+    folded = (1 - np.abs(n[:, ::-1][:, 1:])) * sign
+    xy = np.where(n[:, 2:] < 0, folded, n[:, :2])
+    return np.round(np.clip(xy, -1, 1) * 127).astype(np.int8)
+
+
+def decode_octahedral(encoded: np.ndarray) -> np.ndarray:
+    xy = np.maximum(encoded / 127, -1)
+    z = 1 - np.abs(xy).sum(axis=1)
+    folded = (1 - np.abs(xy[:, ::-1])) * np.where(xy >= 0, 1.0, -1.0)
+    normals = np.concatenate([np.where(z[:, None] < 0, folded, xy), z[:, None]], 1)
+    return normals / np.linalg.norm(normals, axis=1, keepdims=True)
+
+
+def write_kmesh(path: str, mesh: Mesh, crease_angle: float = 30) -> None:
+    mesh, normals = vertex_normals(mesh, crease_angle)
+    low = mesh.vertices.min(axis=0)
+    high = mesh.vertices.max(axis=0)
+    extent = np.where(high > low, high - low, 1)
+    index_size = 2 if len(mesh.vertices) <= 0x10000 else 4
+    header = np.zeros(1, HEADER)
+    header[0] = (MAGIC, VERSION, index_size, len(mesh.vertices), mesh.triangles.size, low, high)
+    positions = np.round((mesh.vertices - low) / extent * 0xffff).astype("<u2")
+    body = positions.tobytes() + encode_octahedral(normals).tobytes()
+    with open(path, "wb") as f:
+        f.write(header.tobytes())
+        f.write(body)
+        f.write(bytes(-(HEADER.itemsize + len(body)) % 4))
+        f.write(mesh.triangles.astype("<u2" if index_size == 2 else "<u4").tobytes())
+
+
+def read_kmesh(path: str) -> tuple[Mesh, np.ndarray]:
+    """Dequantized mesh and its unit vertex normals."""
+    with open(path, "rb") as f:
+        data = f.read()
+    header = np.frombuffer(data, HEADER, 1)[0]
+    if header["magic"] != MAGIC or header["version"] != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} kmesh file")
+    count = int(header["vertex_count"])
+    offset = HEADER.itemsize
+    positions = np.frombuffer(data, "<u2", count * 3, offset).reshape(-1, 3)
+    offset += positions.nbytes
+    normals = np.frombuffer(data, np.int8, count * 2, offset).reshape(-1, 2)
+    offset += normals.nbytes
+    offset += -offset % 4
+    indices = np.frombuffer(data, "<u2" if header["index_size"] == 2 else "<u4", int(header["index_count"]), offset)
+    low = header["min"].astype(np.float64)
+    extent = np.where(header["max"] > low, header["max"] - low, 1)
+    vertices = low + positions / 0xffff * extent
+    return Mesh(vertices, indices.reshape(-1, 3).astype(np.int64)), decode_octahedral(normals)
@@ -0,0 +1,110 @@
+"""Robot dimensions and arm layout shared by the CAD parts and the URDF."""
+from dataclasses import dataclass
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from transform import Placement, Rotation, Vector  # noqa: E402
+
+
+@dataclass
+class Segment:
+    """Segment of the robot arm."""
+
+    placement: Placement
+    """Relative placement of the next segment."""
+
+    axis: Vector
+    """Axis of rotation."""
+
+
+TOLERANCE = 0.2
+JOINT_SHAFT_LENGTH = 100
+SHAFT_TO_PLATE = 10
+PLATE_THICKNESS = 6
+TACKLE_PULLEY_RADIUS = 5 / 2
+
+EXTRA_PULLEYS_PER_JOINT = 3
+NUMBER_OF_MOTORS = 8
+TENDON_RADIUS = 1 / 2
+
+PULLEY_RADIUS = 10 / 2
+PULLEY_HEIGHT = 4
+PULLEY_HOLE_RADIUS = 7.4 / 2
+JOINT_PULLEY_SPACING = 6
+
+ARM_START_Z = 11.25
+VERTICAL_GAP_BETWEEN_MOTORS = JOINT_PULLEY_SPACING * 4 - 2 * ARM_START_Z
+
+SEGMENTS = [
+    Segment(
+        Placement(
+            Vector(0, 0, 0),
+            Rotation(0, 0, 0),
+        ),
+        "0 0 1",
+    ),
+    Segment(
+        Placement(
+            Vector(-(JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE), 0, JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE),
+            Rotation(Vector(0, -1, 0), -90),
+        ),
+        "0 0 1",
+    ),
+    Segment(
+        Placement(
+            Vector(-(JOINT_SHAFT_LENGTH + 2 * SHAFT_TO_PLATE), 0, 0),
+            Rotation(Vector(0, 1, 0), 0),
+        ),
+        "0 0 1",
+    ),
+    Segment(
+        Placement(
+            Vector(-(JOINT_SHAFT_LENGTH + 2 * SHAFT_TO_PLATE), 0, 0),
+            Rotation(Vector(0, 1, 0), 0),
+        ),
+        "0 0 1",
+    ),
+    Segment(
+        Placement(
+            Vector(-(JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE), 0, JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE),
+            Rotation(Vector(0, 1, 0), 90),
+        ),
+        "0 0 1",
+    ),
+    Segment(
+        Placement(
+            Vector(-SHAFT_TO_PLATE, 0, -SHAFT_TO_PLATE),
+            Rotation(Vector(0, 1, 0), -90),
+        ),
+        "0 0 1",
+    ),
+]
+
+BRACKET_THICKNESS = 4
+MOTOR_LENGTH = 28.5
+MOTOR_WIDTH = 46.5
+MOTOR_SPACING = 30
+
+SEGMENT_THICKNESS = 20
+
+JOINT_SHAFT_OD = 5
+JOINT_SHAFT_ID = 4
+JOINT_SHAFT_COLOR = (0.5, 0.0, 0.0, 0.0)
+JOINT_SHAFT_PULLEY_AREA_LENGTH = 70
+
+JOINT_GEAR_TEETH = 11
+JOINT_GEAR_HEIGHT = (JOINT_SHAFT_LENGTH - 14 * JOINT_PULLEY_SPACING) / 2
+
+JETSON_HOLE_DIAMETER = 2.7
+JETSON_VERTICAL_DISTANCE_BETWEEN_HOLES = 60.5 - JETSON_HOLE_DIAMETER
+JETSON_HORIZONTAL_DISTANCE_BETWEEN_HOLES = 88.7 - JETSON_HOLE_DIAMETER
+
+# Mesh levels of detail: linear deflection relative to the part bounding box
+# diagonal and angular deflection in degrees
+LODS = {
+    "print": (0.0002, 5),
+    "web": (0.002, 30),
+}
+PRINT_LOD = "print"
+URDF_LOD = "web"
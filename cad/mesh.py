@@ -0,0 +1,337 @@
+from dataclasses import dataclass
+from heapq import heapify, heappop, heappush
+from itertools import count
+import numpy as np
+
+
+@dataclass
+class Mesh:
+    """Indexed triangle mesh."""
+
+    vertices: np.ndarray
+    """Vertex positions, float array of shape (n, 3)."""
+
+    triangles: np.ndarray
+    """Vertex indices of counter clockwise triangles, int array of shape (m, 3)."""
+
+    def corners(self) -> np.ndarray:
+        """Triangle corner positions of shape (m, 3, 3)."""
+        return self.vertices[self.triangles]
+
+    def normals(self) -> np.ndarray:
+        """Unit triangle normals, zero for degenerate triangles."""
+        corners = self.corners()
+        normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+        return np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+
+
+def weld(corners: np.ndarray) -> Mesh:
+    """Indexed mesh from triangle corners of shape (m, 3, 3), merging identical positions."""
+    vertices, inverse = np.unique(corners.reshape(-1, 3), axis=0, return_inverse=True)
+    return Mesh(vertices, inverse.reshape(-1, 3))
+
+
+def read_stl(path: str) -> Mesh:
+    with open(path, "rb") as f:
+        data = f.read()
+    count = int.from_bytes(data[80:84], "little") if len(data) >= 84 else -1
+    if len(data) == 84 + count * 50:
+        records = np.frombuffer(data, np.dtype([
+            ("normal", "<f4", 3),
+            ("corners", "<f4", (3, 3)),
+            ("attributes", "<u2"),
+        ]), count, 84)
+        corners = records["corners"]
+    else:
+        corners = np.array([
+            line.split()[1:4] for line in data.decode().splitlines() if line.lstrip().startswith("vertex")
+        ], dtype=np.float32).reshape(-1, 3, 3)
+    return weld(corners.astype(np.float64))
+
+
+def write_stl(path: str, mesh: Mesh) -> None:
+    records = np.zeros(len(mesh.triangles), np.dtype([
+        ("normal", "<f4", 3),
+        ("corners", "<f4", (3, 3)),
+        ("attributes", "<u2"),
+    ]))
+    records["normal"] = mesh.normals()
+    records["corners"] = mesh.corners()
+    with open(path, "wb") as f:
+        f.write(b"kiaukutas".ljust(80))
+        f.write(len(records).to_bytes(4, "little"))
+        f.write(records.tobytes())
+
+
+def point_triangle_distances(points: np.ndarray, corners: np.ndarray) -> np.ndarray:
+    """Distance from every point (n, 3) to every triangle (m, 3, 3) as an (n, m) array."""
+    p = points[:, None, :]
+    a, b, c = corners[None, :, 0], corners[None, :, 1], corners[None, :, 2]
+    ab, ac, ap = b - a, c - a, p - a
+    normal = np.cross(ab, ac)
+    area = np.einsum("...i,...i", normal, normal)
+    # Barycentric coordinates of the projection onto the triangle plane
+    v = np.einsum("...i,...i", np.cross(ap, ac), normal)
+    w = np.einsum("...i,...i", np.cross(ab, ap), normal)
+    inside = (v >= 0) & (w >= 0) & (v + w <= area) & (area > 0)
+    plane = np.abs(np.einsum("...i,...i", ap, normal)) / np.sqrt(np.where(area > 0, area, 1))
+
+    def segment(start, end):
+        direction = end - start
+        length = np.einsum("...i,...i", direction, direction)
+        t = np.clip(np.einsum("...i,...i", p - start, direction) / np.where(length > 0, length, 1), 0, 1)
+        return np.linalg.norm(p - start - t[..., None] * direction, axis=-1)
+
+    edges = np.minimum(np.minimum(segment(a, b), segment(b, c)), segment(c, a))
+    return np.where(inside, plane, edges)
+
+
+def _plane_quadrics(mesh: Mesh) -> np.ndarray:
+    """Quadric of the plane of every triangle and of a perpendicular plane through every open edge."""
+    normals = mesh.normals()
+    offsets = -np.einsum("ij,ij->i", normals, mesh.vertices[mesh.triangles[:, 0]])
+    planes = np.concatenate([normals, offsets[:, None]], 1)
+    quadrics = np.zeros((len(mesh.vertices), 4, 4))
+    for k in range(3):
+        np.add.at(quadrics, mesh.triangles[:, k], planes[:, :, None] * planes[:, None, :])
+    edges = np.sort(mesh.triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    unique, inverse, counts = np.unique(edges, axis=0, return_inverse=True, return_counts=True)
+    open_edges = counts[inverse.reshape(-1)] == 1
+    if open_edges.any():
+        start = mesh.vertices[edges[open_edges, 0]]
+        end = mesh.vertices[edges[open_edges, 1]]
+        face_normals = np.repeat(normals, 3, axis=0)[open_edges]
+        side = np.cross(end - start, face_normals)
+        lengths = np.linalg.norm(side, axis=1, keepdims=True)
+        side = np.divide(side, lengths, out=np.zeros_like(side), where=lengths > 0)
+        planes = np.concatenate([side, -np.einsum("ij,ij->i", side, start)[:, None]], 1)
+        for k in range(2):
+            np.add.at(quadrics, edges[open_edges, k], planes[:, :, None] * planes[:, None, :])
+    return quadrics
+
+
+def _collapse_targets(quadrics: np.ndarray, start: np.ndarray, end: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Position minimising the summed quadric of an edge and its error, for a batch of edges."""
+    a = quadrics[:, :3, :3]
+    b = quadrics[:, :3, 3]
+    invertible = np.abs(np.linalg.det(a)) > 1e-12
+    positions = (start + end) / 2
+    if invertible.any():
+        positions[invertible] = -np.linalg.solve(a[invertible], b[invertible][:, :, None])[:, :, 0]
+    candidates = np.stack([positions, start, end, (start + end) / 2], 1)
+    homogeneous = np.concatenate([candidates, np.ones(candidates.shape[:2] + (1,))], 2)
+    errors = np.einsum("nki,nij,nkj->nk", homogeneous, quadrics, homogeneous)
+    # The unconstrained optimum can be far away for nearly singular quadrics
+    errors[~invertible, 0] = np.inf
+    best = np.argmin(errors, axis=1)
+    rows = np.arange(len(best))
+    return candidates[rows, best], np.maximum(errors[rows, best], 0)
+
+
+def decimate(mesh: Mesh, max_triangles: int, max_deviation: float) -> Mesh:
+    """
+    Quadric error edge collapse (Garland & Heckbert) down to max_triangles.
+    Every vertex keeps the original vertices merged into it and collapses
+    which would leave any of them further than max_deviation from the new
+    surface around the collapsed vertex are rejected.
+    """
+    vertices = mesh.vertices.copy()
+    triangles = mesh.triangles.tolist()
+    quadrics = _plane_quadrics(mesh)
+    alive = [True] * len(triangles)
+    live_triangles = len(triangles)
+    version = [0] * len(vertices)
+    vertex_triangles: list[set[int]] = [set() for _ in range(len(vertices))]
+    for t, triangle in enumerate(triangles):
+        for v in triangle:
+            vertex_triangles[v].add(t)
+    merged = [vertices[v:v + 1] for v in range(len(vertices))]
+    order = count()
+
+    def neighbours(v: int) -> set[int]:
+        return {w for t in vertex_triangles[v] for w in triangles[t]} - {v}
+
+    def candidates(u: int, others: list[int]) -> list:
+        others = np.array(others)
+        positions, errors = _collapse_targets(
+            quadrics[u] + quadrics[others], vertices[[u] * len(others)], vertices[others]
+        )
+        return [
+            (errors[k], next(order), u, int(others[k]), version[u], version[others[k]], positions[k])
+            for k in range(len(others))
+        ]
+
+    edges = np.unique(np.sort(mesh.triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1), axis=0)
+    positions, errors = _collapse_targets(
+        quadrics[edges[:, 0]] + quadrics[edges[:, 1]], vertices[edges[:, 0]], vertices[edges[:, 1]]
+    )
+    heap = [
+        (errors[k], next(order), int(edges[k, 0]), int(edges[k, 1]), 0, 0, positions[k])
+        for k in range(len(edges))
+    ]
+    heapify(heap)
+    while live_triangles > max_triangles and len(heap) > 0:
+        _, _, u, v, version_u, version_v, position = heappop(heap)
+        if version[u] != version_u or version[v] != version_v:
+            continue
+        shared = vertex_triangles[u] & vertex_triangles[v]
+        # Collapsing an edge whose end points have other common neighbours makes the surface non-manifold
+        if len(neighbours(u) & neighbours(v)) != len(shared):
+            continue
+        changed = list((vertex_triangles[u] | vertex_triangles[v]) - shared)
+        if len(changed) == 0:
+            continue
+        corners = vertices[[triangles[t] for t in changed]]
+        before = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        moved = np.array([[w in (u, v) for w in triangles[t]] for t in changed])
+        corners[moved] = position
+        after = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+        # Reject collapses flipping the remaining triangles around the edge
+        if np.any(np.einsum("ij,ij->i", before, after) <= 1e-3 * np.einsum("ij,ij->i", before, before)):
+            continue
+        # Original vertices merged into the edge or its neighbours have to stay close to the new surface
+        ring = (neighbours(u) | neighbours(v)) - {u, v}
+        nearby = list({t for w in ring for t in vertex_triangles[w]} - shared - set(changed))
+        if len(nearby) > 0:
+            corners = np.concatenate([corners, vertices[[triangles[t] for t in nearby]]])
+        points = np.concatenate([merged[u], merged[v]])
+        distances = point_triangle_distances(np.concatenate([points] + [merged[w] for w in ring]), corners)
+        if distances.min(axis=1).max() > max_deviation:
+            continue
+        for t in shared:
+            alive[t] = False
+            live_triangles -= 1
+            for w in triangles[t]:
+                vertex_triangles[w].discard(t)
+        for t in vertex_triangles[v]:
+            triangles[t] = [u if w == v else w for w in triangles[t]]
+        vertex_triangles[u] |= vertex_triangles[v]
+        vertex_triangles[v] = set()
+        vertices[u] = position
+        merged[u] = points
+        merged[v] = points[:0]
+        quadrics[u] += quadrics[v]
+        version[u] += 1
+        version[v] = -1
+        others = list(neighbours(u))
+        if len(others) > 0:
+            for entry in candidates(u, others):
+                heappush(heap, entry)
+    kept = np.array([triangles[t] for t in range(len(triangles)) if alive[t]], dtype=np.int64).reshape(-1, 3)
+    used, remapped = np.unique(kept, return_inverse=True)
+    return Mesh(vertices[used], remapped.reshape(-1, 3))
+
+
+def vertex_normals(mesh: Mesh, crease_angle: float = 30) -> tuple[Mesh, np.ndarray]:
+    """
+    Area weighted vertex normals smoothed across edges sharper than
+    crease_angle degrees. Vertices on creases are split so that every corner
+    gets the normal of the faces on its own side. Returns the split mesh and
+    its unit normals.
+    """
+    corners = mesh.corners()
+    cross = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+    face_normals = mesh.normals()
+    positions = mesh.triangles.reshape(-1)
+    order = np.argsort(positions, kind="stable")
+    sorted_positions = positions[order]
+    starts = np.searchsorted(sorted_positions, sorted_positions, "left")
+    sizes = np.searchsorted(sorted_positions, sorted_positions, "right") - starts
+    # Pair every corner with all corners sharing its position
+    first = np.repeat(np.arange(len(order)), sizes)
+    second = np.repeat(starts - np.cumsum(sizes) + sizes, sizes) + np.arange(sizes.sum())
+    first, second = order[first], order[second]
+    first_faces, second_faces = first // 3, second // 3
+    cosines = np.einsum("ij,ij->i", face_normals[first_faces], face_normals[second_faces])
+    smooth = cosines >= np.cos(np.radians(crease_angle))
+    normals = np.zeros((len(positions), 3))
+    np.add.at(normals, first[smooth], cross[second_faces[smooth]] / 2)
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    normals = np.divide(normals, lengths, out=np.zeros_like(normals), where=lengths > 0)
+    keys, inverse = np.unique(
+        np.concatenate([positions[:, None].astype(np.float64), np.round(normals, 4)], 1),
+        axis=0,
+        return_inverse=True,
+    )
+    return Mesh(mesh.vertices[keys[:, 0].astype(np.int64)], inverse.reshape(-1, 3)), keys[:, 1:]
+
+
+def concatenate(meshes: list[Mesh]) -> Mesh:
+    offsets = np.cumsum([0] + [len(mesh.vertices) for mesh in meshes])
+    return Mesh(
+        np.concatenate([mesh.vertices for mesh in meshes]).reshape(-1, 3),
+        np.concatenate([mesh.triangles + offset for mesh, offset in zip(meshes, offsets)]).reshape(-1, 3),
+    )
+
+
+def transformed(mesh: Mesh, matrix: np.ndarray) -> Mesh:
+    """Mesh with vertices transformed by a homogeneous 4x4 matrix."""
+    triangles = mesh.triangles if np.linalg.det(matrix[:3, :3]) > 0 else mesh.triangles[:, ::-1]
+    return Mesh(mesh.vertices @ matrix[:3, :3].T + matrix[:3, 3], triangles)
+
+
+def cylinder(radius: float, length: float, segments: int = 12) -> Mesh:
+    """Closed cylinder along the z axis centered at the origin, like the URDF <cylinder>."""
+    angles = np.arange(segments) * 2 * np.pi / segments
+    ring = np.stack([radius * np.cos(angles), radius * np.sin(angles), np.zeros(segments)], 1)
+    vertices = np.concatenate([
+        ring - [0, 0, length / 2],
+        ring + [0, 0, length / 2],
+        [[0, 0, -length / 2], [0, 0, length / 2]],
+    ])
+    i = np.arange(segments)
+    j = (i + 1) % segments
+    bottom, top = 2 * segments, 2 * segments + 1
+    triangles = np.concatenate([
+        np.stack([i, j, j + segments], 1),
+        np.stack([i, j + segments, i + segments], 1),
+        np.stack([np.full(segments, bottom), j, i], 1),
+        np.stack([np.full(segments, top), i + segments, j + segments], 1),
+    ])
+    return Mesh(vertices, triangles)
+
+
+def tube(points: np.ndarray, radius: float, closed: bool = False, segments: int = 12) -> Mesh:
+    """
+    Polyline of shape (n, 3) swept by a circle. Consecutive rings share
+    vertices and are oriented by parallel transport so the tube doesn't twist,
+    open ends are capped.
+    """
+    count = len(points)
+    steps = np.diff(np.concatenate([points, points[:1]]) if closed else points, axis=0)
+    steps /= np.linalg.norm(steps, axis=1, keepdims=True)
+    if closed:
+        tangents = steps + np.roll(steps, 1, axis=0)
+    else:
+        tangents = np.concatenate([steps[:1], steps[:-1] + steps[1:], steps[-1:]])
+    tangents /= np.linalg.norm(tangents, axis=1, keepdims=True)
+    normal = np.cross(tangents[0], np.eye(3)[np.argmin(np.abs(tangents[0]))])
+    normals = [normal / np.linalg.norm(normal)]
+    for tangent in tangents[1:]:
+        normal = normals[-1] - tangent * np.dot(normals[-1], tangent)
+        normals.append(normal / np.linalg.norm(normal))
+    normals = np.array(normals)
+    binormals = np.cross(tangents, normals)
+    angles = np.arange(segments) * 2 * np.pi / segments
+    vertices = points[:, None] + radius * (
+        np.cos(angles)[None, :, None] * normals[:, None] + np.sin(angles)[None, :, None] * binormals[:, None]
+    )
+    vertices = vertices.reshape(-1, 3)
+    ring = np.arange(count if closed else count - 1)[:, None] * segments
+    next_ring = (ring + segments) % (count * segments)
+    i = np.arange(segments)[None, :]
+    j = (i + 1) % segments
+    triangles = [
+        np.stack([ring + i, ring + j, next_ring + j], -1).reshape(-1, 3),
+        np.stack([ring + i, next_ring + j, next_ring + i], -1).reshape(-1, 3),
+    ]
+    if not closed:
+        start, end = len(vertices), len(vertices) + 1
+        vertices = np.concatenate([vertices, points[:1], points[-1:]])
+        last = (count - 1) * segments
+        triangles += [
+            np.stack([np.full(segments, start), j[0], i[0]], 1),
+            np.stack([np.full(segments, end), last + i[0], last + j[0]], 1),
+        ]
+    return Mesh(vertices, np.concatenate(triangles))
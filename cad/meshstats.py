@@ -0,0 +1,122 @@
+"""
+Size of the meshes an URDF places, from the entries of meshes.json:
+
+    {"winch.web.stl": {"kmesh": ..., "vertices": ..., "triangles": ..., "stl_bytes": ..., "kmesh_bytes": ...}}
+
+Bytes are of what the viewer downloads, the kmesh when there is one. Every
+mesh counts once per visual placing it towards the triangles of the scene
+and once towards its download size. Budgets limit triangles and bytes of
+single meshes and of the whole scene.
+"""
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from typing import Optional
+import os
+import xml.etree.ElementTree as ET
+
+
+class BudgetExceeded(Exception):
+    """Meshes over their triangle or byte budgets."""
+
+
+@dataclass
+class MeshStats:
+    vertices: int
+    triangles: int
+    bytes: int
+    instances: int = 0
+    """Number of visuals placing the mesh."""
+
+
+@dataclass
+class Budget:
+    """Upper limits, None for no limit."""
+
+    triangles: Optional[int] = None
+    bytes: Optional[int] = None
+
+
+def mesh_stats(root: ET.Element, manifest: dict[str, dict]) -> dict[str, MeshStats]:
+    """Statistics of the meshes placed by visuals of an URDF by file name."""
+    stats = {}
+    for mesh in root.findall("link/visual/geometry/mesh"):
+        name = os.path.basename(mesh.get("filename"))
+        if name not in stats:
+            entry = manifest[name]
+            size = entry["kmesh_bytes"] if "kmesh" in entry else entry["stl_bytes"]
+            stats[name] = MeshStats(entry["vertices"], entry["triangles"], size)
+        stats[name].instances += 1
+    return stats
+
+
+def link_stats(root: ET.Element, meshes: dict[str, MeshStats]) -> dict[str, MeshStats]:
+    """Statistics of the meshes placed by each link, instances counting visuals."""
+    stats = {}
+    for link in root.iter("link"):
+        total = MeshStats(0, 0, 0)
+        for element in link.findall("visual/geometry/mesh"):
+            mesh = meshes[os.path.basename(element.get("filename"))]
+            total.vertices += mesh.vertices
+            total.triangles += mesh.triangles
+            total.bytes += mesh.bytes
+            total.instances += 1
+        stats[link.get("name")] = total
+    return stats
+
+
+def scene_stats(meshes: dict[str, MeshStats]) -> MeshStats:
+    """Vertices and triangles of all instances, bytes of the distinct meshes."""
+    return MeshStats(
+        sum(mesh.vertices * mesh.instances for mesh in meshes.values()),
+        sum(mesh.triangles * mesh.instances for mesh in meshes.values()),
+        sum(mesh.bytes for mesh in meshes.values()),
+        sum(mesh.instances for mesh in meshes.values()),
+    )
+
+
+def report(meshes: dict[str, MeshStats], links: dict[str, MeshStats]) -> str:
+    """Tables of meshes and links by scene triangles, shares in % of the scene."""
+    scene = scene_stats(meshes)
+    lines = [
+        f"{'mesh':40} {'vertices':>9} {'triangles':>9} {'bytes':>9} {'instances':>9} "
+        f"{'scene triangles':>15} {'%':>5} {'% bytes':>7}"
+    ]
+    for name, mesh in sorted(meshes.items(), key=lambda item: -item[1].triangles * item[1].instances):
+        triangles = mesh.triangles * mesh.instances
+        share = 100 * triangles / max(scene.triangles, 1)
+        lines.append(
+            f"{name[:40]:40} {mesh.vertices:9} {mesh.triangles:9} {mesh.bytes:9} {mesh.instances:9} "
+            f"{triangles:15} {share:5.1f} {100 * mesh.bytes / max(scene.bytes, 1):7.1f}"
+        )
+    lines += ["", f"{'link':40} {'vertices':>9} {'triangles':>9} {'bytes':>9} {'visuals':>9} {'%':>5}"]
+    for name, link in sorted(links.items(), key=lambda item: -item[1].triangles):
+        if link.instances:
+            lines.append(
+                f"{name[:40]:40} {link.vertices:9} {link.triangles:9} {link.bytes:9} {link.instances:9} "
+                f"{100 * link.triangles / max(scene.triangles, 1):5.1f}"
+            )
+    lines += ["", f"{'scene':40} {scene.vertices:9} {scene.triangles:9} {scene.bytes:9} {scene.instances:9}"]
+    return "\n".join(lines) + "\n"
+
+
+def over_budget(name: str, stats: MeshStats, budget: Budget) -> list[str]:
+    """Descriptions of the limits of budget stats exceed."""
+    excesses = []
+    if budget.triangles is not None and stats.triangles > budget.triangles:
+        excesses.append(f"{name} has {stats.triangles} triangles, budget {budget.triangles}")
+    if budget.bytes is not None and stats.bytes > budget.bytes:
+        excesses.append(f"{name} has {stats.bytes} bytes, budget {budget.bytes}")
+    return excesses
+
+
+def check_budgets(meshes: dict[str, MeshStats], budgets: dict[str, Budget], scene_budget: Budget) -> list[str]:
+    """
+    Exceeded budgets, of meshes by the first glob pattern matching their part
+    name and of the scene with triangles of all instances.
+    """
+    excesses = []
+    for name, mesh in meshes.items():
+        part = name.split(".")[0]
+        budget = next((budget for pattern, budget in budgets.items() if fnmatchcase(part, pattern)), Budget())
+        excesses += over_budget(name, mesh, budget)
+    return excesses + over_budget("scene", scene_stats(meshes), scene_budget)
@@ -1,128 +1,92 @@
-from dataclasses import dataclass
-from FreeCAD import newDocument, Placement, Rotation, Vector
-from math import asin, cos, degrees, pi, radians, sin, sqrt
-from freecad.gears.commands import CreateInvoluteGear
-from typing import Optional
+from argparse import ArgumentParser
+from FreeCAD import listDocuments, newDocument, Vector, Version
+from math import cos, pi, radians, sin, sqrt
+from functools import partial
+from hashlib import sha256
+from typing import Callable, Union
 from shutil import copyfile
 import xml.etree.ElementTree as ET
+import MeshPart
 import Part
+import json
+import numpy as np
+import os
 import sys
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from tracing import finish, span  # noqa: E402
+
+with span("import freecad.gears"):
+    from freecad import gears  # noqa: E402
+    from freecad.gears.commands import CreateInvoluteGear  # noqa: E402
+
+from bake import bake_links  # noqa: E402
+from cache import ArtifactCache, fingerprint  # noqa: E402
+from collision import CollisionMap, apply_limits, collision_map  # noqa: E402
+from colliders import HULL_VERTICES, Capsule, add_collisions, decompose, fit_capsule  # noqa: E402
+import csg  # noqa: E402
+from inertia import MassProperties, add_inertials, mesh_properties, shape_properties  # noqa: E402
+from gltf import write_glb  # noqa: E402
+from kmesh import HEADER, write_kmesh  # noqa: E402
+from layout import (  # noqa: E402
+    ARM_START_Z,
+    JOINT_GEAR_HEIGHT,
+    JOINT_GEAR_TEETH,
+    JOINT_PULLEY_SPACING,
+    JOINT_SHAFT_ID,
+    JOINT_SHAFT_LENGTH,
+    JOINT_SHAFT_OD,
+    LODS,
+    PLATE_THICKNESS,
+    PULLEY_HEIGHT,
+    PULLEY_HOLE_RADIUS,
+    PULLEY_RADIUS,
+    SEGMENT_THICKNESS,
+    TACKLE_PULLEY_RADIUS,
+    TENDON_RADIUS,
+    TOLERANCE,
+    URDF_LOD,
+    VERTICAL_GAP_BETWEEN_MOTORS,
+)
+from mesh import decimate, read_stl, write_stl  # noqa: E402
+from meshstats import Budget, BudgetExceeded, check_budgets, link_stats, mesh_stats, report  # noqa: E402
+from targets import Target, build, resolve, script_args  # noqa: E402
+from tendons import Wrap, tube_tendons  # noqa: E402
+from urdf import make_urdf, mesh_file  # noqa: E402
 
-@dataclass
-class Segment:
-    """Segment of the robot arm."""
-
-    placement: Placement
-    """Relative placement of the next segment."""
-
-    axis: Vector
-    """Axis of rotation."""
-
-
-TOLERANCE = 0.2
-JOINT_SHAFT_LENGTH = 100
-SHAFT_TO_PLATE = 10
-PLATE_THICKNESS = 6
-TACKLE_PULLEY_RADIUS = 5 / 2
-
-EXTRA_PULLEYS_PER_JOINT = 3
-NUMBER_OF_MOTORS = 8
-TENDON_RADIUS = 1 / 2
-
-PULLEY_RADIUS = 10 / 2
-PULLEY_HEIGHT = 4
-PULLEY_HOLE_RADIUS = 7.4 / 2
-JOINT_PULLEY_SPACING = 6
-
-ARM_START_Z = 11.25
-VERTICAL_GAP_BETWEEN_MOTORS = JOINT_PULLEY_SPACING * 4 - 2 * ARM_START_Z
 
-SEGMENTS = [
-    Segment(
-        Placement(
-            Vector(0, 0, 0),
-            Rotation(0, 0, 0),
-        ),
-        "0 0 1",
-    ),
-    Segment(
-        Placement(
-            Vector(-(JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE), 0, JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE),
-            Rotation(Vector(0, -1, 0), -90),
-        ),
-        "0 0 1",
-    ),
-    Segment(
-        Placement(
-            Vector(-(JOINT_SHAFT_LENGTH + 2 * SHAFT_TO_PLATE), 0, 0),
-            Rotation(Vector(0, 1, 0), 0),
-        ),
-        "0 0 1",
-    ),
-    Segment(
-        Placement(
-            Vector(-(JOINT_SHAFT_LENGTH + 2 * SHAFT_TO_PLATE), 0, 0),
-            Rotation(Vector(0, 1, 0), 0),
-        ),
-        "0 0 1",
-    ),
-    Segment(
-        Placement(
-            Vector(-(JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE), 0, JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE),
-            Rotation(Vector(0, 1, 0), 90),
-        ),
-        "0 0 1",
-    ),
-    Segment(
-        Placement(
-            Vector(-SHAFT_TO_PLATE, 0, -SHAFT_TO_PLATE),
-            Rotation(Vector(0, 1, 0), -90),
-        ),
-        "0 0 1",
-    ),
-]
-
-BRACKET_THICKNESS = 4
-MOTOR_LENGTH = 28.5
-MOTOR_WIDTH = 46.5
-MOTOR_SPACING = 30
-
-SEGMENT_THICKNESS = 20
-
-JOINT_SHAFT_OD = 5
-JOINT_SHAFT_ID = 4
-JOINT_SHAFT_COLOR = (0.5, 0.0, 0.0, 0.0)
-JOINT_SHAFT_PULLEY_AREA_LENGTH = 70
-
-JOINT_GEAR_TEETH = 11
-JOINT_GEAR_HEIGHT = (JOINT_SHAFT_LENGTH - 14 * JOINT_PULLEY_SPACING) / 2
-
-JETSON_HOLE_DIAMETER = 2.7
-JETSON_VERTICAL_DISTANCE_BETWEEN_HOLES = 60.5 - JETSON_HOLE_DIAMETER
-JETSON_HORIZONTAL_DISTANCE_BETWEEN_HOLES = 88.7 - JETSON_HOLE_DIAMETER
-
-doc = newDocument("kiaukutas")
+# FreeCAD keeps documents over imports of this module again by the daemon and
+# watch.py, so the one of an earlier import is reused
+doc = listDocuments().get("kiaukutas") or newDocument("kiaukutas")
 
 
-def make_pulley(
+def make_pulley_profile(
         height: float = PULLEY_HEIGHT,
         pulley_radius: float = PULLEY_RADIUS,
         flange_radius: float = PULLEY_RADIUS + 1,
-        hole_radius: float = PULLEY_HOLE_RADIUS,
-):
-    return Part.makeCylinder(
+) -> csg.Solid:
+    """Pulley with flanges shared by the joint pulleys and the winch."""
+    return csg.makeCylinder(
         pulley_radius, height, Vector(0, 0, 0), Vector(0, 0, 1)
     ).fuse(
-        Part.makeCone(
+        csg.makeCone(
             flange_radius, pulley_radius, 1, Vector(0, 0, 0), Vector(0, 0, 1)
         )
     ).fuse(
-        Part.makeCone(
+        csg.makeCone(
             pulley_radius, flange_radius, 1, Vector(0, 0, height - 1), Vector(0, 0, 1)
         )
-    ).cut(
-        Part.makeCylinder(
+    )
+
+
+def make_pulley(
+        height: float = PULLEY_HEIGHT,
+        pulley_radius: float = PULLEY_RADIUS,
+        flange_radius: float = PULLEY_RADIUS + 1,
+        hole_radius: float = PULLEY_HOLE_RADIUS,
+):
+    return make_pulley_profile(height, pulley_radius, flange_radius).cut(
+        csg.makeCylinder(
             hole_radius, height, Vector(0, 0, 0), Vector(0, 0, 1)
         )
     ).removeSplitter()
@@ -295,6 +259,8 @@ def make_joint_gear(beta: float):
     direction = beta / abs(beta)
     connector_thickness = 3
     result = gear.Proxy.generate_gear_shape(gear)
+    # Only the shape is used, don't collect gear objects in the document
+    gear.Document.removeObject(gear.Name)
 
     if beta < 0:
         polygon = Part.makePolygon([
@@ -319,7 +285,7 @@ def make_joint_gear(beta: float):
     )
 
     return result.fuse(
-        Part.makeBox(SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2, PLATE_THICKNESS + 2 * connector_thickness, gear.height).translate(
+        Part.makeBox(SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2, PLATE_THICKNESS + 2 * connector_thickness, JOINT_GEAR_HEIGHT).translate(
             Vector(JOINT_SHAFT_OD / 2 if direction > 0 else -SEGMENT_THICKNESS / 2, -PLATE_THICKNESS / 2 - connector_thickness, 0)
         ).rotate(
             Vector(0, 0, 0),
@@ -335,8 +301,8 @@ def make_joint_gear(beta: float):
     # ).fuse(
     #     solid_left
     ).cut(  # Blunt gear teeth
-        Part.makeBox(SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2, PLATE_THICKNESS + 2 * connector_thickness, gear.height * 2).translate(
-            Vector(JOINT_SHAFT_OD / 2 + (SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2) if direction > 0 else -SEGMENT_THICKNESS / 2 - (SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2), -PLATE_THICKNESS / 2 - connector_thickness, -gear.height / 2)
+        Part.makeBox(SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2, PLATE_THICKNESS + 2 * connector_thickness, JOINT_GEAR_HEIGHT * 2).translate(
+            Vector(JOINT_SHAFT_OD / 2 + (SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2) if direction > 0 else -SEGMENT_THICKNESS / 2 - (SEGMENT_THICKNESS / 2 - JOINT_SHAFT_OD / 2), -PLATE_THICKNESS / 2 - connector_thickness, -JOINT_GEAR_HEIGHT / 2)
         )
     ).cut(  # Connector hole
         Part.makeCylinder(
@@ -368,47 +334,37 @@ def make_joint_gear(beta: float):
 
 
 def make_winch():
-    winch = Part.makeCylinder(
+    winch = csg.makeCylinder(
         19.5 / 2, 3, Vector(0, 0, 0), Vector(0, 0, 1)
     ).fuse(
-        Part.makeCone(
-            12 / 2, 10 / 2, 1, Vector(0, 0, 3), Vector(0, 0, 1)
-        )
-    ).fuse(
-        Part.makeCylinder(
-            PULLEY_RADIUS, PULLEY_HEIGHT, Vector(0, 0, 3), Vector(0, 0, 1)
-        )
-    ).fuse(
-        Part.makeCone(
-            PULLEY_RADIUS, 12 / 2, 1, Vector(0, 0, 3 + PULLEY_HEIGHT - 1), Vector(0, 0, 1)
-        )
+        make_pulley_profile().translate(Vector(0, 0, 3))
     ).cut(
-        Part.makeCylinder(
+        csg.makeCylinder(
             2 / 2, 10, Vector(0, 0, 3 + PULLEY_HEIGHT / 2), Vector(0, 1, 0)
         )
     )
 
     for i in range(8):
         winch = winch.cut(
-            Part.makeCylinder(
+            csg.makeCylinder(
                 2.2 / 2, 1, Vector(8 * sin(i * 2 * pi / 8), 8 * cos(i * 2 * pi / 8), 0), Vector(0, 0, 1)
             )
         ).cut(
-            Part.makeCylinder(
+            csg.makeCylinder(
                 4 / 2, 2, Vector(8 * sin(i * 2 * pi / 8), 8 * cos(i * 2 * pi / 8), 1), Vector(0, 0, 1)
             )
         )
 
     return winch.cut(
-        Part.makeCylinder(
+        csg.makeCylinder(
             6 / 2, 3 + PULLEY_HEIGHT + 1, Vector(0, 0, 0), Vector(0, 0, 1)
         )
     ).cut(
-        Part.makeCylinder(
+        csg.makeCylinder(
             8.3 / 2, 2.3, Vector(0, 0, 0), Vector(0, 0, 1)
         )
     ).cut(
-        Part.makeCone(
+        csg.makeCone(
             8.3 / 2, 8.3 / 2 - 2, 2, Vector(0, 0, 2.3), Vector(0, 0, 1)
         )
     ).removeSplitter()
@@ -421,86 +377,86 @@ def make_arm_to_body_joiner():
     depth = PLATE_THICKNESS + motor_plate_depth
     plate_thickness = 3
     motor_plate_y = PLATE_THICKNESS + (SEGMENT_THICKNESS - PLATE_THICKNESS) / 2
-    return Part.makeBox(  # Bar for tackle pulleys
+    return csg.makeBox(  # Bar for tackle pulleys
         PLATE_THICKNESS, PLATE_THICKNESS, JOINT_SHAFT_LENGTH
     ).fuse(  # Bottom jointer
-        Part.makeBox(
+        csg.makeBox(
             PLATE_THICKNESS, depth, PLATE_THICKNESS
         )
     ).fuse(  # Top joiner
-        Part.makeBox(
+        csg.makeBox(
             PLATE_THICKNESS, depth, PLATE_THICKNESS
         ).translate(
             Vector(0, 0, JOINT_SHAFT_LENGTH - PLATE_THICKNESS)
         )
     ).fuse(  # Motor plate
-        Part.makeBox(
+        csg.makeBox(
             plate_thickness, motor_plate_depth, motor_plate_height
         ).translate(
             Vector(PLATE_THICKNESS - plate_thickness, motor_plate_y, -ARM_START_Z)
         )
     ).cut(  # Hole for bottom tackle pulley
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS, Vector(0, 0, 0), Vector(0, 1, 0)
         ).translate(
             Vector(PLATE_THICKNESS / 2, 0, JOINT_GEAR_HEIGHT + 2 * JOINT_PULLEY_SPACING)
         )
     ).cut(  # Hole for top tackle pulley
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS, Vector(0, 0, 0), Vector(0, 1, 0)
         ).translate(
             Vector(PLATE_THICKNESS / 2, 0, JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT - 2 * JOINT_PULLEY_SPACING)
         )
     ).cut(  # Close bottom hole for bottom servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5, 46.5 - 11.5 - 4 - 24 - 11)
         )
     ).cut(  # Far bottom hole for bottom servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5 + 12, 46.5 - 11.5 - 4 - 24 - 11)
         )
     ).cut(  # Close top hole for bottom servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5, 46.5 - 11.5 - 4 - 24 - 11 + 24)
         )
     ).cut(  # Far top hole for bottom servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5 + 12, 46.5 - 11.5 - 4 - 24 - 11 + 24)
         )
     ).cut(  # Close bottom hole for top servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5 + (PULLEY_RADIUS + TENDON_RADIUS) * 2, 46.5 - 11.5 - 4 - 24 - 11 + VERTICAL_GAP_BETWEEN_MOTORS + 46.5 + 11 - 3)
         )
     ).cut(  # Far bottom hole for top servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5 + 12 + (PULLEY_RADIUS + TENDON_RADIUS) * 2, 46.5 - 11.5 - 4 - 24 - 11 + VERTICAL_GAP_BETWEEN_MOTORS + 46.5 + 11 - 3)
         )
     ).cut(  # Close top hole for top servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5 + (PULLEY_RADIUS + TENDON_RADIUS) * 2, 46.5 - 11.5 - 4 - 24 - 11 + 24 + VERTICAL_GAP_BETWEEN_MOTORS + 46.5 + 11 - 3)
         )
     ).cut(  # Far top hole for top servo
-        Part.makeCylinder(
+        csg.makeCylinder(
             2.7 / 2, PLATE_THICKNESS * 5, Vector(0, 0, 0), Vector(-1, 0, 0)
         ).translate(
             Vector(PLATE_THICKNESS, 15.5 + 12 + (PULLEY_RADIUS + TENDON_RADIUS) * 2, 46.5 - 11.5 - 4 - 24 - 11 + 24 + VERTICAL_GAP_BETWEEN_MOTORS + 46.5 + 11 - 3)
         )
     ).fuse(
-        make_joint_gear(30.0).rotate(
+        csg.call(make_joint_gear, 30.0).rotate(
             Vector(0, 0, 0),
             Vector(1, 0, 0),
             180,
@@ -508,801 +464,349 @@ def make_arm_to_body_joiner():
             Vector(-SEGMENT_THICKNESS / 2, PLATE_THICKNESS / 2, JOINT_GEAR_HEIGHT)
         )
     ).fuse(
-        make_joint_gear(30.0).translate(
+        csg.call(make_joint_gear, 30.0).translate(
             Vector(-SEGMENT_THICKNESS / 2, PLATE_THICKNESS / 2, JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT)
         )
     ).removeSplitter()
-# add_visual(base, "joint-gear-right", placement=Placement(
-#     Vector(0, 0, 11.25 + JOINT_GEAR_HEIGHT),
-#     Rotation(180, 0, 0),
-# ), rgba="0 0 1 1")
-# add_visual(base, "joint-gear-right", placement=Placement(
-#     Vector(0, 0, 11.25 + JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
-#     Rotation(0, 0, 0),
-# ), rgba="0 0 1 1")
-
-
-def add_origin(
-    element: ET.Element,
-    xyz: str = "0 0 0",
-    rpy: str = "0 0 0",
-    placement: Optional[Placement] = None
-) -> ET.Element:
-    if placement is not None:
-        xyz = " ".join(str(x) for x in placement.Base)
-        rpy = " ".join(str(radians(x)) for x in placement.Rotation.toEuler())
-    return ET.SubElement(element, "origin", {"xyz": xyz, "rpy": rpy})
-
-
-def add_visual(
-        link: ET.Element,
-        stl: str,
-        xyz: str = "0 0 0",
-        rpy: str = "0 0 0",
-        rgba: str = "1 1 1 1",
-        placement: Optional[Placement] = None,
-        name: Optional[str] = None
-):
-    visual = ET.SubElement(link, "visual")
-    add_origin(visual, xyz, rpy, placement)
-    geometry = ET.SubElement(visual, "geometry")
-    ET.SubElement(geometry, "mesh", {"filename": f"{stl}.stl"})
-    material = ET.SubElement(visual, "material", {"name": "" if name is None else name})
-    if name is None:
-        ET.SubElement(material, "color", {"rgba": rgba})
-
-
-def add_tendon(
-        link: ET.Element,
-        length: float,
-        placement: Placement,
-        index: int = 0,
-):
-    visual = ET.SubElement(link, "visual")
-    add_origin(
-        visual,
-        placement=placement.multiply(
-            Placement(
-                Vector(0, 0, length / 2),
-                Rotation(0, 0, 0),
-            )
-        )
-    )
-    geometry = ET.SubElement(visual, "geometry")
-    ET.SubElement(
-        geometry,
-        "cylinder",
-        {
-            "radius": f"{TENDON_RADIUS}",
-            "length": f"{length}",
-        }
-    )
-    ET.SubElement(visual, "material", {"name": f"tendon{index}"})
-
-
-dir = sys.argv[3]
-copyfile("XM430-W350-T.stl", f"{dir}/XM430-W350-T.stl")
-copyfile("jetson.stl", f"{dir}/jetson.stl")
-pulley = make_pulley()
-pulley.exportStl(f"{dir}/shaft-pulley.stl")
-pulley.exportStep(f"{dir}/shaft-pulley.stp")
-tackle_pulley = make_tackle_pulley()
-tackle_pulley.exportStl(f"{dir}/tackle-pulley.stl")
-tackle_pulley.exportStep(f"{dir}/tackle-pulley.stp")
-tackle_pulley_tendon = make_tackle_pulley_tendon()
-tackle_pulley_tendon.exportStl(f"{dir}/tackle-pulley-tendon.stl")
-tackle_pulley_tendon.exportStep(f"{dir}/tackle-pulley-tendon.stp")
-direction_changing_pulley_tendon = make_direction_changing_pulley_tendon()
-direction_changing_pulley_tendon.exportStl(f"{dir}/direction-changing-pulley-tendon.stl")
-direction_changing_pulley_tendon.exportStep(f"{dir}/direction-changing-pulley-tendon.stp")
-wrap_joint_pulley_tendon = make_wrap_joint_pulley_tendon()
-wrap_joint_pulley_tendon.exportStl(f"{dir}/wrap_joint_pulley_tendon.stl")
-wrap_joint_pulley_tendon.exportStep(f"{dir}/wrap_joint_pulley_tendon.stp")
-shaft = make_joint_shaft()
-shaft.exportStl(f"{dir}/shaft.stl")
-shaft.exportStep(f"{dir}/shaft.stp")
-segment_plate = make_segment_plate()
-segment_plate.exportStl(f"{dir}/segment-plate.stl")
-segment_plate.exportStep(f"{dir}/segment-plate.stp")
-joint_gear_right = make_joint_gear(30.0)
-joint_gear_right.exportStl(f"{dir}/joint-gear-right.stl")
-joint_gear_right.exportStep(f"{dir}/joint-gear-right.stp")
-joint_gear_left = make_joint_gear(-30.0)
-joint_gear_left.exportStl(f"{dir}/joint-gear-left.stl")
-joint_gear_left.exportStep(f"{dir}/joint-gear-left.stp")
-winch = make_winch()
-winch.exportStl(f"{dir}/winch.stl")
-winch.exportStep(f"{dir}/winch.stp")
-arm_to_body_joiner = make_arm_to_body_joiner()
-arm_to_body_joiner.exportStl(f"{dir}/arm_to_body_joiner.stl")
-arm_to_body_joiner.exportStep(f"{dir}/arm_to_body_joiner.stp")
-
-root = ET.Element("robot", {"name": "kiaukutas"})
-
-
-def define_material(name: str, r: float, g: float, b: float, a: float = 1) -> None:
-    global root
-    material = ET.SubElement(root, "material", {"name": name})
-    ET.SubElement(material, "color", {"rgba": f"{r} {g} {b} {a}"})
-
-
-define_material("tendon0", 1, 0, 0)  # Red
-define_material("tendon1", 1, 165 / 255, 0)  # Orange
-define_material("tendon2", 1, 1, 0)  # Yellow
-define_material("tendon3", 0, 1, 0)  # Green
-define_material("tendon4", 0, 1, 1)  # Cyan
-define_material("tendon5", 0, 0, 1)  # Blue
-define_material("tendon6", 127 / 255, 0, 1)  # Violet
-define_material("tendon7", 165 / 255, 42 / 255, 42 / 255)  # Brown
-
-
-base = ET.SubElement(root, "link", {"name": "base"})
-# add_visual(base, "joint-gear-right", placement=Placement(
-#     Vector(0, 0, 11.25 + JOINT_GEAR_HEIGHT),
-#     Rotation(180, 0, 0),
-# ), rgba="0 0 1 1")
-# add_visual(base, "joint-gear-right", placement=Placement(
-#     Vector(0, 0, 11.25 + JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
-#     Rotation(0, 0, 0),
-# ), rgba="0 0 1 1")
-add_visual(base, "arm_to_body_joiner", placement=Placement(
-    Vector(SEGMENT_THICKNESS / 2, -PLATE_THICKNESS / 2, 11.25),
-    Rotation(0, 0, 0),
-), rgba="0.5 0.5 0.5 1")
-
-add_visual(
-    base,
-    "jetson",
-    rgba="0.05 0.05 0.05 1",
-    placement=Placement(
-        Vector(15, 230, 155),
-        Rotation(-90, 0, -90),
-    )
-)
 
-for i in range(NUMBER_OF_MOTORS // 2):
-    offset = 28.5 / 2 + SEGMENT_THICKNESS / 2 + PLATE_THICKNESS
-    add_visual(  # Bottom
-        base,
-        "XM430-W350-T",
-        f"{i * 30 + offset} {34 / 2 - 0.5 + PULLEY_HEIGHT / 2} {46.5 - 11.25 + i * JOINT_PULLEY_SPACING}",
-        f"{pi / 2} 0 0",
-        "0.05 0.05 0.05 1"
-    )
-    add_visual(  # Top
-        base,
-        "XM430-W350-T",
-        f"{i * 30 + offset} {34 / 2 + 0.5 + PULLEY_HEIGHT / 2 + PULLEY_RADIUS * 2} {46.5 + 11.25 + i * JOINT_PULLEY_SPACING + VERTICAL_GAP_BETWEEN_MOTORS}",
-        f"{pi / 2} {pi} 0",
-        "0.05 0.05 0.05 1"
-    )
-    add_visual(  # Bottom
-        base,
-        "winch",
-        f"{i * 30 + offset} {-PULLEY_RADIUS + PULLEY_HEIGHT / 2 + 3 - TENDON_RADIUS} {46.5 - 11.25 + i * JOINT_PULLEY_SPACING}",
-        f"{pi / 2} 0 0"
-    )
-    add_visual(  # Top
-        base,
-        "winch",
-        f"{i * 30 + offset} {PULLEY_RADIUS + PULLEY_HEIGHT / 2 + 3 + TENDON_RADIUS} {46.5 - 11.25 + (i + 4) * JOINT_PULLEY_SPACING}",
-        f"{pi / 2} 0 0"
-    )
-    add_tendon(  # Bottom
-        base,
-        i * 30 + offset,
-        Placement(
-            Vector(
-                0,
-                -PULLEY_RADIUS - TENDON_RADIUS,
-                11.25 + JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 3.5),
-            ),
-            Rotation(0, 90, 0),
-        ),
-        i,
-    )
-    add_tendon(  # Top
-        base,
-        i * 30 + offset,
-        Placement(
-            Vector(
-                0,
-                PULLEY_RADIUS + TENDON_RADIUS,
-                11.25 + JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 3.5 + 4),
-            ),
-            Rotation(0, 90, 0),
-        ),
-        i + 4,
-    )
-
-
-def add_tension_pulleys(
-        link,
-        index: int,
-        placement=Placement(Vector(0, 0, 0), Rotation(0, 0, 0)),
-        direction: int = 1,
-):
-    add_visual(link, "tackle-pulley", placement=placement.multiply(
-        Placement(
-            Vector(
-                SHAFT_TO_PLATE + PLATE_THICKNESS / 2,
-                (-PULLEY_RADIUS - TENDON_RADIUS - 2.1 + (2.1 - 0.6) / 2) * direction,
-                JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 if direction == 1 else -1),
-            ),
-            Rotation(0 if direction == 1 else 180, 0, 0),
-        )
-    ), rgba="0.3 0.2 0.6 1")
-    add_visual(
-        link,
-        "tackle-pulley-tendon",
-        placement=placement.multiply(
-            Placement(
-                Vector(
-                    SHAFT_TO_PLATE + 7 / 2,
-                    (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
-                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 if direction == 1 else -1),
-                ),
-                Rotation(0, 0, 0),
-            )
-        ),
-        name=f"tendon{index}"
-    )
-    for k in range(3):
-        add_tendon(
-            link,
-            7 / 2 + SHAFT_TO_PLATE,
-            placement.multiply(
-                Placement(
-                    Vector(
-                        SHAFT_TO_PLATE + 7 / 2,
-                        (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
-                        JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (0.5 + k * direction),
-                    ),
-                    Rotation(0, -90, 0),
-                )
-            ),
-            index,
-        )
-
-
-def add_non_direction_changing_tendons(tendons: list[Optional[int]]) -> None:
-    for i in range(len(tendons)):
-        if tendons[i] is not None:
-            front_side = tendons[i] > 0
-            length = JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE * 2
-            add_tendon(
-                link,
-                length,
-                Placement(
-                    Vector(
-                        -length,
-                        PULLEY_RADIUS + TENDON_RADIUS if not front_side else -PULLEY_RADIUS - TENDON_RADIUS,
-                        JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 1) - JOINT_PULLEY_SPACING / 2,
-                    ),
-                    Rotation(0, 90, 0),
-                ),
-                abs(tendons[i]),
-            )
 
-
-def add_far_tension_pulleys(link, i: int, motor_index: int, direction: bool) -> None:
-    for j in range(0, 3, 2):
-        add_visual(link, "tackle-pulley", placement=Placement(
-            Vector(
-                -SHAFT_TO_PLATE - 7 / 2,
-                (-PULLEY_RADIUS - TENDON_RADIUS - 2.1 + (2.1 - 0.6) / 2) * direction,
-                JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 - j * direction + 1 + i),
-            ),
-            Rotation(0 if direction == 1 else 180, 0, 0),
-        ), rgba="0.3 0.2 0.6 1")
-        # Far side of block and tackle
-        for k in [-JOINT_PULLEY_SPACING / 2, JOINT_PULLEY_SPACING / 2]:
-            add_tendon(
-                link,
-                7 / 2 + SHAFT_TO_PLATE,
-                Placement(
-                    Vector(
-                        -SHAFT_TO_PLATE - 7 / 2,
-                        (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
-                        JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 - j * direction + 1 + i) + k,
-                    ),
-                    Rotation(0, 90, 0),
-                ),
-                motor_index,
-            )
-        add_visual(
-            link,
-            "tackle-pulley-tendon",
-            placement=Placement(
-                Vector(
-                    -SHAFT_TO_PLATE - 7 / 2,
-                    (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
-                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 - j * direction + 1 + i),
-                ),
-                Rotation(0, 180, 0),
-            ),
-            name=f"tendon{motor_index}"
-        )
-
-
-def add_joint_tendons(
-    prev_link,
-    link1,
-    link2,
-    tendons: list[Optional[tuple[int, str]]],  # motor_index, type
-    bottom_pulley1: Optional[Placement] = None,
-    top_pulley1: Optional[Placement] = None,
-    bottom_pulley2: bool = False,
-    top_pulley2: bool = False,
-    direction_changing_pulleys: Optional[list[Optional[tuple[int, int, int]]]] = None,
+TOOLCHAIN = f"FreeCAD {'.'.join(Version()[:3])}, freecad.gears {getattr(gears, '__version__', 'unknown')}"
+
+PARTS = {
+    "shaft-pulley": (make_pulley,),
+    "tackle-pulley": (make_tackle_pulley,),
+    "tackle-pulley-tendon": (make_tackle_pulley_tendon,),
+    "direction-changing-pulley-tendon": (make_direction_changing_pulley_tendon,),
+    "wrap_joint_pulley_tendon": (make_wrap_joint_pulley_tendon,),
+    "shaft": (make_joint_shaft,),
+    "segment-plate": (make_segment_plate,),
+    "joint-gear-right": (make_joint_gear, 30.0),
+    "joint-gear-left": (make_joint_gear, -30.0),
+    "winch": (make_winch,),
+    "arm_to_body_joiner": (make_arm_to_body_joiner,),
+}
+
+
+# Material density of parts in g/mm³, printed in PLA unless listed
+DENSITY = 1.24e-3
+TENDON_DENSITY = 0.97e-3  # UHMWPE line
+DENSITIES = {
+    "shaft": 1.55e-3,  # Carbon fibre tube
+    "tackle-pulley-tendon": TENDON_DENSITY,
+    "direction-changing-pulley-tendon": TENDON_DENSITY,
+    "wrap_joint_pulley_tendon": TENDON_DENSITY,
+}
+
+VENDOR_MESHES = ["XM430-W350-T.stl", "jetson.stl"]
+
+# Mass in g of bought parts, spread uniformly over their mesh. Meshes not
+# listed are left out of the link inertials.
+VENDOR_MASSES = {
+    "XM430-W350-T": 82.0,
+}
+
+# Collision geometry of parts at URDF_LOD and vendor meshes, "capsule" or the
+# number of convex hulls, one hull unless listed and none for 0. With more
+# hulls the decomposition follows concave parts closer.
+COLLIDERS = {
+    "shaft": "capsule",
+    "segment-plate": 8,
+    "joint-gear-right": 4,
+    "joint-gear-left": 4,
+    "tackle-pulley-tendon": 0,
+    "direction-changing-pulley-tendon": 0,
+    "wrap_joint_pulley_tendon": 0,
+    "XM430-W350-T": 1,
+}
+
+# Decimated stand-ins for vendor meshes used at URDF_LOD: triangle budget and
+# maximum distance of the original vertices from the proxy surface
+PROXY_MESHES = {
+    "XM430-W350-T": (5000, 0.1),
+}
+
+
+# Upper limits of triangles and downloaded bytes of the meshes placed by
+# robot.urdf, by the first glob pattern matching the part name, and of the
+# scene with every placement counted. The build fails when any is exceeded,
+# see mesh-report.txt for where triangles and bytes go.
+MESH_BUDGETS = {
+    "XM430-W350-T": Budget(triangles=PROXY_MESHES["XM430-W350-T"][0]),
+    "*": Budget(triangles=50_000, bytes=1_000_000),
+}
+SCENE_BUDGET = Budget(triangles=1_000_000, bytes=16_000_000)
+
+
+def export_stl(shape: Part.Shape, path: str, lod: str) -> None:
+    linear, angular = LODS[lod]
+    with span("tessellate", lod=lod):
+        mesh = MeshPart.meshFromShape(
+            Shape=shape,
+            LinearDeflection=linear * shape.BoundBox.DiagonalLength,
+            AngularDeflection=radians(angular),
+            Relative=False,
+        )
+    with span("write stl", lod=lod):
+        mesh.write(path)
+
+
+def part_key(builder: Callable, args: tuple) -> str:
+    """Cache key of the files of a part."""
+    return fingerprint(builder, *args, salt=f"{TOOLCHAIN}, LODs {LODS}")
+
+
+def mass_key(key: str) -> str:
+    """Cache key of the mass properties of a part, fingerprint doesn't follow shape_properties into inertia.py."""
+    return fingerprint(shape_properties, salt=f"{key}, {fingerprint(MassProperties.save)}")
+
+
+def export_part(cache: ArtifactCache, name: str, builder: Callable, args: tuple, dir: str, targets: list[str]) -> None:
+    key = part_key(builder, args)
+    files = {target: f"{dir}/{target}" for target in targets}
+    masses = {target: files.pop(target) for target in targets if target == f"{name}.mass.json"}
+    restored = cache.restore(key, files)
+    if restored and cache.restore(mass_key(key), masses):
+        return
+    with span(f"build {name}"):
+        shape = csg.evaluate(builder(*args))
+    if not restored:
+        for lod in LODS:
+            if mesh_file(name, lod) in files:
+                export_stl(shape, files[mesh_file(name, lod)], lod)
+        if f"{name}.stp" in files:
+            with span("write step"):
+                shape.exportStep(files[f"{name}.stp"])
+        cache.store(key, files)
+    if masses:
+        shape_properties(shape).save(masses[f"{name}.mass.json"])
+        cache.store(mass_key(key), masses)
+
+
+def copy_vendor_mesh(dir: str, targets: list[str]) -> None:
+    for target in targets:
+        copyfile(target, f"{dir}/{target}")
+
+
+def write_vendor_mass(dir: str, targets: list[str]) -> None:
+    for target in targets:
+        mesh_properties(read_stl(f"{target.removesuffix('.mass.json')}.stl")).save(f"{dir}/{target}")
+
+
+def make_proxy_mesh(
+        cache: ArtifactCache,
+        name: str,
+        max_triangles: int,
+        max_deviation: float,
+        dir: str,
+        targets: list[str],
 ) -> None:
-    first_motor_index: Optional[int] = None
-    first_tendon_index: Optional[int] = None
-    last_motor_index: Optional[int] = None
-    last_tendon_index: Optional[int] = None
-    for i in range(len(tendons)):
-        if tendons[i] is not None:
-            motor_index = tendons[i][0]
-            if first_motor_index is None:
-                first_motor_index = motor_index
-                first_tendon_index = i
-            last_motor_index = motor_index
-            last_tendon_index = i
-            tendon_type = tendons[i][1]
-            if tendon_type in ["top", "bottom"]:
-                add_tendon(
-                    link1,
-                    SEGMENT_THICKNESS,
-                    Placement(
-                        Vector(
-                            0,
-                            (PULLEY_RADIUS + TENDON_RADIUS) * (1 if tendon_type != "top" else -1),
-                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
-                        ),
-                        Rotation(0, -90, 0),
-                    ),
-                    motor_index,
-                )
-            else:
-                angle_radians = asin((PULLEY_RADIUS + TENDON_RADIUS) / (SEGMENT_THICKNESS / 2))
-                angle_degrees = degrees(angle_radians)
-                offset_x = sin(angle_radians) * (PULLEY_RADIUS + TENDON_RADIUS)
-                offset_y = cos(angle_radians) * (PULLEY_RADIUS + TENDON_RADIUS)
-                add_tendon(
-                    link1,
-                    2 * sqrt((SEGMENT_THICKNESS / 2) ** 2 - (PULLEY_RADIUS + TENDON_RADIUS) ** 2),
-                    Placement(
-                        Vector(
-                            -offset_x,
-                            -offset_y if tendon_type == "falling" else offset_y,
-                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
-                        ),
-                        Rotation(0, -90, -angle_degrees if tendon_type == "falling" else angle_degrees),
-                    ),
-                    motor_index,
-                )
-            add_visual(link1, "wrap_joint_pulley_tendon", placement=Placement(
-                Vector(
-                    0,
-                    0,
-                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
-                ),
-                Rotation(0, 0, 0),
-            ), name=f"tendon{motor_index}")
-            add_visual(link2, "wrap_joint_pulley_tendon", placement=Placement(
-                Vector(
-                    0,
-                    0,
-                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
-                ),
-                Rotation(0, 0, 0),
-            ), name=f"tendon{motor_index}")
-            add_visual(
-                link1,
-                "shaft-pulley",
-                placement=placement.multiply(
-                    Placement(
-                        Vector(0, 0, JOINT_GEAR_HEIGHT + i * JOINT_PULLEY_SPACING + (JOINT_PULLEY_SPACING - PULLEY_HEIGHT) / 2),
-                        Rotation(0, 0, 0),
-                    )
-                )
-            )
-            add_visual(
-                link2,
-                "shaft-pulley",
-                placement=placement.multiply(
-                    Placement(
-                        Vector(0, 0, JOINT_GEAR_HEIGHT + i * JOINT_PULLEY_SPACING + (JOINT_PULLEY_SPACING - PULLEY_HEIGHT) / 2),
-                        Rotation(0, 0, 0),
-                    )
-                )
-            )
-    if bottom_pulley1 is not None:
-        add_tension_pulleys(
-            prev_link,
-            first_motor_index,
-            bottom_pulley1.multiply(
-                Placement(
-                    Vector(
-                        0,
-                        0,
-                        JOINT_PULLEY_SPACING * first_tendon_index,
-                    ),
-                    Rotation(0, 0, 0),
-                )
-            ),
-            1,
-        )
-    if top_pulley1 is not None:
-        add_tension_pulleys(
-            prev_link,
-            last_motor_index,
-            top_pulley1.multiply(
-                Placement(
-                    Vector(
-                        0,
-                        0,
-                        JOINT_PULLEY_SPACING * last_tendon_index,
-                    ),
-                    Rotation(0, 0, 0),
-                )
-            ),
-            -1,
-        )
-    if bottom_pulley2:
-        add_far_tension_pulleys(link, first_tendon_index, first_motor_index, 1)
-    if top_pulley2:
-        add_far_tension_pulleys(link, last_tendon_index - 5, last_motor_index, -1)
-    if direction_changing_pulleys is not None:
-        for i in range(len(direction_changing_pulleys)):
-            if direction_changing_pulleys[i] is not None:
-                motor_index = abs(direction_changing_pulleys[i][2])
-                front_side = direction_changing_pulleys[i][2] > 0
-                src = direction_changing_pulleys[i][0]
-                dest = abs(direction_changing_pulleys[i][1])
-                inverted = direction_changing_pulleys[i][1] < 0
-                horizontal_tendon_length = JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT - dest * JOINT_PULLEY_SPACING + JOINT_PULLEY_SPACING / 2 + TENDON_RADIUS * 2
-                vertical_tendon_length = JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT - src * JOINT_PULLEY_SPACING + JOINT_PULLEY_SPACING / 2 + TENDON_RADIUS * 2
-                if inverted:
-                    vertical_tendon_length = JOINT_SHAFT_LENGTH - vertical_tendon_length + SEGMENT_THICKNESS / 2
-                add_visual(link2, "tackle-pulley", placement=Placement(
-                    Vector(
-                        -horizontal_tendon_length,
-                        PULLEY_RADIUS + TENDON_RADIUS + 2.1 - (2.1 - 0.6) / 2 if not front_side else -PULLEY_RADIUS - TENDON_RADIUS - 2.1 + (2.1 - 0.6) / 2,
-                        JOINT_GEAR_HEIGHT + (src + 1) * JOINT_PULLEY_SPACING - ((TACKLE_PULLEY_RADIUS + TENDON_RADIUS) * 2 if inverted else 0),
-                    ),
-                    Rotation(0, 0, 180 if not front_side else 0),
-                ), rgba="0.3 0.2 0.6 1")
-                add_visual(link2, "direction-changing-pulley-tendon", placement=Placement(
-                    Vector(
-                        -horizontal_tendon_length,
-                        -(PULLEY_RADIUS + TENDON_RADIUS) if front_side else (PULLEY_RADIUS + TENDON_RADIUS),
-                        JOINT_GEAR_HEIGHT + (src + 1) * JOINT_PULLEY_SPACING - ((TACKLE_PULLEY_RADIUS + TENDON_RADIUS) * 2 if inverted else 0),
-                    ),
-                    Rotation(0, 180 + (90 if inverted else 0), 0),
-                ), name=f"tendon{motor_index}")
-                # Horizontal tendon
-                add_tendon(
-                    link2,
-                    horizontal_tendon_length,
-                    Placement(
-                        Vector(
-                            0,
-                            PULLEY_RADIUS + TENDON_RADIUS if not front_side else -PULLEY_RADIUS - TENDON_RADIUS,
-                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (src + 1) - JOINT_PULLEY_SPACING / 2,
-                        ),
-                        Rotation(0, -90, 0),
-                    ),
-                    motor_index,
-                )
-                # Vertical tendon
-                add_tendon(
-                    link2,
-                    vertical_tendon_length,
-                    Placement(
-                        Vector(
-                            -horizontal_tendon_length - JOINT_PULLEY_SPACING / 2,
-                            PULLEY_RADIUS + TENDON_RADIUS if not front_side else -PULLEY_RADIUS - TENDON_RADIUS,
-                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (src + 1.5) - JOINT_PULLEY_SPACING / 2 - ((TACKLE_PULLEY_RADIUS + TENDON_RADIUS) * 2 if inverted else 0),
-                        ),
-                        Rotation(0, 180 if inverted else 0, 0),
-                    ),
-                    motor_index,
-                )
-
-
-initial_placement = Placement(Vector(0, 0, 11.25), Rotation(0, 0, 0))
-placement = Placement(Vector(0, 0, 0), Rotation(0, 0, 0))
-prev_link = base
-for i in range(len(SEGMENTS)):
-    segment = SEGMENTS[i]
-
-    first_link = ET.SubElement(root, "link", {"name": f"segment{i}a"})
-    add_visual(first_link, "shaft", placement=placement, rgba="0 1 0 1")
-
-    link = ET.SubElement(root, "link", {"name": f"segment{i}b"})
-    add_visual(link, "shaft", placement=placement, rgba="1 0 0 1")
-    add_visual(link, "joint-gear-left", placement=Placement(
-        Vector(0, 0, JOINT_GEAR_HEIGHT),
-        Rotation(180, 0, 0),
-    ), rgba="0 1 1 1")
-    add_visual(link, "joint-gear-left", placement=Placement(
-        Vector(0, 0, JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
-        Rotation(0, 0, 0),
-    ), rgba="0 1 1 1")
-    add_visual(
-        link,
-        "segment-plate",
-        placement=placement.multiply(
-            Placement(
-                Vector(-JOINT_SHAFT_LENGTH - SHAFT_TO_PLATE, 0, 0),
-                Rotation(0, 0, 0),
-            )
-        ),
-        rgba="1 1 1 0.5",
+    with open(f"{name}.stl", "rb") as f:
+        key = fingerprint(decimate, max_triangles, max_deviation, salt=sha256(f.read()).hexdigest())
+    files = {target: f"{dir}/{target}" for target in targets}
+    if cache.restore(key, files):
+        return
+    proxy = decimate(read_stl(f"{name}.stl"), max_triangles, max_deviation)
+    for path in files.values():
+        write_stl(path, proxy)
+    cache.store(key, files)
+
+
+def make_hulls(cache: ArtifactCache, name: str, count: int, dir: str, targets: list[str]) -> None:
+    source = f"{dir}/{mesh_file(name, URDF_LOD)}"
+    with open(source, "rb") as f:
+        key = fingerprint(decompose, count, HULL_VERTICES, salt=sha256(f.read()).hexdigest())
+    files = {target: f"{dir}/{target}" for target in targets}
+    if cache.restore(key, files):
+        return
+    for i, hull in enumerate(decompose(read_stl(source), count, HULL_VERTICES)):
+        if f"{name}.hull{i}.stl" in files:
+            write_stl(files[f"{name}.hull{i}.stl"], hull)
+    cache.store(key, files)
+
+
+def convert_to_kmesh(dir: str, targets: list[str]) -> None:
+    for target in targets:
+        write_kmesh(f"{dir}/{target}", read_stl(f"{dir}/{target.removesuffix('.kmesh')}.stl"))
+
+
+def write_mesh_manifest(kmeshes: list[str], dir: str, targets: list[str]) -> None:
+    manifest = {}
+    for kmesh in kmeshes:
+        stl = f"{kmesh.removesuffix('.kmesh')}.stl"
+        with open(f"{dir}/{kmesh}", "rb") as f:
+            header = np.frombuffer(f.read(HEADER.itemsize), HEADER)[0]
+        manifest[stl] = {
+            "kmesh": kmesh,
+            "vertices": int(header["vertex_count"]),
+            "triangles": int(header["index_count"]) // 3,
+            "stl_bytes": os.path.getsize(f"{dir}/{stl}"),
+            "kmesh_bytes": os.path.getsize(f"{dir}/{kmesh}"),
+        }
+    with open(f"{dir}/meshes.json", "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+def write_mesh_report(dir: str, targets: list[str]) -> None:
+    root = ET.parse(f"{dir}/robot.urdf").getroot()
+    with open(f"{dir}/meshes.json") as f:
+        meshes = mesh_stats(root, json.load(f))
+    with open(f"{dir}/mesh-report.txt", "w") as f:
+        f.write(report(meshes, link_stats(root, meshes)))
+    excesses = check_budgets(meshes, MESH_BUDGETS, SCENE_BUDGET)
+    if excesses:
+        raise BudgetExceeded(f"Mesh budgets exceeded, see {dir}/mesh-report.txt: {'; '.join(excesses)}")
+
+
+def write_collision_map(cache: ArtifactCache, dir: str, targets: list[str]) -> None:
+    root = make_urdf()
+    digest = sha256(ET.tostring(root))
+    for filename in sorted({mesh.get("filename") for mesh in root.iter("mesh")}):
+        with open(f"{dir}/{filename}", "rb") as f:
+            digest.update(f.read())
+    key = fingerprint(collision_map, salt=digest.hexdigest())
+    files = {"collision.map": f"{dir}/collision.map"}
+    if cache.restore(key, files):
+        return
+    collision_map(root, dir).save(files["collision.map"])
+    cache.store(key, files)
+
+
+def part_mass_properties(dir: str) -> dict[str, MassProperties]:
+    """Mass properties of parts and vendor meshes with a known mass, by name."""
+    parts = {}
+    for name in PARTS:
+        parts[name] = MassProperties.load(f"{dir}/{name}.mass.json").scaled(DENSITIES.get(name, DENSITY))
+    for name, mass in VENDOR_MASSES.items():
+        properties = MassProperties.load(f"{dir}/{name}.mass.json")
+        parts[name] = properties.scaled(mass / properties.mass)
+    return parts
+
+
+def collider_names() -> dict[str, Union[str, int]]:
+    """Collider kind of every part and vendor mesh getting collision geometry."""
+    colliders = {name: COLLIDERS.get(name, 1) for name in PARTS}
+    colliders.update(COLLIDERS)
+    return {name: collider for name, collider in colliders.items() if collider != 0}
+
+
+def part_colliders(dir: str) -> dict[str, list[Union[Capsule, str]]]:
+    """Capsules and convex hull mesh files of parts, by name."""
+    colliders = {}
+    for name, collider in collider_names().items():
+        if collider == "capsule":
+            colliders[name] = [fit_capsule(read_stl(f"{dir}/{mesh_file(name, URDF_LOD)}"))]
+        else:
+            colliders[name] = [f"{name}.hull{i}.stl" for i in range(collider)]
+    return colliders
+
+
+def make_built_urdf(dir: str) -> ET.Element:
+    """
+    Robot with joint limits derived from the collision map, link inertials
+    summed from the parts and simplified collision geometry.
+    """
+    root = make_urdf()
+    apply_limits(root, CollisionMap.load(f"{dir}/collision.map").limits())
+    add_inertials(root, part_mass_properties(dir), TENDON_DENSITY)
+    return add_collisions(root, part_colliders(dir))
+
+
+def write_urdf(dir: str, targets: list[str]) -> None:
+    root = make_built_urdf(dir)
+    with span("serialize urdf"):
+        ET.ElementTree(root).write(f"{dir}/robot.urdf")
+
+
+def write_baked_urdf(dir: str, targets: list[str]) -> None:
+    ET.ElementTree(bake_links(make_built_urdf(dir), dir)).write(f"{dir}/robot.baked.urdf")
+
+
+def write_tendon_urdf(dir: str, targets: list[str]) -> None:
+    wraps = {
+        mesh_file("tackle-pulley-tendon", URDF_LOD): Wrap(TACKLE_PULLEY_RADIUS + TENDON_RADIUS, (0, 1, 0)),
+        mesh_file("direction-changing-pulley-tendon", URDF_LOD): Wrap(TACKLE_PULLEY_RADIUS + TENDON_RADIUS, (0, 1, 0)),
+        mesh_file("wrap_joint_pulley_tendon", URDF_LOD): Wrap(PULLEY_RADIUS + TENDON_RADIUS, closed=True),
+    }
+    root = tube_tendons(make_built_urdf(dir), dir, wraps, TENDON_RADIUS)
+    ET.ElementTree(root).write(f"{dir}/robot.tendons.urdf")
+
+
+def write_robot_glb(dir: str, targets: list[str]) -> None:
+    write_glb(make_built_urdf(dir), dir, f"{dir}/robot.glb")
+
+
+def make_targets(cache: ArtifactCache) -> dict[str, Target]:
+    targets = {}
+    for name in VENDOR_MESHES:
+        targets[name] = Target(name, copy_vendor_mesh, local=True)
+    for name, (builder, *args) in PARTS.items():
+        recipe = partial(export_part, cache, name, builder, tuple(args))
+        for file in [mesh_file(name, lod) for lod in LODS] + [f"{name}.stp", f"{name}.mass.json"]:
+            targets[file] = Target(file, recipe)
+    for name in VENDOR_MASSES:
+        targets[f"{name}.mass.json"] = Target(f"{name}.mass.json", write_vendor_mass)
+    for name, (max_triangles, max_deviation) in PROXY_MESHES.items():
+        file = mesh_file(name, URDF_LOD)
+        targets[file] = Target(file, partial(make_proxy_mesh, cache, name, max_triangles, max_deviation))
+    for stl in [name for name in targets if name.endswith(".stl")]:
+        kmesh = f"{stl.removesuffix('.stl')}.kmesh"
+        targets[kmesh] = Target(kmesh, convert_to_kmesh, [stl])
+    urdf_meshes = sorted({mesh.get("filename") for mesh in make_urdf().iter("mesh")})
+    # Only meshes the viewer loads, so it doesn't wait for print resolution tessellations
+    kmeshes = [f"{stl.removesuffix('.stl')}.kmesh" for stl in sorted(set(urdf_meshes + VENDOR_MESHES))]
+    targets["meshes.json"] = Target("meshes.json", partial(write_mesh_manifest, kmeshes), kmeshes)
+    # Convex hulls for <collision>, without kmesh conversion
+    hulls = []
+    for name, collider in collider_names().items():
+        if collider != "capsule":
+            recipe = partial(make_hulls, cache, name, collider)
+            for file in [f"{name}.hull{i}.stl" for i in range(collider)]:
+                targets[file] = Target(file, recipe, [mesh_file(name, URDF_LOD)])
+                hulls.append(file)
+    # Self-collisions over the joint ranges, joint limits of the URDFs are derived from it
+    targets["collision.map"] = Target("collision.map", partial(write_collision_map, cache), urdf_meshes)
+    # Link inertials are summed from mass properties of the parts at unit density
+    masses = [f"{name}.mass.json" for name in list(PARTS) + list(VENDOR_MASSES)]
+    built = urdf_meshes + masses + hulls + ["collision.map"]
+    targets["robot.urdf"] = Target("robot.urdf", write_urdf, built, local=True)
+    # Triangles and bytes per mesh and link, fails when over budget
+    targets["mesh-report.txt"] = Target("mesh-report.txt", write_mesh_report, ["robot.urdf", "meshes.json"])
+    # Optional URDF with one mesh per link and material
+    targets["robot.baked.urdf"] = Target("robot.baked.urdf", write_baked_urdf, built)
+    # Optional URDF with one tube mesh per tendon and link
+    targets["robot.tendons.urdf"] = Target("robot.tendons.urdf", write_tendon_urdf, built)
+    # Whole robot in one file with repeated parts instanced
+    targets["robot.glb"] = Target("robot.glb", write_robot_glb, built)
+    return targets
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(
+        prog="parts.py",
+        description="Build robot parts and URDF. Worker count is taken from KIAUKUTAS_JOBS, "
+        "artifact cache location from KIAUKUTAS_CACHE and trace file from KIAUKUTAS_TRACE environment variables.",
     )
-
-    match i:
-        case 0:
-            add_joint_tendons(
-                prev_link,
-                first_link,
-                link,
-                [
-                    (0, "top"),
-                    (0, "top"),
-                    (0, "top"),
-                    (0, "top"),
-                    (1, "falling"),
-                    (2, "falling"),
-                    (3, "falling"),
-                    (4, "rising"),
-                    (5, "rising"),
-                    (6, "rising"),
-                    (7, "bottom"),
-                    (7, "bottom"),
-                    (7, "bottom"),
-                    (7, "bottom"),
-                ],
-                Placement(Vector(0, 0, ARM_START_Z), Rotation(0, 0, 0)),
-                Placement(Vector(0, 0, ARM_START_Z), Rotation(0, 0, 0)),
-                True,
-                False,
-                [
-                    None,
-                    None,
-                    None,
-                    None,
-                    (7, 4, 4),
-                    (8, 5, 5),
-                    (4, 6, -1),
-                    (5, 7, -2),
-                    (6, 8, -3),
-                    (9, 9, 6),
-                    (10, 10, -7),
-                    (11, 11, -7),
-                    (12, 12, -7),
-                    (13, 13, -7)
-                ],
-            )
-        case 1:
-            add_non_direction_changing_tendons([
-                None, 4, 4, 4, 4, -5, 1, 2, 3, -6, None, None, None, None
-            ])
-            add_joint_tendons(
-                prev_link,
-                first_link,
-                link,
-                [
-                    None,
-                    (4, "top"),
-                    (4, "top"),
-                    (4, "top"),
-                    (4, "top"),
-                    (5, "falling"),
-                    (1, "rising"),
-                    (2, "rising"),
-                    (3, "rising"),
-                    (6, "falling"),
-                    (7, "bottom"),
-                    (7, "bottom"),
-                    (7, "bottom"),
-                    (7, "bottom"),
-                ],
-                SEGMENTS[i].placement.multiply(
-                    Placement(
-                        Vector(
-                            0,
-                            0,
-                            0,  # JOINT_PULLEY_SPACING * (i + 1),
-                        ),
-                        Rotation(0, 0, 0),
-                    )
-                ),
-                None,
-                False,
-                True,
-            )
-        case 2:
-            add_non_direction_changing_tendons([
-                None, None, None, None, None, 5, -1, -2, -3, -6, -6, -6, -6, None
-            ])
-            add_joint_tendons(
-                prev_link,
-                first_link,
-                link,
-                [
-                    None,
-                    (4, "top"),
-                    (4, "top"),
-                    (4, "top"),
-                    (4, "top"),
-                    (5, "rising"),
-                    (1, "falling"),
-                    (2, "falling"),
-                    (3, "falling"),
-                    (6, "bottom"),
-                    (6, "bottom"),
-                    (6, "bottom"),
-                    (6, "bottom"),
-                    None,
-                ],
-                None,
-                SEGMENTS[i].placement,
-                True,
-                False,
-            )
-        case 3:
-            add_joint_tendons(
-                prev_link,
-                first_link,
-                link,
-                [
-                    None,
-                    None,
-                    (5, "top"),
-                    (5, "top"),
-                    (5, "top"),
-                    (5, "top"),
-                    (1, "rising"),
-                    (2, "rising"),
-                    (3, "bottom"),
-                    (6, "bottom"),
-                    (6, "bottom"),
-                    (6, "bottom"),
-                    (6, "bottom"),
-                    None,
-                ],
-                SEGMENTS[i].placement,
-                None,
-                False,
-                True,
-                [
-                    None,
-                    None,
-                    (2, 2, 5),
-                    (3, 3, 5),
-                    (4, 4, 5),
-                    (5, 5, 5),
-                    (6, 6, 1),
-                    (7, 7, 2),
-                    (8, 8, -3),
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                ],
-            )
-        case 4:
-            add_joint_tendons(
-                prev_link,
-                first_link,
-                link,
-                [
-                    None,
-                    None,
-                    (5, "top"),
-                    (5, "top"),
-                    (5, "top"),
-                    (5, "top"),
-                    (1, "top"),
-                    (2, "top"),
-                    (3, "bottom"),
-                    (3, "bottom"),
-                    (3, "bottom"),
-                    (3, "bottom"),
-                    None,
-                    None,
-                ],
-                None,
-                SEGMENTS[i].placement,
-                True,
-                False,
-                [
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                    (8, -4, -3),
-                    (9, -3, -3),
-                    (10, -2, -3),
-                    (11, -1, -3),
-                    (6, -7, 1),
-                    (7, -6, 2),
-                    None,
-                    None,
-                ],
-            )
-        case 5:
-            add_joint_tendons(
-                prev_link,
-                first_link,
-                link,
-                [
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                    None,
-                    (1, "top"),
-                    (2, "top"),
-                    None,
-                    (3, "bottom"),
-                    (3, "bottom"),
-                    (3, "bottom"),
-                    (3, "bottom"),
-                    None,
-                ],
-                None,
-                None,  # SEGMENTS[i].placement,
-                False,
-                True,
-                [],
-            )
-
-    if i != len(SEGMENTS) - 1:
-        add_visual(link, "joint-gear-right", placement=SEGMENTS[i + 1].placement.multiply(
-            Placement(
-                Vector(0, 0, JOINT_GEAR_HEIGHT),
-                Rotation(180, 0, 0),
-            ) if SEGMENTS[i + 1].placement.Rotation.Angle == 0 else Placement(
-                Vector(0, 0, JOINT_GEAR_HEIGHT),
-                Rotation(180, 180, 0),
-            )
-        ), rgba="1 0 1 1")
-        add_visual(link, "joint-gear-right", placement=SEGMENTS[i + 1].placement.multiply(
-            Placement(
-                Vector(0, 0, JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
-                Rotation(0, 0, 0),
-            )
-        ), rgba="1 0 1 1")
-    prev_link = link
-
-placement = initial_placement
-for i in range(len(SEGMENTS)):
-    segment = SEGMENTS[i]
-    joint = ET.SubElement(root, "joint", {"name": f"joint{i}a", "type": "revolute"})
-    ET.SubElement(joint, "parent", {"link": "base" if i == 0 else f"segment{i - 1}b"})
-    ET.SubElement(joint, "child", {"link": f"segment{i}a"})
-    ET.SubElement(joint, "axis", {"xyz": f"{segment.axis}"})
-    ET.SubElement(joint, "limit", {"lower": f"{-pi / 2}", "upper": f"{pi / 2}", "effort": "1", "velocity": "1"})
-    add_origin(joint, placement=initial_placement if i == 0 else segment.placement)
-
-    joint = ET.SubElement(root, "joint", {"name": f"joint{i}b", "type": "revolute"})
-    ET.SubElement(joint, "parent", {"link": f"segment{i}a"})
-    ET.SubElement(joint, "child", {"link": f"segment{i}b"})
-    ET.SubElement(joint, "mimic", {"joint": f"joint{i}a"})
-    ET.SubElement(joint, "axis", {"xyz": f"{segment.axis}"})
-    ET.SubElement(joint, "limit", {"lower": f"{-pi / 2}", "upper": f"{pi / 2}", "effort": "1", "velocity": "1"})
-    add_origin(joint, placement=Placement(
-        Vector(-SEGMENT_THICKNESS, 0, 0),
-        Rotation(0, 0, 0),
-    ))
-
-ET.ElementTree(root).write(f"{dir}/robot.urdf")
-
-exit(0)
+    parser.add_argument("dir", help="output directory")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        default=["*"],
+        help="target names or glob patterns, e.g. robot.urdf '*.stl' (default: everything)",
+    )
+    args = parser.parse_args(args)
+    targets = make_targets(ArtifactCache())
+    try:
+        resolve(targets, args.targets)
+    except ValueError as e:
+        parser.error(str(e))
+    try:
+        build(targets, args.targets, args.dir)
+    except BudgetExceeded as e:
+        print(e, file=sys.stderr)
+        exit(1)
+    finish()
+
+
+if __name__ == "__main__":
+    main(script_args())
+    exit(0)
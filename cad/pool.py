@@ -0,0 +1,37 @@
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable
+import os
+
+JOBS = int(os.environ.get("KIAUKUTAS_JOBS", os.cpu_count() or 1))
+
+_tasks: dict[str, Callable] = {}
+
+
+def _run(name: str):
+    return _tasks[name]()
+
+
+def run_tasks(tasks: dict[str, Callable], workers: int = JOBS) -> dict[str, Future]:
+    """
+    Start independent tasks in a pool of forked worker processes and return
+    their futures without waiting. Workers inherit the already imported
+    FreeCAD modules and the tasks themselves, only task names are pickled.
+    With a single worker the tasks run inline.
+    """
+    futures = {}
+    if workers <= 1 or len(tasks) <= 1:
+        for name, task in tasks.items():
+            futures[name] = Future()
+            try:
+                futures[name].set_result(task())
+            except Exception as e:
+                futures[name].set_exception(e)
+        return futures
+    _tasks.clear()
+    _tasks.update(tasks)
+    executor = ProcessPoolExecutor(min(workers, len(tasks)), mp_context=get_context("fork"))
+    for name in tasks:
+        futures[name] = executor.submit(_run, name)
+    executor.shutdown(wait=False)
+    return futures
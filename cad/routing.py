@@ -0,0 +1,130 @@
+"""
+Tendon path lengths over the joint angle space:
+
+    python3 routing.py tendon-lengths.npz
+
+Each joint is a pair of mimic revolute joints rolling over two equal pulleys
+and every tendon loops fully around both of them. Turning the joint by q
+changes the wrap on each pulley by q, so a tendon staying on one side of the
+pulleys ("top", "bottom") changes length by 2 r q per pass while crossing
+tendons ("rising", "falling") keep their length. Lengths are therefore a sum
+of per joint contributions, which the lookup tables sample per joint so they
+can be replaced by calibrated measurements.
+"""
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from math import pi
+from typing import Optional
+import numpy as np
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from layout import NUMBER_OF_MOTORS, PULLEY_RADIUS, SEGMENTS, TACKLE_PULLEY_RADIUS, TENDON_RADIUS  # noqa: E402
+from kinematics import joint_limits  # noqa: E402
+from urdf import JOINT_TENDONS, make_urdf  # noqa: E402
+
+# Radius of the tendon center line around joint pulleys and winches
+WRAP_RADIUS = PULLEY_RADIUS + TENDON_RADIUS
+# Wraps per pulley pass in the direction of positive joint rotation
+SIDES = {"top": -2, "bottom": 2, "rising": 0, "falling": 0}
+# Tendon mesh -> radius and wrapped angle
+WRAPS = {
+    "wrap_joint_pulley_tendon": (WRAP_RADIUS, 2 * pi),
+    "tackle-pulley-tendon": (TACKLE_PULLEY_RADIUS + TENDON_RADIUS, pi),
+    "direction-changing-pulley-tendon": (TACKLE_PULLEY_RADIUS + TENDON_RADIUS, pi / 2),
+}
+
+
+def coupling() -> np.ndarray:
+    """Derivative of tendon lengths in mm by joint angles in radians, shape (motors, joints)."""
+    matrix = np.zeros((NUMBER_OF_MOTORS, len(SEGMENTS)))
+    for joint, tendons in enumerate(JOINT_TENDONS):
+        for tendon in tendons:
+            if tendon is not None:
+                matrix[tendon[0], joint] += SIDES[tendon[1]] * WRAP_RADIUS
+    return matrix
+
+
+def rest_lengths(root: Optional[ET.Element] = None) -> np.ndarray:
+    """Tendon lengths in mm with all joints at 0, straight runs and wraps of the URDF summed."""
+    lengths = np.zeros(NUMBER_OF_MOTORS)
+    for visual in (make_urdf() if root is None else root).iter("visual"):
+        material = visual.find("material").get("name") or ""
+        if not material.startswith("tendon"):
+            continue
+        geometry = visual.find("geometry")[0]
+        if geometry.tag == "cylinder":
+            lengths[int(material[6:])] += float(geometry.get("length"))
+        else:
+            name = os.path.basename(geometry.get("filename")).split(".")[0]
+            radius, angle = WRAPS[name]
+            lengths[int(material[6:])] += radius * angle
+    return lengths
+
+
+def tendon_lengths(angles: np.ndarray, rest: Optional[np.ndarray] = None) -> np.ndarray:
+    """Tendon lengths of joint angle configurations of shape (..., joints), shape (..., motors)."""
+    return (rest_lengths() if rest is None else rest) + np.asarray(angles) @ coupling().T
+
+
+def motor_angles(angles: np.ndarray) -> np.ndarray:
+    """Winch rotation in radians from the zero configuration giving the tendon lengths of joint angles."""
+    return np.asarray(angles) @ coupling().T / WRAP_RADIUS
+
+
+@dataclass
+class LookupTable:
+    """Tendon lengths sampled uniformly over the range of every joint."""
+
+    lower: np.ndarray
+    """Lowest sampled angle of each joint, shape (joints,)."""
+
+    upper: np.ndarray
+    """Highest sampled angle of each joint, shape (joints,)."""
+
+    rest: np.ndarray
+    """Tendon lengths with all joints at 0, shape (motors,)."""
+
+    values: np.ndarray
+    """Length change contributed by each joint at each sample, shape (joints, samples, motors)."""
+
+    def __call__(self, angles: np.ndarray) -> np.ndarray:
+        """Linearly interpolated tendon lengths of configurations of shape (..., joints), clamped to the table."""
+        samples = self.values.shape[1]
+        position = (np.clip(angles, self.lower, self.upper) - self.lower) / (self.upper - self.lower) * (samples - 1)
+        index = np.minimum(position.astype(int), samples - 2)
+        fraction = (position - index)[..., None]
+        joints = np.arange(len(self.lower))
+        contributions = self.values[joints, index] * (1 - fraction) + self.values[joints, index + 1] * fraction
+        return self.rest + contributions.sum(axis=-2)
+
+    def save(self, path: str) -> None:
+        np.savez(path, lower=self.lower, upper=self.upper, rest=self.rest, values=self.values)
+
+    @classmethod
+    def load(cls, path: str) -> "LookupTable":
+        with np.load(path) as data:
+            return cls(data["lower"], data["upper"], data["rest"], data["values"])
+
+
+def lookup_table(samples: int = 181, root: Optional[ET.Element] = None) -> LookupTable:
+    """Table over the joint limits of the URDF."""
+    root = make_urdf() if root is None else root
+    lower, upper = joint_limits(root)
+    grid = np.linspace(lower, upper, samples)  # (samples, joints)
+    values = grid.T[:, :, None] * coupling().T[:, None, :]
+    return LookupTable(lower, upper, rest_lengths(root), values)
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(prog="routing.py", description="Write tendon length lookup tables, no FreeCAD required.")
+    parser.add_argument("path", help="NumPy .npz file to write")
+    parser.add_argument("--samples", type=int, default=181, help="samples per joint, default 181")
+    args = parser.parse_args(args)
+    lookup_table(args.samples).save(args.path)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,182 @@
+"""
+Parametric sweep over the design constants in layout.py:
+
+    freecad -c sweep.py spec.json results.json
+
+The spec either lists values to combine, {"grid": {"PULLEY_RADIUS": [4, 5]}},
+or ranges to sample uniformly, {"random": {"PULLEY_RADIUS": [4, 6]},
+"samples": 100, "seed": 0}, integers between integer bounds. Optional
+"parts" holds glob patterns of parts to build, all by default.
+
+Every variant re-executes layout.py with the overrides and imports the URDF
+and part builders against it in a worker process. Part metrics are kept in
+the artifact cache under the part fingerprint, so parts not depending on
+the changed constants are built once for all variants, and identical CSG
+sub-trees are shared between variants built by the same worker. Results are
+written column-wise: one list per metric with a value for every variant.
+"""
+from argparse import ArgumentParser
+from fnmatch import fnmatchcase
+from itertools import product
+from typing import Any
+import ast
+import json
+import os
+import random
+import sys
+import time
+import types
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cache import ArtifactCache, fingerprint  # noqa: E402
+from pool import JOBS, run_tasks  # noqa: E402
+from targets import script_args  # noqa: E402
+
+LAYOUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "layout.py")
+# Modules reading layout constants, directly or through the URDF, imported
+# again for every variant
+DEPENDENT_MODULES = ["layout", "urdf", "kinematics", "ik", "routing", "collision", "colliders", "parts"]
+
+
+def _execute_layout(overrides: dict[str, Any]) -> tuple[types.ModuleType, list[str]]:
+    """Module executed from layout.py with overridden constant assignments replaced and names of its constants."""
+    with open(LAYOUT) as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            if node.targets[0].id.isupper():
+                names.append(node.targets[0].id)
+            if node.targets[0].id in overrides:
+                node.value = ast.copy_location(ast.Constant(overrides[node.targets[0].id]), node.value)
+    module = types.ModuleType("layout")
+    module.__file__ = LAYOUT
+    exec(compile(tree, LAYOUT, "exec"), module.__dict__)
+    return module, names
+
+
+def constants() -> dict[str, Any]:
+    """Module level constants assigned in layout.py and their default values."""
+    module, names = _execute_layout({})
+    return {name: getattr(module, name) for name in names}
+
+
+def load_layout(overrides: dict[str, Any]) -> types.ModuleType:
+    """Install layout.py with overridden constants as module "layout" for modules importing it afterwards."""
+    module, _ = _execute_layout(overrides)
+    sys.modules["layout"] = module
+    return module
+
+
+def variants(spec: dict) -> list[dict[str, Any]]:
+    """Overrides of every variant described by a sweep spec."""
+    if "grid" in spec:
+        names = list(spec["grid"])
+        return [dict(zip(names, values)) for values in product(*(spec["grid"][name] for name in names))]
+    generator = random.Random(spec.get("seed", 0))
+    result = []
+    for _ in range(spec["samples"]):
+        variant = {}
+        for name, (low, high) in spec["random"].items():
+            both_int = isinstance(low, int) and isinstance(high, int)
+            variant[name] = generator.randint(low, high) if both_int else generator.uniform(low, high)
+        result.append(variant)
+    return result
+
+
+def part_metrics(parts: types.ModuleType, cache: ArtifactCache, name: str, builder, args: tuple) -> dict:
+    """Volume, mass, bounding box size and build time of a part, cached by part fingerprint."""
+    key = fingerprint(builder, *args, salt=f"{parts.TOOLCHAIN}, sweep metrics")
+    path = os.path.join(cache.directory, f"{key}.json.tmp{os.getpid()}")
+    if cache.restore(key, {"metrics.json": path}):
+        with open(path) as f:
+            metrics = json.load(f)
+    else:
+        start = time.perf_counter()
+        shape = parts.csg.evaluate(builder(*args))
+        box = shape.BoundBox
+        metrics = {
+            "volume": shape.Volume,
+            "size_x": box.XLength,
+            "size_y": box.YLength,
+            "size_z": box.ZLength,
+            "build_seconds": time.perf_counter() - start,
+        }
+        os.makedirs(cache.directory, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(metrics, f)
+        cache.store(key, {"metrics.json": path})
+    os.remove(path)
+    # Densities are applied after the cache so changing them needs no rebuild
+    return {**metrics, "mass": metrics["volume"] * parts.DENSITIES.get(name, parts.DENSITY)}
+
+
+def evaluate(overrides: dict[str, Any], patterns: list[str]) -> dict[str, Any]:
+    """Metrics of one variant, keyed by column name."""
+    start = time.perf_counter()
+    for module in DEPENDENT_MODULES:
+        sys.modules.pop(module, None)
+    load_layout(overrides)
+    import parts
+    result: dict[str, Any] = {}
+    try:
+        cache = ArtifactCache()
+        for name, (builder, *args) in parts.PARTS.items():
+            if any(fnmatchcase(name, pattern) for pattern in patterns):
+                for metric, value in part_metrics(parts, cache, name, builder, tuple(args)).items():
+                    result[f"{name}.{metric}"] = value
+        lengths: dict[str, float] = {}
+        for visual in parts.make_urdf().iter("visual"):
+            material = visual.find("material").get("name") or ""
+            cylinder = visual.find("geometry/cylinder")
+            if material.startswith("tendon") and cylinder is not None:
+                lengths[material] = lengths.get(material, 0) + float(cylinder.get("length"))
+        for material, length in sorted(lengths.items()):
+            result[f"{material}.straight_length"] = length
+        result["error"] = None
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def sweep(spec: dict, workers: int = JOBS) -> dict[str, list]:
+    """Column name -> value of every variant, overridden constants included."""
+    defaults = constants()
+    overrides = variants(spec)
+    for name in {name for variant in overrides for name in variant}:
+        if name not in defaults:
+            raise ValueError(f"Unknown constant {name}, available: {', '.join(defaults)}")
+    patterns = spec.get("parts", ["*"])
+    futures = run_tasks(
+        {f"variant{i}": (lambda variant=variant: evaluate(variant, patterns)) for i, variant in enumerate(overrides)},
+        workers,
+    )
+    rows = [{**variant, **futures[f"variant{i}"].result()} for i, variant in enumerate(overrides)]
+    names = list(dict.fromkeys(name for row in rows for name in row))
+    return {"variant": list(range(len(rows))), **{name: [row.get(name) for row in rows] for name in names}}
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(
+        prog="sweep.py",
+        description="Build variants of the design constants and collect part and tendon metrics.",
+    )
+    parser.add_argument("spec", help="JSON sweep spec")
+    parser.add_argument("results", help="JSON file to write columns of metrics to")
+    args = parser.parse_args(args)
+    with open(args.spec) as f:
+        spec = json.load(f)
+    try:
+        columns = sweep(spec)
+    except ValueError as e:
+        parser.error(str(e))
+    with open(args.results, "w") as f:
+        json.dump(columns, f)
+    failed = sum(error is not None for error in columns["error"])
+    print(f"{len(columns['variant'])} variants, {failed} failed")
+
+
+if __name__ == "__main__":
+    main(script_args())
+    exit(0)
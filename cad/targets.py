@@ -0,0 +1,95 @@
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from functools import partial
+from typing import Callable
+from pool import JOBS, run_tasks
+from tracing import span
+import sys
+
+
+@dataclass
+class Target:
+    """Named build output, e.g. "winch.stl" or "robot.urdf"."""
+
+    name: str
+
+    recipe: Callable[[str, list[str]], None]
+    """
+    Called with the output directory and the names of all requested targets
+    sharing this recipe, so e.g. STL and STEP of one part are built together.
+    """
+
+    inputs: list[str] = field(default_factory=list)
+    """Targets which have to be built first."""
+
+    local: bool = False
+    """Build in the main process instead of the worker pool."""
+
+
+def resolve(targets: dict[str, Target], patterns: list[str]) -> list[str]:
+    """Names matching glob patterns and their inputs in build order."""
+    order: list[str] = []
+
+    def visit(name: str) -> None:
+        if name not in order:
+            for input in targets[name].inputs:
+                visit(input)
+            order.append(name)
+
+    for pattern in patterns:
+        matches = [name for name in targets if fnmatchcase(name, pattern)]
+        if len(matches) == 0:
+            raise ValueError(f"No target matches '{pattern}', available: {', '.join(targets)}")
+        for name in matches:
+            visit(name)
+    return order
+
+
+def dependents(targets: dict[str, Target], names: set[str]) -> set[str]:
+    """Names and all targets built from any of them, also indirectly."""
+    result = set(names)
+    while True:
+        more = {name for name, target in targets.items() if name not in result and result.intersection(target.inputs)}
+        if not more:
+            return result
+        result |= more
+
+
+def _run(recipe: Callable[[str, list[str]], None], dir: str, names: list[str]) -> None:
+    with span(", ".join(names)):
+        recipe(dir, names)
+
+
+def build(targets: dict[str, Target], patterns: list[str], dir: str, workers: int = JOBS) -> None:
+    """
+    Targets without inputs are built in the worker pool, the rest in the main
+    process as soon as all their inputs are done.
+    """
+    batches: dict[int, tuple[Callable, list[str]]] = {}
+    for name in resolve(targets, patterns):
+        recipe = targets[name].recipe
+        batches.setdefault(id(recipe), (recipe, []))[1].append(name)
+    remote = [
+        (recipe, names) for recipe, names in batches.values()
+        if not any(targets[name].local or targets[name].inputs for name in names)
+    ]
+    futures = run_tasks({names[0]: partial(_run, recipe, dir, names) for recipe, names in remote}, workers)
+    producers = {name: futures[names[0]] for _, names in remote for name in names}
+    for recipe, names in batches.values():
+        if names[0] in futures:
+            continue
+        for name in names:
+            for input in targets[name].inputs:
+                if input in producers:
+                    producers[input].result()
+        _run(recipe, dir, names)
+    for future in futures.values():
+        future.result()
+
+
+def script_args() -> list[str]:
+    """Command line arguments after the script, also when run by "freecad -c"."""
+    for i in range(len(sys.argv)):
+        if sys.argv[i].endswith(".py"):
+            return sys.argv[i + 1:]
+    return sys.argv[1:]
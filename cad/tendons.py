@@ -0,0 +1,157 @@
+"""
+Continuous tendon tubes from the URDF. Straight tendon runs are <cylinder>
+visuals and wraps around pulleys are torus meshes, both with a tendon{i}
+material. Per link and motor the runs are chained into polylines, two run ends
+lying on the same pulley wrap are joined by an arc, and every polyline is
+swept into a tube so each tendon of a link is a single mesh.
+"""
+from copy import deepcopy
+from dataclasses import dataclass
+from mesh import Mesh, concatenate, tube, write_stl
+from transform import origin_matrix
+import numpy as np
+import os
+import xml.etree.ElementTree as ET
+
+EPSILON = 1e-3
+
+
+@dataclass
+class Wrap:
+    """Tendon wrapped around a pulley, a torus centered at its origin."""
+
+    radius: float
+    """Distance of the tendon center line from the pulley axis."""
+
+    axis: tuple[float, float, float] = (0, 0, 1)
+    """Pulley axis in torus coordinates."""
+
+    closed: bool = False
+    """Full loop around the pulley, otherwise run ends on it are joined."""
+
+
+def arc(start: np.ndarray, start_direction: np.ndarray, end: np.ndarray, end_direction: np.ndarray) -> np.ndarray:
+    """
+    Points between start and end, excluding both, of a cubic Hermite curve
+    approximating the circular arc tangent to both directions.
+    """
+    chord = np.linalg.norm(end - start)
+    angle = np.arccos(np.clip(np.dot(start_direction, end_direction), -1, 1))
+    if angle < EPSILON:
+        return np.zeros((0, 3))
+    radius = chord / (2 * np.sin(angle / 2))
+    scale = 4 * radius * np.tan(angle / 4)
+    t = np.linspace(0, 1, max(2, int(np.ceil(np.degrees(angle) / 15))) + 1)[1:-1, None]
+    return (
+        (2 * t ** 3 - 3 * t ** 2 + 1) * start
+        + (t ** 3 - 2 * t ** 2 + t) * scale * start_direction
+        + (-2 * t ** 3 + 3 * t ** 2) * end
+        + (t ** 3 - t ** 2) * scale * end_direction
+    )
+
+
+def on_wrap(point: np.ndarray, center: np.ndarray, axis: np.ndarray, radius: float) -> bool:
+    offset = point - center
+    height = np.dot(offset, axis)
+    return abs(height) < EPSILON and abs(np.linalg.norm(offset - axis * height) - radius) < EPSILON
+
+
+def chain(
+        runs: list[np.ndarray],
+        wraps: list[tuple[np.ndarray, np.ndarray, float]],
+) -> tuple[list[np.ndarray], list[bool]]:
+    """
+    Join straight runs of shape (2, 3) into polylines through open wraps
+    given as center, unit axis and radius. Also returns which wraps were used.
+    """
+    chains = list(runs)
+    used = []
+    for wrap in wraps:
+        ends = [(c, e) for c in range(len(chains)) for e in [0, -1] if on_wrap(chains[c][e], *wrap)]
+        pairs = [(a, b) for a in ends for b in ends if a[0] < b[0]]
+        used.append(len(pairs) > 0)
+        if not pairs:
+            continue
+        (a, a_end), (b, b_end) = min(pairs, key=lambda pair: np.linalg.norm(
+            chains[pair[0][0]][pair[0][1]] - chains[pair[1][0]][pair[1][1]]))
+        first = chains[a] if a_end == -1 else chains[a][::-1]
+        second = chains[b] if b_end == 0 else chains[b][::-1]
+        start_direction = first[-1] - first[-2]
+        end_direction = second[1] - second[0]
+        start_direction /= np.linalg.norm(start_direction)
+        end_direction /= np.linalg.norm(end_direction)
+        chains[a] = np.concatenate([first, arc(first[-1], start_direction, second[0], end_direction), second])
+        del chains[b]
+    return chains, used
+
+
+def ring(center: np.ndarray, axis: np.ndarray, radius: float, segments: int = 24) -> np.ndarray:
+    u = np.cross(axis, np.eye(3)[np.argmin(np.abs(axis))])
+    u /= np.linalg.norm(u)
+    v = np.cross(axis, u)
+    angles = np.arange(segments) * 2 * np.pi / segments
+    return center + radius * (np.cos(angles)[:, None] * u + np.sin(angles)[:, None] * v)
+
+
+def tendon_meshes(link: ET.Element, wraps: dict[str, Wrap], radius: float) -> dict[str, Mesh]:
+    """
+    Tube mesh per tendon material of a link. Replaced visuals are removed from
+    the link, open wraps without run ends on them are kept.
+    """
+    runs: dict[str, list[np.ndarray]] = {}
+    open_wraps: dict[str, list[tuple[ET.Element, tuple[np.ndarray, np.ndarray, float]]]] = {}
+    loops: dict[str, list[np.ndarray]] = {}
+    for visual in link.findall("visual"):
+        material = visual.find("material").get("name") or ""
+        geometry = visual.find("geometry")[0]
+        if not material.startswith("tendon"):
+            continue
+        matrix = origin_matrix(visual.find("origin"))
+        if geometry.tag == "cylinder":
+            half = matrix[:3, 2] * float(geometry.get("length")) / 2
+            runs.setdefault(material, []).append(np.array([matrix[:3, 3] - half, matrix[:3, 3] + half]))
+            link.remove(visual)
+        elif geometry.tag == "mesh" and geometry.get("filename") in wraps:
+            wrap = wraps[geometry.get("filename")]
+            center, axis = matrix[:3, 3], matrix[:3, :3] @ wrap.axis
+            if wrap.closed:
+                loops.setdefault(material, []).append(ring(center, axis, wrap.radius))
+                link.remove(visual)
+            else:
+                open_wraps.setdefault(material, []).append((visual, (center, axis, wrap.radius)))
+    meshes = {}
+    for material in sorted(set(runs) | set(loops)):
+        visuals = open_wraps.get(material, [])
+        polylines, used = chain(runs.get(material, []), [wrap for _, wrap in visuals])
+        for (visual, _), joined in zip(visuals, used):
+            if joined:
+                link.remove(visual)
+        meshes[material] = concatenate(
+            [tube(points, radius) for points in polylines]
+            + [tube(points, radius, closed=True) for points in loops.get(material, [])]
+        )
+    return meshes
+
+
+def tube_tendons(
+        root: ET.Element,
+        dir: str,
+        wraps: dict[str, Wrap],
+        radius: float,
+        prefix: str = "tendons",
+) -> ET.Element:
+    """
+    Copy of the robot with all tendon visuals of each link replaced by one
+    tube mesh per tendon written to dir/prefix.
+    """
+    root = deepcopy(root)
+    os.makedirs(f"{dir}/{prefix}", exist_ok=True)
+    for link in root.iter("link"):
+        for material, mesh in tendon_meshes(link, wraps, radius).items():
+            filename = f"{prefix}/{link.get('name')}-{material}.stl"
+            write_stl(f"{dir}/{filename}", mesh)
+            visual = ET.SubElement(link, "visual")
+            ET.SubElement(visual, "origin", {"xyz": "0 0 0", "rpy": "0 0 0"})
+            ET.SubElement(ET.SubElement(visual, "geometry"), "mesh", {"filename": filename})
+            ET.SubElement(visual, "material", {"name": material})
+    return root
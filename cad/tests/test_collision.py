@@ -0,0 +1,95 @@
+from math import pi
+import numpy as np
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from collision import CollisionMap, PairMap, collision_map, penetration, sample_surface, sphere_tree  # noqa: E402
+from mesh import Mesh, write_stl  # noqa: E402
+from urdf import make_urdf  # noqa: E402
+
+
+def box(low: tuple[float, float, float], high: tuple[float, float, float]) -> Mesh:
+    corners = np.array([low, high], dtype=float)
+    vertices = np.array([[x, y, z] for x in corners[:, 0] for y in corners[:, 1] for z in corners[:, 2]])
+    quads = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    return Mesh(vertices, np.array([triangle for a, b, c, d in quads for triangle in [(a, b, c), (a, c, d)]]))
+
+
+def two_link_robot(dir: str, block: Mesh) -> ET.Element:
+    """
+    Robot with only a bar along x on segment1a and a block on segment0b, in
+    the frame of joint1a turning segment1a.
+    """
+    root = make_urdf()
+    for link in root.iter("link"):
+        for visual in link.findall("visual"):
+            link.remove(visual)
+    write_stl(f"{dir}/bar.stl", box((5, -2, -2), (25, 2, 2)))
+    write_stl(f"{dir}/block.stl", block)
+    origin = root.find("joint[@name='joint1a']/origin")
+    for name, filename, visual_origin in [("segment1a", "bar.stl", None), ("segment0b", "block.stl", origin)]:
+        visual = ET.SubElement(root.find(f"link[@name='{name}']"), "visual")
+        if visual_origin is not None:
+            visual.append(visual_origin)
+        ET.SubElement(ET.SubElement(visual, "geometry"), "mesh", {"filename": filename})
+        ET.SubElement(visual, "material", {"name": "test"})
+    return root
+
+
+def test_penetration_of_overlapping_boxes():
+    tree = sphere_tree(*sample_surface(box((0, 0, 0), (10, 10, 10))))
+    overlaps = [-2, 0, 0.5, 2]
+    transforms = np.tile(np.eye(4), (len(overlaps), 1, 1))
+    transforms[:, 0, 3] = 10 - np.array(overlaps)
+    assert np.allclose(penetration(tree, tree, transforms), [0, 0, 0.5, 2], atol=0.1)
+
+
+def test_block_limits_joint(tmp_path):
+    root = two_link_robot(tmp_path, box((5, 12, -2), (25, 18, 2)))
+    limits = collision_map(root, tmp_path, workers=1).limits()
+    # Turning the bar towards the block is limited, away from it is not
+    assert 0 < limits[1, 1] < pi / 4
+    assert limits[0, 1] == -pi / 2
+    assert np.array_equal(np.delete(limits, 1, axis=1), np.array([[-pi / 2] * 5, [pi / 2] * 5]))
+
+
+def test_contact_at_rest_limits_joint(tmp_path):
+    root = two_link_robot(tmp_path, box((5, 2, -2), (25, 8, 2)))
+    result = collision_map(root, tmp_path, workers=1)
+    [pair] = result.pairs
+    assert pair.at_rest
+    limits = result.limits()
+    assert limits[1, 1] < pi / 18
+    assert limits[0, 1] == -pi / 2
+    angles = np.zeros((2, 6))
+    angles[:, 1] = [-pi / 4, pi / 4]
+    assert list(result.colliding(angles)) == [False, True]
+
+
+def test_save_load(tmp_path):
+    random = np.random.default_rng(0)
+    original = CollisionMap(
+        ["base", "segment0a", "segment0b"],
+        np.array([-1.5, -1.0, 0.0]),
+        np.array([1.5, 1.0, 0.0]),
+        np.array([13, 9, 1]),
+        [
+            PairMap((0, 1), (0,), False, random.random(13) < 0.5),
+            PairMap((0, 2), (0, 1), True, random.random((13, 9)) < 0.5),
+        ],
+    )
+    original.save(f"{tmp_path}/collision.map")
+    with open(f"{tmp_path}/collision.map", "rb") as f:
+        assert len(f.read()) % 4 == 0
+    loaded = CollisionMap.load(f"{tmp_path}/collision.map")
+    assert loaded.links == original.links
+    assert np.allclose(loaded.lower, original.lower) and np.allclose(loaded.upper, original.upper)
+    assert np.array_equal(loaded.samples, original.samples)
+    for a, b in zip(loaded.pairs, original.pairs):
+        assert (a.links, a.joints, a.at_rest) == (b.links, b.joints, b.at_rest)
+        assert np.array_equal(a.colliding, b.colliding)
+    # The joint with an empty range has a single sample
+    assert loaded.colliding(np.zeros((4, 3))).shape == (4,)
+    assert not np.isnan(loaded.limits()).any()
@@ -0,0 +1,68 @@
+import numpy as np
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import ik  # noqa: E402
+from collision import apply_limits  # noqa: E402
+from kinematics import Chain  # noqa: E402
+from urdf import make_urdf  # noqa: E402
+
+# Narrower than the placeholder limits of make_urdf, like those of the build
+LIMITS = np.array([
+    [-0.96, -1.4, -1.5, -1.2, -1.571, -1.3],
+    [1.571, 1.3, 1.2, 1.5, 1.1, 1.571],
+])
+TARGETS = 500
+
+
+def limited_urdf() -> ET.Element:
+    root = make_urdf()
+    apply_limits(root, LIMITS)
+    return root
+
+
+def rotation_errors(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.linalg.norm(ik.rotation_error(a[:, :3, :3], b[:, :3, :3]), axis=1)
+
+
+def test_limits_from_built_urdf(tmp_path, monkeypatch):
+    ET.ElementTree(limited_urdf()).write(tmp_path / "robot.urdf")
+    monkeypatch.setattr(ik, "URDF", str(tmp_path / "robot.urdf"))
+    solver = ik.Solver()
+    assert np.allclose([solver.lower, solver.upper], LIMITS)
+
+
+def test_round_trip():
+    chain = Chain()
+    solver = ik.Solver(chain, limited_urdf())
+    angles = np.random.default_rng(1).uniform(*LIMITS, (TARGETS, len(chain.names)))
+    targets = chain.forward(angles)
+    solution, converged = solver.solve(targets)
+    assert converged.mean() >= 0.98
+    assert ((solution >= LIMITS[0]) & (solution <= LIMITS[1])).all()
+    reached = chain.forward(solution[converged])
+    assert np.linalg.norm(reached[:, :3, 3] - targets[converged, :3, 3], axis=1).max() < solver.position_tolerance
+    assert rotation_errors(reached, targets[converged]).max() < solver.orientation_tolerance
+    positions, converged = solver.solve(targets[:, :3, 3])
+    assert converged.mean() >= 0.98
+    reached = chain.forward(positions[converged])[:, :3, 3]
+    assert np.linalg.norm(reached - targets[converged, :3, 3], axis=1).max() < solver.position_tolerance
+
+
+def test_warm_solves():
+    chain = Chain()
+    solver = ik.Solver(chain, limited_urdf())
+    rng = np.random.default_rng(2)
+    angles = rng.uniform(*LIMITS, (TARGETS, len(chain.names)))
+    solver.solve(chain.forward(angles))
+    nearby = chain.forward(np.clip(angles + rng.normal(scale=0.005, size=angles.shape), *LIMITS))
+    start = time.perf_counter()
+    solution, converged = solver.solve(nearby)
+    elapsed = time.perf_counter() - start
+    assert converged.mean() >= 0.99
+    assert elapsed / TARGETS < 1e-3
+    reached = chain.forward(solution[converged])
+    assert np.linalg.norm(reached[:, :3, 3] - nearby[converged, :3, 3], axis=1).max() < solver.position_tolerance
@@ -0,0 +1,94 @@
+from math import pi
+import numpy as np
+import os
+import sys
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import urdf  # noqa: E402
+
+LINKS = [
+    "base",
+    *(f"segment{i}{side}" for i in range(6) for side in "ab"),
+]
+# Joint name: parent, child, mimicked joint, origin xyz and rpy
+JOINTS = {
+    "joint0a": ("base", "segment0a", None, (0, 0, 11.25), (0, 0, 0)),
+    "joint0b": ("segment0a", "segment0b", "joint0a", (-20, 0, 0), (0, 0, 0)),
+    "joint1a": ("segment0b", "segment1a", None, (-110, 0, 110), (0, pi / 2, 0)),
+    "joint1b": ("segment1a", "segment1b", "joint1a", (-20, 0, 0), (0, 0, 0)),
+    "joint2a": ("segment1b", "segment2a", None, (-120, 0, 0), (0, 0, 0)),
+    "joint2b": ("segment2a", "segment2b", "joint2a", (-20, 0, 0), (0, 0, 0)),
+    "joint3a": ("segment2b", "segment3a", None, (-120, 0, 0), (0, 0, 0)),
+    "joint3b": ("segment3a", "segment3b", "joint3a", (-20, 0, 0), (0, 0, 0)),
+    "joint4a": ("segment3b", "segment4a", None, (-110, 0, 110), (0, pi / 2, 0)),
+    "joint4b": ("segment4a", "segment4b", "joint4a", (-20, 0, 0), (0, 0, 0)),
+    "joint5a": ("segment4b", "segment5a", None, (-10, 0, -10), (0, -pi / 2, 0)),
+    "joint5b": ("segment5a", "segment5b", "joint5a", (-20, 0, 0), (0, 0, 0)),
+}
+VISUALS = {
+    "base": 36,
+    "segment0a": 43,
+    "segment0b": 87,
+    "segment1a": 40,
+    "segment1b": 54,
+    "segment2a": 37,
+    "segment2b": 51,
+    "segment3a": 34,
+    "segment3b": 69,
+    "segment4a": 31,
+    "segment4b": 58,
+    "segment5a": 19,
+    "segment5b": 24,
+}
+MESHES = [
+    "XM430-W350-T.web.stl",
+    "arm_to_body_joiner.web.stl",
+    "direction-changing-pulley-tendon.web.stl",
+    "jetson.stl",
+    "joint-gear-left.web.stl",
+    "joint-gear-right.web.stl",
+    "segment-plate.web.stl",
+    "shaft-pulley.web.stl",
+    "shaft.web.stl",
+    "tackle-pulley-tendon.web.stl",
+    "tackle-pulley.web.stl",
+    "winch.web.stl",
+    "wrap_joint_pulley_tendon.web.stl",
+]
+
+
+def floats(text: str) -> list[float]:
+    return [float(x) for x in text.split()]
+
+
+def test_without_freecad():
+    urdf.make_urdf()
+    assert "FreeCAD" not in sys.modules
+
+
+def test_structure():
+    root = urdf.make_urdf()
+    assert [link.get("name") for link in root.iter("link")] == LINKS
+    assert {link.get("name"): len(link.findall("visual")) for link in root.iter("link")} == VISUALS
+    assert sorted({mesh.get("filename") for mesh in root.iter("mesh")}) == MESHES
+    joints = {joint.get("name"): joint for joint in root.iter("joint")}
+    assert list(joints) == list(JOINTS)
+    for name, (parent, child, mimic, xyz, rpy) in JOINTS.items():
+        joint = joints[name]
+        assert joint.get("type") == "revolute"
+        assert (joint.find("parent").get("link"), joint.find("child").get("link")) == (parent, child)
+        assert (None if joint.find("mimic") is None else joint.find("mimic").get("joint")) == mimic
+        assert floats(joint.find("axis").get("xyz")) == [0, 0, 1]
+        assert np.allclose(floats(joint.find("origin").get("xyz")), xyz)
+        assert np.allclose(floats(joint.find("origin").get("rpy")), rpy)
+        assert floats(joint.find("limit").get("lower")) == [-pi / 2]
+        assert floats(joint.find("limit").get("upper")) == [pi / 2]
+
+
+def test_main_keeps_built_urdf(tmp_path):
+    (tmp_path / "robot.urdf").write_text("built")
+    urdf.main([str(tmp_path)])
+    assert (tmp_path / "robot.urdf").read_text() == "built"
+    root = ET.parse(tmp_path / urdf.LAYOUT_URDF).getroot()
+    assert ET.tostring(root) == ET.tostring(urdf.make_urdf())
@@ -0,0 +1,163 @@
+"""
+Opt-in build tracing. When KIAUKUTAS_TRACE names a file, spans record wall
+time, CPU time and peak resident memory and finish() writes them as a Chrome
+trace (chrome://tracing or ui.perfetto.dev) plus a flat summary table next to
+it. Otherwise spans cost next to nothing. Forked worker processes append
+their spans to side files which finish() merges.
+"""
+from contextlib import contextmanager
+from functools import wraps
+from glob import glob
+from typing import Callable, Iterator, Optional
+import json
+import os
+import resource
+import threading
+import time
+
+TRACE = os.environ.get("KIAUKUTAS_TRACE")
+
+_events: list[dict] = []
+_depth = threading.local()
+
+
+def _max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _flush() -> None:
+    """Append spans of this process to its side file."""
+    if _events:
+        with open(f"{TRACE}.{os.getpid()}", "a") as f:
+            for event in _events:
+                f.write(json.dumps(event) + "\n")
+    _events.clear()
+
+
+def _forked() -> None:
+    """Forked workers start without the spans of their parent."""
+    _events.clear()
+    _depth.value = 0
+
+
+@contextmanager
+def span(name: str, **args) -> Iterator[None]:
+    """Record the enclosed block as a named span with extra args shown in the trace."""
+    if TRACE is None:
+        yield
+        return
+    depth = getattr(_depth, "value", 0)
+    _depth.value = depth + 1
+    start, cpu = time.time_ns(), time.process_time()
+    rss = _max_rss_mb()
+    try:
+        yield
+    finally:
+        _depth.value = depth
+        _events.append({
+            "name": name,
+            "ph": "X",
+            "ts": start / 1000,
+            "dur": (time.time_ns() - start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            "args": {
+                **args,
+                "cpu_ms": (time.process_time() - cpu) * 1000,
+                "max_rss_mb": _max_rss_mb(),
+                "rss_growth_mb": _max_rss_mb() - rss,
+            },
+        })
+        if depth == 0:
+            _flush()
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator recording every call of a function as a span."""
+    def decorate(function: Callable) -> Callable:
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name or function.__name__):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _startup() -> None:
+    """Span from process start until this module got imported, e.g. FreeCAD startup."""
+    try:
+        with open("/proc/self/stat") as f:
+            ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+    except OSError:
+        return
+    now = time.time_ns() / 1000
+    start = now - (uptime - ticks / os.sysconf("SC_CLK_TCK")) * 1e6
+    _events.append({
+        "name": "startup",
+        "ph": "X",
+        "ts": start,
+        "dur": now - start,
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+        "args": {"cpu_ms": time.process_time() * 1000, "max_rss_mb": _max_rss_mb(), "rss_growth_mb": 0},
+    })
+    _flush()
+
+
+def summary(events: list[dict]) -> str:
+    """Table of spans by name with count, total and self wall time, CPU time and peak memory."""
+    rows: dict[str, dict] = {}
+    self_times = [event["dur"] for event in events]
+    threads: dict[tuple, list[int]] = {}
+    for i, event in enumerate(events):
+        threads.setdefault((event["pid"], event["tid"]), []).append(i)
+    for indices in threads.values():
+        stack: list[int] = []
+        for i in sorted(indices, key=lambda i: (events[i]["ts"], -events[i]["dur"])):
+            end = events[i]["ts"] + events[i]["dur"]
+            while stack and events[stack[-1]]["ts"] + events[stack[-1]]["dur"] < end:
+                stack.pop()
+            if stack:
+                self_times[stack[-1]] -= events[i]["dur"]
+            stack.append(i)
+    for event, self_time in zip(events, self_times):
+        row = rows.setdefault(event["name"], {"count": 0, "wall": 0, "self": 0, "cpu": 0, "rss": 0})
+        row["count"] += 1
+        row["wall"] += event["dur"] / 1000
+        row["self"] += self_time / 1000
+        row["cpu"] += event["args"]["cpu_ms"]
+        row["rss"] = max(row["rss"], event["args"]["max_rss_mb"])
+    lines = [f"{'span':48} {'count':>6} {'wall ms':>10} {'self ms':>10} {'cpu ms':>10} {'peak MB':>8}"]
+    for name, row in sorted(rows.items(), key=lambda item: -item[1]["self"]):
+        lines.append(
+            f"{name[:48]:48} {row['count']:6} {row['wall']:10.1f} {row['self']:10.1f} "
+            f"{row['cpu']:10.1f} {row['rss']:8.1f}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def finish() -> None:
+    """Merge spans of all processes into the trace file and write the summary."""
+    if TRACE is None:
+        return
+    _flush()
+    events = []
+    for path in glob(f"{TRACE}.*[0-9]"):
+        with open(path) as f:
+            events += [json.loads(line) for line in f]
+        os.remove(path)
+    with open(TRACE, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    table = summary(events)
+    with open(f"{os.path.splitext(TRACE)[0]}.summary.txt", "w") as f:
+        f.write(table)
+    print(table, end="")
+
+
+if TRACE is not None:
+    os.register_at_fork(after_in_child=_forked)
+    for stale in glob(f"{TRACE}.*[0-9]"):
+        os.remove(stale)
+    _startup()
@@ -0,0 +1,247 @@
+from typing import Optional
+import math
+import numpy as np
+import xml.etree.ElementTree as ET
+
+
+def rpy_matrix(roll: float, pitch: float, yaw: float) -> np.ndarray:
+    """Rotation matrix of URDF fixed axis roll, pitch, yaw angles in radians."""
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    return np.array([
+        [cy * cp, cy * sp * sr - sy * cr, cy * sp * cr + sy * sr],
+        [sy * cp, sy * sp * sr + cy * cr, sy * sp * cr - cy * sr],
+        [-sp, cp * sr, cp * cr],
+    ])
+
+
+def matrix_rpy(rotation: np.ndarray) -> tuple[float, float, float]:
+    """URDF fixed axis roll, pitch, yaw angles in radians of a 3x3 rotation matrix."""
+    if abs(rotation[2, 0]) > 1 - 1e-12:  # Gimbal lock, all rotation about z expressed as yaw
+        pitch = -math.copysign(math.pi / 2, rotation[2, 0])
+        return 0.0, pitch, math.atan2(-rotation[0, 1], rotation[1, 1])
+    return (
+        math.atan2(rotation[2, 1], rotation[2, 2]),
+        math.asin(-rotation[2, 0]),
+        math.atan2(rotation[1, 0], rotation[0, 0]),
+    )
+
+
+def origin_matrix(origin: Optional[ET.Element]) -> np.ndarray:
+    """Homogeneous 4x4 transform of an URDF <origin> element, identity if missing."""
+    matrix = np.eye(4)
+    if origin is not None:
+        matrix[:3, :3] = rpy_matrix(*(float(x) for x in origin.get("rpy", "0 0 0").split()))
+        matrix[:3, 3] = [float(x) for x in origin.get("xyz", "0 0 0").split()]
+    return matrix
+
+
+def axis_frame(axis: np.ndarray) -> np.ndarray:
+    """Rotation with z along a unit axis."""
+    if np.allclose(axis, [0, 0, 1]):
+        return np.eye(3)
+    x = np.cross(np.eye(3)[np.argmin(np.abs(axis))], axis)
+    x /= np.linalg.norm(x)
+    return np.column_stack([x, np.cross(axis, x), axis])
+
+
+def transform_points(matrix: np.ndarray, points: np.ndarray) -> np.ndarray:
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def matrix_quaternion(rotation: np.ndarray) -> np.ndarray:
+    """Unit quaternion (x, y, z, w) of a 3x3 rotation matrix."""
+    m = rotation
+    trace = m[0, 0] + m[1, 1] + m[2, 2]
+    if trace > 0:
+        s = 2 * np.sqrt(trace + 1)
+        q = [(m[2, 1] - m[1, 2]) / s, (m[0, 2] - m[2, 0]) / s, (m[1, 0] - m[0, 1]) / s, s / 4]
+    elif m[0, 0] > m[1, 1] and m[0, 0] > m[2, 2]:
+        s = 2 * np.sqrt(1 + m[0, 0] - m[1, 1] - m[2, 2])
+        q = [s / 4, (m[0, 1] + m[1, 0]) / s, (m[0, 2] + m[2, 0]) / s, (m[2, 1] - m[1, 2]) / s]
+    elif m[1, 1] > m[2, 2]:
+        s = 2 * np.sqrt(1 + m[1, 1] - m[0, 0] - m[2, 2])
+        q = [(m[0, 1] + m[1, 0]) / s, s / 4, (m[1, 2] + m[2, 1]) / s, (m[0, 2] - m[2, 0]) / s]
+    else:
+        s = 2 * np.sqrt(1 + m[2, 2] - m[0, 0] - m[1, 1])
+        q = [(m[0, 2] + m[2, 0]) / s, (m[1, 2] + m[2, 1]) / s, s / 4, (m[1, 0] - m[0, 1]) / s]
+    q = np.array(q)
+    return q / np.linalg.norm(q)
+
+
+def _elementwise(scalar: callable, array: np.ufunc) -> callable:
+    """Use the math module for scalars so single placements round exactly like FreeCAD."""
+    return lambda *x: array(*x) if any(np.ndim(a) for a in x) else scalar(*(float(a) for a in x))
+
+
+_sin = _elementwise(math.sin, np.sin)
+_cos = _elementwise(math.cos, np.cos)
+_asin = _elementwise(math.asin, np.arcsin)
+_atan2 = _elementwise(math.atan2, np.arctan2)
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Hamilton product of (x, y, z, w) quaternion batches."""
+    ax, ay, az, aw = np.moveaxis(a, -1, 0)
+    bx, by, bz, bw = np.moveaxis(b, -1, 0)
+    return np.stack([
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+        aw * bw - ax * bx - ay * by - az * bz,
+    ], -1)
+
+
+class Vector:
+    """
+    NumPy stand-in for FreeCAD.Vector. Components may be arrays, in which case
+    the vector is a batch of shape (..., 3) with broadcast components.
+    """
+
+    def __init__(self, x=0, y=0, z=0):
+        self.array = np.stack(np.broadcast_arrays(*(np.asarray(c, dtype=np.float64) for c in (x, y, z))), -1)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "Vector":
+        vector = cls.__new__(cls)
+        vector.array = np.asarray(array, dtype=np.float64)
+        return vector
+
+    @property
+    def x(self):
+        return self.array[..., 0]
+
+    @property
+    def y(self):
+        return self.array[..., 1]
+
+    @property
+    def z(self):
+        return self.array[..., 2]
+
+    def __iter__(self):
+        return iter(float(c) for c in self.array) if self.array.ndim == 1 else iter(np.moveaxis(self.array, -1, 0))
+
+    def __add__(self, other: "Vector") -> "Vector":
+        return Vector.from_array(self.array + other.array)
+
+    def __sub__(self, other: "Vector") -> "Vector":
+        return Vector.from_array(self.array - other.array)
+
+    def __mul__(self, scale) -> "Vector":
+        return Vector.from_array(self.array * np.asarray(scale)[..., None])
+
+    def __repr__(self) -> str:
+        return f"Vector ({', '.join(str(c) for c in self)})" if self.array.ndim == 1 else f"Vector({self.array!r})"
+
+
+class Rotation:
+    """
+    NumPy stand-in for FreeCAD.Rotation, a batch of unit quaternions. Created
+    from nothing (identity), yaw, pitch and roll in degrees or an axis Vector
+    and an angle in degrees, any of which may be arrays.
+    """
+
+    def __init__(self, *args):
+        if len(args) == 0:
+            q = np.array([0.0, 0, 0, 1])
+        elif len(args) == 2:
+            axis, angle = args
+            x, y, z = np.moveaxis(axis.array, -1, 0)
+            axis = axis.array / np.sqrt(x * x + y * y + z * z)[..., None]
+            half = np.radians(np.asarray(angle, dtype=np.float64)) / 2
+            xyz = axis * np.asarray(_sin(half))[..., None]
+            q = np.concatenate([xyz, np.broadcast_to(np.asarray(_cos(half))[..., None], xyz.shape[:-1] + (1,))], -1)
+        elif len(args) == 3:
+            y, p, r = (np.radians(np.asarray(a, dtype=np.float64)) / 2 for a in args)
+            c1, s1, c2, s2, c3, s3 = _cos(y), _sin(y), _cos(p), _sin(p), _cos(r), _sin(r)
+            q = np.stack(np.broadcast_arrays(
+                c1 * c2 * s3 - s1 * s2 * c3,
+                c1 * s2 * c3 + s1 * c2 * s3,
+                s1 * c2 * c3 - c1 * s2 * s3,
+                c1 * c2 * c3 + s1 * s2 * s3,
+            ), -1)
+        else:
+            raise TypeError(f"Rotation takes 0, 2 or 3 arguments, got {len(args)}")
+        self.q = np.where(q[..., 3:] < 0, -q, q)
+
+    @classmethod
+    def from_quaternion(cls, q: np.ndarray) -> "Rotation":
+        rotation = cls.__new__(cls)
+        rotation.q = np.asarray(q, dtype=np.float64)
+        return rotation
+
+    @property
+    def Angle(self):
+        return 2 * np.arccos(np.clip(self.q[..., 3], -1, 1))
+
+    def multiply(self, other: "Rotation") -> "Rotation":
+        return Rotation.from_quaternion(quaternion_multiply(self.q, other.q))
+
+    def multVec(self, vector: Vector) -> Vector:
+        conjugate = self.q * [-1, -1, -1, 1]
+        v = np.concatenate([vector.array, 0 * vector.array[..., :1]], -1)
+        return Vector.from_array(quaternion_multiply(quaternion_multiply(self.q, v), conjugate)[..., :3])
+
+    def inverted(self) -> "Rotation":
+        return Rotation.from_quaternion(self.q * [-1, -1, -1, 1])
+
+    def toEuler(self):
+        """Yaw, pitch and roll in degrees, a tuple of floats or of arrays for batches."""
+        x, y, z, w = np.moveaxis(self.q, -1, 0)
+        qd2 = 2 * (w * y - x * z)
+        with np.errstate(invalid="ignore"):
+            yaw = _atan2(2 * (w * z + x * y), w * w + x * x - y * y - z * z)
+            pitch = _asin(np.clip(qd2, -1, 1))
+            roll = _atan2(2 * (w * x + y * z), w * w - x * x - y * y + z * z)
+        # Gimbal lock, all rotation about x expressed as roll
+        up, down = qd2 > 1 - 1e-15, qd2 < -1 + 1e-15
+        yaw = np.where(up | down, 0.0, yaw)
+        pitch = np.where(up, np.pi / 2, np.where(down, -np.pi / 2, pitch))
+        roll = np.where(up, 2 * _atan2(x, w), np.where(down, -2 * _atan2(x, w), roll))
+        angles = np.degrees(np.stack([yaw, pitch, roll]))
+        return tuple(float(a) for a in angles) if self.q.ndim == 1 else tuple(angles)
+
+    def matrix(self) -> np.ndarray:
+        """Rotation matrices of shape (..., 3, 3)."""
+        x, y, z, w = np.moveaxis(self.q, -1, 0)
+        return np.stack([
+            np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - z * w), 2 * (x * z + y * w)], -1),
+            np.stack([2 * (x * y + z * w), 1 - 2 * (x * x + z * z), 2 * (y * z - x * w)], -1),
+            np.stack([2 * (x * z - y * w), 2 * (y * z + x * w), 1 - 2 * (x * x + y * y)], -1),
+        ], -2)
+
+    def __repr__(self) -> str:
+        return f"Rotation({self.q!r})"
+
+
+class Placement:
+    """NumPy stand-in for FreeCAD.Placement, batches compose by broadcasting."""
+
+    def __init__(self, base: Optional[Vector] = None, rotation: Optional[Rotation] = None):
+        self.Base = Vector() if base is None else base
+        self.Rotation = Rotation() if rotation is None else rotation
+
+    def multiply(self, other: "Placement") -> "Placement":
+        return Placement(self.Base + self.Rotation.multVec(other.Base), self.Rotation.multiply(other.Rotation))
+
+    def multVec(self, vector: Vector) -> Vector:
+        return self.Base + self.Rotation.multVec(vector)
+
+    def inverse(self) -> "Placement":
+        rotation = self.Rotation.inverted()
+        return Placement(rotation.multVec(self.Base) * -1, rotation)
+
+    def matrix(self) -> np.ndarray:
+        """Homogeneous transforms of shape (..., 4, 4)."""
+        rotation = self.Rotation.matrix()
+        shape = np.broadcast_shapes(rotation.shape[:-2], self.Base.array.shape[:-1])
+        matrix = np.zeros(shape + (4, 4))
+        matrix[..., :3, :3] = rotation
+        matrix[..., :3, 3] = self.Base.array
+        matrix[..., 3, 3] = 1
+        return matrix
+
+    def __repr__(self) -> str:
+        return f"Placement [Pos={self.Base}, Rot={self.Rotation}]"
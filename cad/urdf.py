@@ -0,0 +1,860 @@
+from argparse import ArgumentParser
+from dataclasses import dataclass
+from math import asin, cos, degrees, pi, radians, sin, sqrt
+from typing import Optional
+import xml.etree.ElementTree as ET
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from layout import (  # noqa: E402
+    ARM_START_Z,
+    JOINT_GEAR_HEIGHT,
+    JOINT_PULLEY_SPACING,
+    JOINT_SHAFT_LENGTH,
+    NUMBER_OF_MOTORS,
+    PLATE_THICKNESS,
+    PRINT_LOD,
+    PULLEY_HEIGHT,
+    PULLEY_RADIUS,
+    SEGMENTS,
+    SEGMENT_THICKNESS,
+    SHAFT_TO_PLATE,
+    TACKLE_PULLEY_RADIUS,
+    TENDON_RADIUS,
+    URDF_LOD,
+    VERTICAL_GAP_BETWEEN_MOTORS,
+)
+from tracing import finish, span, traced  # noqa: E402
+from transform import Placement, Rotation, Vector  # noqa: E402
+
+# File written by main, robot.urdf is left to the build adding what needs FreeCAD
+LAYOUT_URDF = "robot.layout.urdf"
+INITIAL_PLACEMENT = Placement(Vector(0, 0, 11.25), Rotation(0, 0, 0))
+
+# add_visual(base, "joint-gear-right", placement=Placement(
+#     Vector(0, 0, 11.25 + JOINT_GEAR_HEIGHT),
+#     Rotation(180, 0, 0),
+# ), rgba="0 0 1 1")
+# add_visual(base, "joint-gear-right", placement=Placement(
+#     Vector(0, 0, 11.25 + JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
+#     Rotation(0, 0, 0),
+# ), rgba="0 0 1 1")
+
+
+def add_origin(
+    element: ET.Element,
+    xyz: str = "0 0 0",
+    rpy: str = "0 0 0",
+    placement: Optional[Placement] = None
+) -> ET.Element:
+    if placement is not None:
+        xyz = " ".join(str(x) for x in placement.Base)
+        rpy = " ".join(str(radians(x)) for x in placement.Rotation.toEuler())
+    return ET.SubElement(element, "origin", {"xyz": xyz, "rpy": rpy})
+
+
+def mesh_file(name: str, lod: Optional[str] = PRINT_LOD) -> str:
+    """STL file name of a part, meshes without levels of detail have lod None."""
+    return f"{name}.stl" if lod is None or lod == PRINT_LOD else f"{name}.{lod}.stl"
+
+
+def add_visual(
+        link: ET.Element,
+        stl: str,
+        xyz: str = "0 0 0",
+        rpy: str = "0 0 0",
+        rgba: str = "1 1 1 1",
+        placement: Optional[Placement] = None,
+        name: Optional[str] = None,
+        lod: Optional[str] = URDF_LOD,
+):
+    visual = ET.SubElement(link, "visual")
+    add_origin(visual, xyz, rpy, placement)
+    geometry = ET.SubElement(visual, "geometry")
+    ET.SubElement(geometry, "mesh", {"filename": mesh_file(stl, lod)})
+    material = ET.SubElement(visual, "material", {"name": "" if name is None else name})
+    if name is None:
+        ET.SubElement(material, "color", {"rgba": rgba})
+
+
+def add_tendon(
+        link: ET.Element,
+        length: float,
+        placement: Placement,
+        index: int = 0,
+):
+    visual = ET.SubElement(link, "visual")
+    add_origin(
+        visual,
+        placement=placement.multiply(
+            Placement(
+                Vector(0, 0, length / 2),
+                Rotation(0, 0, 0),
+            )
+        )
+    )
+    geometry = ET.SubElement(visual, "geometry")
+    ET.SubElement(
+        geometry,
+        "cylinder",
+        {
+            "radius": f"{TENDON_RADIUS}",
+            "length": f"{length}",
+        }
+    )
+    ET.SubElement(visual, "material", {"name": f"tendon{index}"})
+
+
+def define_material(root: ET.Element, name: str, r: float, g: float, b: float, a: float = 1) -> None:
+    material = ET.SubElement(root, "material", {"name": name})
+    ET.SubElement(material, "color", {"rgba": f"{r} {g} {b} {a}"})
+
+
+def add_tension_pulleys(
+        link,
+        index: int,
+        placement=Placement(Vector(0, 0, 0), Rotation(0, 0, 0)),
+        direction: int = 1,
+):
+    add_visual(link, "tackle-pulley", placement=placement.multiply(
+        Placement(
+            Vector(
+                SHAFT_TO_PLATE + PLATE_THICKNESS / 2,
+                (-PULLEY_RADIUS - TENDON_RADIUS - 2.1 + (2.1 - 0.6) / 2) * direction,
+                JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 if direction == 1 else -1),
+            ),
+            Rotation(0 if direction == 1 else 180, 0, 0),
+        )
+    ), rgba="0.3 0.2 0.6 1")
+    add_visual(
+        link,
+        "tackle-pulley-tendon",
+        placement=placement.multiply(
+            Placement(
+                Vector(
+                    SHAFT_TO_PLATE + 7 / 2,
+                    (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
+                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 if direction == 1 else -1),
+                ),
+                Rotation(0, 0, 0),
+            )
+        ),
+        name=f"tendon{index}"
+    )
+    for k in range(3):
+        add_tendon(
+            link,
+            7 / 2 + SHAFT_TO_PLATE,
+            placement.multiply(
+                Placement(
+                    Vector(
+                        SHAFT_TO_PLATE + 7 / 2,
+                        (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
+                        JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (0.5 + k * direction),
+                    ),
+                    Rotation(0, -90, 0),
+                )
+            ),
+            index,
+        )
+
+
+def add_non_direction_changing_tendons(link: ET.Element, tendons: list[Optional[int]]) -> None:
+    for i in range(len(tendons)):
+        if tendons[i] is not None:
+            front_side = tendons[i] > 0
+            length = JOINT_SHAFT_LENGTH + SHAFT_TO_PLATE * 2
+            add_tendon(
+                link,
+                length,
+                Placement(
+                    Vector(
+                        -length,
+                        PULLEY_RADIUS + TENDON_RADIUS if not front_side else -PULLEY_RADIUS - TENDON_RADIUS,
+                        JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 1) - JOINT_PULLEY_SPACING / 2,
+                    ),
+                    Rotation(0, 90, 0),
+                ),
+                abs(tendons[i]),
+            )
+
+
+def add_far_tension_pulleys(link, i: int, motor_index: int, direction: bool) -> None:
+    for j in range(0, 3, 2):
+        add_visual(link, "tackle-pulley", placement=Placement(
+            Vector(
+                -SHAFT_TO_PLATE - 7 / 2,
+                (-PULLEY_RADIUS - TENDON_RADIUS - 2.1 + (2.1 - 0.6) / 2) * direction,
+                JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 - j * direction + 1 + i),
+            ),
+            Rotation(0 if direction == 1 else 180, 0, 0),
+        ), rgba="0.3 0.2 0.6 1")
+        # Far side of block and tackle
+        for k in [-JOINT_PULLEY_SPACING / 2, JOINT_PULLEY_SPACING / 2]:
+            add_tendon(
+                link,
+                7 / 2 + SHAFT_TO_PLATE,
+                Placement(
+                    Vector(
+                        -SHAFT_TO_PLATE - 7 / 2,
+                        (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
+                        JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 - j * direction + 1 + i) + k,
+                    ),
+                    Rotation(0, 90, 0),
+                ),
+                motor_index,
+            )
+        add_visual(
+            link,
+            "tackle-pulley-tendon",
+            placement=Placement(
+                Vector(
+                    -SHAFT_TO_PLATE - 7 / 2,
+                    (-PULLEY_RADIUS - TENDON_RADIUS) * direction,
+                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (2 - j * direction + 1 + i),
+                ),
+                Rotation(0, 180, 0),
+            ),
+            name=f"tendon{motor_index}"
+        )
+
+
+@traced()
+def add_joint_tendons(
+    prev_link,
+    link1,
+    link2,
+    tendons: list[Optional[tuple[int, str]]],  # motor_index, type
+    bottom_pulley1: Optional[Placement] = None,
+    top_pulley1: Optional[Placement] = None,
+    bottom_pulley2: bool = False,
+    top_pulley2: bool = False,
+    direction_changing_pulleys: Optional[list[Optional[tuple[int, int, int]]]] = None,
+    placement=Placement(Vector(0, 0, 0), Rotation(0, 0, 0)),
+) -> None:
+    first_motor_index: Optional[int] = None
+    first_tendon_index: Optional[int] = None
+    last_motor_index: Optional[int] = None
+    last_tendon_index: Optional[int] = None
+    for i in range(len(tendons)):
+        if tendons[i] is not None:
+            motor_index = tendons[i][0]
+            if first_motor_index is None:
+                first_motor_index = motor_index
+                first_tendon_index = i
+            last_motor_index = motor_index
+            last_tendon_index = i
+            tendon_type = tendons[i][1]
+            if tendon_type in ["top", "bottom"]:
+                add_tendon(
+                    link1,
+                    SEGMENT_THICKNESS,
+                    Placement(
+                        Vector(
+                            0,
+                            (PULLEY_RADIUS + TENDON_RADIUS) * (1 if tendon_type != "top" else -1),
+                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
+                        ),
+                        Rotation(0, -90, 0),
+                    ),
+                    motor_index,
+                )
+            else:
+                angle_radians = asin((PULLEY_RADIUS + TENDON_RADIUS) / (SEGMENT_THICKNESS / 2))
+                angle_degrees = degrees(angle_radians)
+                offset_x = sin(angle_radians) * (PULLEY_RADIUS + TENDON_RADIUS)
+                offset_y = cos(angle_radians) * (PULLEY_RADIUS + TENDON_RADIUS)
+                add_tendon(
+                    link1,
+                    2 * sqrt((SEGMENT_THICKNESS / 2) ** 2 - (PULLEY_RADIUS + TENDON_RADIUS) ** 2),
+                    Placement(
+                        Vector(
+                            -offset_x,
+                            -offset_y if tendon_type == "falling" else offset_y,
+                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
+                        ),
+                        Rotation(0, -90, -angle_degrees if tendon_type == "falling" else angle_degrees),
+                    ),
+                    motor_index,
+                )
+            add_visual(link1, "wrap_joint_pulley_tendon", placement=Placement(
+                Vector(
+                    0,
+                    0,
+                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
+                ),
+                Rotation(0, 0, 0),
+            ), name=f"tendon{motor_index}")
+            add_visual(link2, "wrap_joint_pulley_tendon", placement=Placement(
+                Vector(
+                    0,
+                    0,
+                    JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 0.5),
+                ),
+                Rotation(0, 0, 0),
+            ), name=f"tendon{motor_index}")
+            add_visual(
+                link1,
+                "shaft-pulley",
+                placement=placement.multiply(
+                    Placement(
+                        Vector(0, 0, JOINT_GEAR_HEIGHT + i * JOINT_PULLEY_SPACING + (JOINT_PULLEY_SPACING - PULLEY_HEIGHT) / 2),
+                        Rotation(0, 0, 0),
+                    )
+                )
+            )
+            add_visual(
+                link2,
+                "shaft-pulley",
+                placement=placement.multiply(
+                    Placement(
+                        Vector(0, 0, JOINT_GEAR_HEIGHT + i * JOINT_PULLEY_SPACING + (JOINT_PULLEY_SPACING - PULLEY_HEIGHT) / 2),
+                        Rotation(0, 0, 0),
+                    )
+                )
+            )
+    if bottom_pulley1 is not None:
+        add_tension_pulleys(
+            prev_link,
+            first_motor_index,
+            bottom_pulley1.multiply(
+                Placement(
+                    Vector(
+                        0,
+                        0,
+                        JOINT_PULLEY_SPACING * first_tendon_index,
+                    ),
+                    Rotation(0, 0, 0),
+                )
+            ),
+            1,
+        )
+    if top_pulley1 is not None:
+        add_tension_pulleys(
+            prev_link,
+            last_motor_index,
+            top_pulley1.multiply(
+                Placement(
+                    Vector(
+                        0,
+                        0,
+                        JOINT_PULLEY_SPACING * last_tendon_index,
+                    ),
+                    Rotation(0, 0, 0),
+                )
+            ),
+            -1,
+        )
+    if bottom_pulley2:
+        add_far_tension_pulleys(link2, first_tendon_index, first_motor_index, 1)
+    if top_pulley2:
+        add_far_tension_pulleys(link2, last_tendon_index - 5, last_motor_index, -1)
+    if direction_changing_pulleys is not None:
+        for i in range(len(direction_changing_pulleys)):
+            if direction_changing_pulleys[i] is not None:
+                motor_index = abs(direction_changing_pulleys[i][2])
+                front_side = direction_changing_pulleys[i][2] > 0
+                src = direction_changing_pulleys[i][0]
+                dest = abs(direction_changing_pulleys[i][1])
+                inverted = direction_changing_pulleys[i][1] < 0
+                horizontal_tendon_length = JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT - dest * JOINT_PULLEY_SPACING + JOINT_PULLEY_SPACING / 2 + TENDON_RADIUS * 2
+                vertical_tendon_length = JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT - src * JOINT_PULLEY_SPACING + JOINT_PULLEY_SPACING / 2 + TENDON_RADIUS * 2
+                if inverted:
+                    vertical_tendon_length = JOINT_SHAFT_LENGTH - vertical_tendon_length + SEGMENT_THICKNESS / 2
+                add_visual(link2, "tackle-pulley", placement=Placement(
+                    Vector(
+                        -horizontal_tendon_length,
+                        PULLEY_RADIUS + TENDON_RADIUS + 2.1 - (2.1 - 0.6) / 2 if not front_side else -PULLEY_RADIUS - TENDON_RADIUS - 2.1 + (2.1 - 0.6) / 2,
+                        JOINT_GEAR_HEIGHT + (src + 1) * JOINT_PULLEY_SPACING - ((TACKLE_PULLEY_RADIUS + TENDON_RADIUS) * 2 if inverted else 0),
+                    ),
+                    Rotation(0, 0, 180 if not front_side else 0),
+                ), rgba="0.3 0.2 0.6 1")
+                add_visual(link2, "direction-changing-pulley-tendon", placement=Placement(
+                    Vector(
+                        -horizontal_tendon_length,
+                        -(PULLEY_RADIUS + TENDON_RADIUS) if front_side else (PULLEY_RADIUS + TENDON_RADIUS),
+                        JOINT_GEAR_HEIGHT + (src + 1) * JOINT_PULLEY_SPACING - ((TACKLE_PULLEY_RADIUS + TENDON_RADIUS) * 2 if inverted else 0),
+                    ),
+                    Rotation(0, 180 + (90 if inverted else 0), 0),
+                ), name=f"tendon{motor_index}")
+                # Horizontal tendon
+                add_tendon(
+                    link2,
+                    horizontal_tendon_length,
+                    Placement(
+                        Vector(
+                            0,
+                            PULLEY_RADIUS + TENDON_RADIUS if not front_side else -PULLEY_RADIUS - TENDON_RADIUS,
+                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (src + 1) - JOINT_PULLEY_SPACING / 2,
+                        ),
+                        Rotation(0, -90, 0),
+                    ),
+                    motor_index,
+                )
+                # Vertical tendon
+                add_tendon(
+                    link2,
+                    vertical_tendon_length,
+                    Placement(
+                        Vector(
+                            -horizontal_tendon_length - JOINT_PULLEY_SPACING / 2,
+                            PULLEY_RADIUS + TENDON_RADIUS if not front_side else -PULLEY_RADIUS - TENDON_RADIUS,
+                            JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (src + 1.5) - JOINT_PULLEY_SPACING / 2 - ((TACKLE_PULLEY_RADIUS + TENDON_RADIUS) * 2 if inverted else 0),
+                        ),
+                        Rotation(0, 180 if inverted else 0, 0),
+                    ),
+                    motor_index,
+                )
+
+
+# Motor index and routing past the joint pulleys of each tendon in the pulley
+# slots of every joint: "top" and "bottom" stay on one side of both pulleys,
+# "rising" and "falling" cross over between them
+JOINT_TENDONS: list[list[Optional[tuple[int, str]]]] = [
+    [
+        (0, "top"),
+        (0, "top"),
+        (0, "top"),
+        (0, "top"),
+        (1, "falling"),
+        (2, "falling"),
+        (3, "falling"),
+        (4, "rising"),
+        (5, "rising"),
+        (6, "rising"),
+        (7, "bottom"),
+        (7, "bottom"),
+        (7, "bottom"),
+        (7, "bottom"),
+    ],
+    [
+        None,
+        (4, "top"),
+        (4, "top"),
+        (4, "top"),
+        (4, "top"),
+        (5, "falling"),
+        (1, "rising"),
+        (2, "rising"),
+        (3, "rising"),
+        (6, "falling"),
+        (7, "bottom"),
+        (7, "bottom"),
+        (7, "bottom"),
+        (7, "bottom"),
+    ],
+    [
+        None,
+        (4, "top"),
+        (4, "top"),
+        (4, "top"),
+        (4, "top"),
+        (5, "rising"),
+        (1, "falling"),
+        (2, "falling"),
+        (3, "falling"),
+        (6, "bottom"),
+        (6, "bottom"),
+        (6, "bottom"),
+        (6, "bottom"),
+        None,
+    ],
+    [
+        None,
+        None,
+        (5, "top"),
+        (5, "top"),
+        (5, "top"),
+        (5, "top"),
+        (1, "rising"),
+        (2, "rising"),
+        (3, "bottom"),
+        (6, "bottom"),
+        (6, "bottom"),
+        (6, "bottom"),
+        (6, "bottom"),
+        None,
+    ],
+    [
+        None,
+        None,
+        (5, "top"),
+        (5, "top"),
+        (5, "top"),
+        (5, "top"),
+        (1, "top"),
+        (2, "top"),
+        (3, "bottom"),
+        (3, "bottom"),
+        (3, "bottom"),
+        (3, "bottom"),
+        None,
+        None,
+    ],
+    [
+        None,
+        None,
+        None,
+        None,
+        None,
+        None,
+        (1, "top"),
+        (2, "top"),
+        None,
+        (3, "bottom"),
+        (3, "bottom"),
+        (3, "bottom"),
+        (3, "bottom"),
+        None,
+    ],
+]
+
+
+@dataclass
+class ArmJoint:
+    """Revolute joint of the arm, each segment rolls over a joint and its mimic joint."""
+
+    name: str
+    parent: str
+    child: str
+
+    placement: Placement
+    """Origin in the parent link."""
+
+    axis: str
+
+    mimic: Optional[str] = None
+    """Joint followed with the same angle."""
+
+
+def arm_joints() -> list[ArmJoint]:
+    """Joints from the base to the last segment."""
+    joints = []
+    for i in range(len(SEGMENTS)):
+        segment = SEGMENTS[i]
+        joints.append(ArmJoint(
+            f"joint{i}a",
+            "base" if i == 0 else f"segment{i - 1}b",
+            f"segment{i}a",
+            INITIAL_PLACEMENT if i == 0 else segment.placement,
+            f"{segment.axis}",
+        ))
+        joints.append(ArmJoint(
+            f"joint{i}b",
+            f"segment{i}a",
+            f"segment{i}b",
+            Placement(
+                Vector(-SEGMENT_THICKNESS, 0, 0),
+                Rotation(0, 0, 0),
+            ),
+            f"{segment.axis}",
+            f"joint{i}a",
+        ))
+    return joints
+
+
+@traced()
+def make_urdf() -> ET.Element:
+    root = ET.Element("robot", {"name": "kiaukutas"})
+
+    define_material(root, "tendon0", 1, 0, 0)  # Red
+    define_material(root, "tendon1", 1, 165 / 255, 0)  # Orange
+    define_material(root, "tendon2", 1, 1, 0)  # Yellow
+    define_material(root, "tendon3", 0, 1, 0)  # Green
+    define_material(root, "tendon4", 0, 1, 1)  # Cyan
+    define_material(root, "tendon5", 0, 0, 1)  # Blue
+    define_material(root, "tendon6", 127 / 255, 0, 1)  # Violet
+    define_material(root, "tendon7", 165 / 255, 42 / 255, 42 / 255)  # Brown
+
+    base = ET.SubElement(root, "link", {"name": "base"})
+    # add_visual(base, "joint-gear-right", placement=Placement(
+    #     Vector(0, 0, 11.25 + JOINT_GEAR_HEIGHT),
+    #     Rotation(180, 0, 0),
+    # ), rgba="0 0 1 1")
+    # add_visual(base, "joint-gear-right", placement=Placement(
+    #     Vector(0, 0, 11.25 + JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
+    #     Rotation(0, 0, 0),
+    # ), rgba="0 0 1 1")
+    add_visual(base, "arm_to_body_joiner", placement=Placement(
+        Vector(SEGMENT_THICKNESS / 2, -PLATE_THICKNESS / 2, 11.25),
+        Rotation(0, 0, 0),
+    ), rgba="0.5 0.5 0.5 1")
+
+    add_visual(
+        base,
+        "jetson",
+        rgba="0.05 0.05 0.05 1",
+        placement=Placement(
+            Vector(15, 230, 155),
+            Rotation(-90, 0, -90),
+        ),
+        lod=None,
+    )
+
+    for i in range(NUMBER_OF_MOTORS // 2):
+        offset = 28.5 / 2 + SEGMENT_THICKNESS / 2 + PLATE_THICKNESS
+        add_visual(  # Bottom
+            base,
+            "XM430-W350-T",
+            f"{i * 30 + offset} {34 / 2 - 0.5 + PULLEY_HEIGHT / 2} {46.5 - 11.25 + i * JOINT_PULLEY_SPACING}",
+            f"{pi / 2} 0 0",
+            "0.05 0.05 0.05 1",
+        )
+        add_visual(  # Top
+            base,
+            "XM430-W350-T",
+            f"{i * 30 + offset} {34 / 2 + 0.5 + PULLEY_HEIGHT / 2 + PULLEY_RADIUS * 2} "
+            f"{46.5 + 11.25 + i * JOINT_PULLEY_SPACING + VERTICAL_GAP_BETWEEN_MOTORS}",
+            f"{pi / 2} {pi} 0",
+            "0.05 0.05 0.05 1",
+        )
+        add_visual(  # Bottom
+            base,
+            "winch",
+            f"{i * 30 + offset} {-PULLEY_RADIUS + PULLEY_HEIGHT / 2 + 3 - TENDON_RADIUS} "
+            f"{46.5 - 11.25 + i * JOINT_PULLEY_SPACING}",
+            f"{pi / 2} 0 0"
+        )
+        add_visual(  # Top
+            base,
+            "winch",
+            f"{i * 30 + offset} {PULLEY_RADIUS + PULLEY_HEIGHT / 2 + 3 + TENDON_RADIUS} "
+            f"{46.5 - 11.25 + (i + 4) * JOINT_PULLEY_SPACING}",
+            f"{pi / 2} 0 0"
+        )
+        add_tendon(  # Bottom
+            base,
+            i * 30 + offset,
+            Placement(
+                Vector(
+                    0,
+                    -PULLEY_RADIUS - TENDON_RADIUS,
+                    11.25 + JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 3.5),
+                ),
+                Rotation(0, 90, 0),
+            ),
+            i,
+        )
+        add_tendon(  # Top
+            base,
+            i * 30 + offset,
+            Placement(
+                Vector(
+                    0,
+                    PULLEY_RADIUS + TENDON_RADIUS,
+                    11.25 + JOINT_GEAR_HEIGHT + JOINT_PULLEY_SPACING * (i + 3.5 + 4),
+                ),
+                Rotation(0, 90, 0),
+            ),
+            i + 4,
+        )
+
+    placement = Placement(Vector(0, 0, 0), Rotation(0, 0, 0))
+    prev_link = base
+    for i in range(len(SEGMENTS)):
+        first_link = ET.SubElement(root, "link", {"name": f"segment{i}a"})
+        add_visual(first_link, "shaft", placement=placement, rgba="0 1 0 1")
+
+        link = ET.SubElement(root, "link", {"name": f"segment{i}b"})
+        add_visual(link, "shaft", placement=placement, rgba="1 0 0 1")
+        add_visual(link, "joint-gear-left", placement=Placement(
+            Vector(0, 0, JOINT_GEAR_HEIGHT),
+            Rotation(180, 0, 0),
+        ), rgba="0 1 1 1")
+        add_visual(link, "joint-gear-left", placement=Placement(
+            Vector(0, 0, JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
+            Rotation(0, 0, 0),
+        ), rgba="0 1 1 1")
+        add_visual(
+            link,
+            "segment-plate",
+            placement=placement.multiply(
+                Placement(
+                    Vector(-JOINT_SHAFT_LENGTH - SHAFT_TO_PLATE, 0, 0),
+                    Rotation(0, 0, 0),
+                )
+            ),
+            rgba="1 1 1 0.5",
+        )
+
+        match i:
+            case 0:
+                add_joint_tendons(
+                    prev_link,
+                    first_link,
+                    link,
+                    JOINT_TENDONS[i],
+                    Placement(Vector(0, 0, ARM_START_Z), Rotation(0, 0, 0)),
+                    Placement(Vector(0, 0, ARM_START_Z), Rotation(0, 0, 0)),
+                    True,
+                    False,
+                    [
+                        None,
+                        None,
+                        None,
+                        None,
+                        (7, 4, 4),
+                        (8, 5, 5),
+                        (4, 6, -1),
+                        (5, 7, -2),
+                        (6, 8, -3),
+                        (9, 9, 6),
+                        (10, 10, -7),
+                        (11, 11, -7),
+                        (12, 12, -7),
+                        (13, 13, -7)
+                    ],
+                )
+            case 1:
+                add_non_direction_changing_tendons(link, [
+                    None, 4, 4, 4, 4, -5, 1, 2, 3, -6, None, None, None, None
+                ])
+                add_joint_tendons(
+                    prev_link,
+                    first_link,
+                    link,
+                    JOINT_TENDONS[i],
+                    SEGMENTS[i].placement.multiply(
+                        Placement(
+                            Vector(
+                                0,
+                                0,
+                                0,  # JOINT_PULLEY_SPACING * (i + 1),
+                            ),
+                            Rotation(0, 0, 0),
+                        )
+                    ),
+                    None,
+                    False,
+                    True,
+                )
+            case 2:
+                add_non_direction_changing_tendons(link, [
+                    None, None, None, None, None, 5, -1, -2, -3, -6, -6, -6, -6, None
+                ])
+                add_joint_tendons(
+                    prev_link,
+                    first_link,
+                    link,
+                    JOINT_TENDONS[i],
+                    None,
+                    SEGMENTS[i].placement,
+                    True,
+                    False,
+                )
+            case 3:
+                add_joint_tendons(
+                    prev_link,
+                    first_link,
+                    link,
+                    JOINT_TENDONS[i],
+                    SEGMENTS[i].placement,
+                    None,
+                    False,
+                    True,
+                    [
+                        None,
+                        None,
+                        (2, 2, 5),
+                        (3, 3, 5),
+                        (4, 4, 5),
+                        (5, 5, 5),
+                        (6, 6, 1),
+                        (7, 7, 2),
+                        (8, 8, -3),
+                        None,
+                        None,
+                        None,
+                        None,
+                        None,
+                    ],
+                )
+            case 4:
+                add_joint_tendons(
+                    prev_link,
+                    first_link,
+                    link,
+                    JOINT_TENDONS[i],
+                    None,
+                    SEGMENTS[i].placement,
+                    True,
+                    False,
+                    [
+                        None,
+                        None,
+                        None,
+                        None,
+                        None,
+                        None,
+                        (8, -4, -3),
+                        (9, -3, -3),
+                        (10, -2, -3),
+                        (11, -1, -3),
+                        (6, -7, 1),
+                        (7, -6, 2),
+                        None,
+                        None,
+                    ],
+                )
+            case 5:
+                add_joint_tendons(
+                    prev_link,
+                    first_link,
+                    link,
+                    JOINT_TENDONS[i],
+                    None,
+                    None,  # SEGMENTS[i].placement,
+                    False,
+                    True,
+                    [],
+                )
+
+        if i != len(SEGMENTS) - 1:
+            add_visual(link, "joint-gear-right", placement=SEGMENTS[i + 1].placement.multiply(
+                Placement(
+                    Vector(0, 0, JOINT_GEAR_HEIGHT),
+                    Rotation(180, 0, 0),
+                ) if SEGMENTS[i + 1].placement.Rotation.Angle == 0 else Placement(
+                    Vector(0, 0, JOINT_GEAR_HEIGHT),
+                    Rotation(180, 180, 0),
+                )
+            ), rgba="1 0 1 1")
+            add_visual(link, "joint-gear-right", placement=SEGMENTS[i + 1].placement.multiply(
+                Placement(
+                    Vector(0, 0, JOINT_SHAFT_LENGTH - JOINT_GEAR_HEIGHT),
+                    Rotation(0, 0, 0),
+                )
+            ), rgba="1 0 1 1")
+        prev_link = link
+
+    for arm_joint in arm_joints():
+        joint = ET.SubElement(root, "joint", {"name": arm_joint.name, "type": "revolute"})
+        ET.SubElement(joint, "parent", {"link": arm_joint.parent})
+        ET.SubElement(joint, "child", {"link": arm_joint.child})
+        if arm_joint.mimic is not None:
+            ET.SubElement(joint, "mimic", {"joint": arm_joint.mimic})
+        ET.SubElement(joint, "axis", {"xyz": arm_joint.axis})
+        ET.SubElement(joint, "limit", {"lower": f"{-pi / 2}", "upper": f"{pi / 2}", "effort": "1", "velocity": "1"})
+        add_origin(joint, placement=arm_joint.placement)
+
+    return root
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(
+        prog="urdf.py",
+        description=f"Write {LAYOUT_URDF}, the robot layout before the build adds joint limits derived from "
+        "self-collisions, inertials and collision geometry, no FreeCAD required.",
+    )
+    parser.add_argument("dir", help="output directory")
+    args = parser.parse_args(args)
+    os.makedirs(args.dir, exist_ok=True)
+    root = make_urdf()
+    with span("serialize urdf"):
+        ET.ElementTree(root).write(f"{args.dir}/{LAYOUT_URDF}")
+    finish()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
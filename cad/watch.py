@@ -0,0 +1,157 @@
+"""
+Rebuild of the targets affected by edits, for the viewer opened with ?watch
+to reload what changed:
+
+    (cd cad && freecad -c watch.py ../dist [targets])
+
+Python files under cad and the vendor meshes are polled. After a change,
+every target gets a key from the source of its recipe and what it is built
+from: the builder and arguments of a part, the content of a vendor mesh or
+the generated URDF for the rest. Targets with changed keys and the targets
+built from them are built again. Edits of other modules than parts.py and
+urdf.py, layout.py included, rebuild all requested targets since keys don't
+cover everything reading them. All modules under cad are imported again
+for every rebuild. Files whose content changed are listed in changes.json
+in the output directory:
+
+    {"version": number of the last rebuild, "files": {file name: number of the rebuild changing it}}
+
+which the viewer polls. Like daemon.py, FreeCAD and the part builders stay
+loaded between rebuilds.
+"""
+from argparse import ArgumentParser
+from dataclasses import replace
+from glob import glob
+from hashlib import sha256
+import json
+import os
+import sys
+import time
+import traceback
+import types
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from cache import ArtifactCache, fingerprint  # noqa: E402
+from daemon import DIR, Daemon  # noqa: E402
+from targets import Target, script_args  # noqa: E402
+
+CHANGES = "changes.json"
+POLL_SECONDS = 0.5
+# Modules whose edits change only targets with changed keys
+INCREMENTAL_MODULES = {"parts", "urdf"}
+
+
+def target_keys(parts: types.ModuleType, targets: dict[str, Target]) -> dict[str, str]:
+    """Fingerprint of the recipe of every target and what it is built from, apart from its inputs."""
+    sources = {name: parts.part_key(builder, tuple(args)) for name, (builder, *args) in parts.PARTS.items()}
+    for file in parts.VENDOR_MESHES:
+        with open(file, "rb") as f:
+            sources[file.split(".")[0]] = sha256(f.read()).hexdigest()
+    urdf = sha256(ET.tostring(parts.make_urdf())).hexdigest()
+    keys = {}
+    for name, target in targets.items():
+        recipe = getattr(target.recipe, "func", target.recipe)
+        args = [arg for arg in getattr(target.recipe, "args", ()) if isinstance(arg, (str, int, float, tuple, list))]
+        keys[name] = fingerprint(recipe, *args, salt=sources.get(name.split(".")[0], urdf))
+    return keys
+
+
+def _digest(path: str) -> str:
+    with open(path, "rb") as f:
+        return sha256(f.read()).hexdigest()
+
+
+class Watcher(Daemon):
+    def __init__(self, dir: str, patterns: list[str]):
+        super().__init__()
+        self.dir = dir
+        self.patterns = patterns
+        self.keys: dict[str, str] = {}
+        self.digests: dict[str, str] = {}
+        import parts
+        self.vendor_meshes: list[str] = parts.VENDOR_MESHES
+        self.version = 0
+        # Number of the rebuild last changing a file by name
+        self.versions: dict[str, int] = {}
+
+    def stamps(self) -> dict[str, float]:
+        """Modification times of the watched files."""
+        files = [os.path.basename(path) for path in glob(f"{DIR}/*.py")] + self.vendor_meshes
+        return {file: os.path.getmtime(file) if os.path.exists(file) else None for file in files}
+
+    def rebuild(self, everything: bool) -> None:
+        start = time.perf_counter()
+        parts = self.load({})
+        from targets import build, dependents, resolve
+        self.vendor_meshes = parts.VENDOR_MESHES
+        cache = ArtifactCache()
+        targets = parts.make_targets(cache)
+        requested = resolve(targets, self.patterns)
+        keys = target_keys(parts, targets)
+        changed = {name for name in requested if everything or keys[name] != self.keys.get(name)}
+        affected = dependents(targets, changed)
+        names = [name for name in requested if name in affected]
+        self.evaluate_parts(parts, cache, targets, names)
+        # Unchanged inputs are already built
+        build({
+            name: replace(targets[name], inputs=[input for input in targets[name].inputs if input in affected])
+            for name in names
+        }, names, self.dir)
+        self.keys = keys
+        self.version += 1
+        changed_files = []
+        for name in names:
+            digest = _digest(f"{self.dir}/{name}")
+            if digest != self.digests.get(name):
+                self.digests[name] = digest
+                self.versions[name] = self.version
+                changed_files.append(name)
+        with open(f"{self.dir}/{CHANGES}.tmp", "w") as f:
+            json.dump({"version": self.version, "files": self.versions}, f)
+        os.replace(f"{self.dir}/{CHANGES}.tmp", f"{self.dir}/{CHANGES}")
+        print(f"Built {len(names)} targets in {time.perf_counter() - start:.1f} s, {len(changed_files)} files changed")
+
+    def watch(self) -> None:
+        everything = True
+        while True:
+            seen = self.stamps()
+            try:
+                self.rebuild(everything)
+                everything = False
+            except Exception:
+                traceback.print_exc()
+            while (stamps := self.stamps()) == seen:
+                time.sleep(POLL_SECONDS)
+            # Wait for editors to finish writing
+            while (settled := self.stamps()) != stamps:
+                stamps = settled
+                time.sleep(POLL_SECONDS)
+            edited = {file for file in stamps.keys() | seen.keys() if stamps.get(file) != seen.get(file)}
+            print(f"Changed: {' '.join(sorted(edited))}")
+            modules = {file.removesuffix(".py") for file in edited if file.endswith(".py")}
+            everything = everything or bool(modules - INCREMENTAL_MODULES)
+
+
+def main(args: list[str]) -> None:
+    parser = ArgumentParser(
+        prog="watch.py",
+        description="Rebuild robot parts and URDF affected by edits of cad sources and vendor meshes.",
+    )
+    parser.add_argument("dir", help="output directory")
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        default=["robot.urdf", "meshes.json"],
+        help="target names or glob patterns (default: robot.urdf meshes.json, what the viewer loads)",
+    )
+    args = parser.parse_args(args)
+    dir = os.path.abspath(args.dir)
+    # Recipes read files relative to cad
+    os.chdir(DIR)
+    Watcher(dir, args.targets).watch()
+
+
+if __name__ == "__main__":
+    main(script_args())
+    exit(0)
@@ -1,20 +1,174 @@
+#include <algorithm>
+#include <cctype>
+#include <cerrno>
+#include <charconv>
+#include <csignal>
+#include <cstdlib>
 #include <cstring>
 #include <arpa/inet.h>
 #include <fcntl.h>
+#include <fstream>
+#include <sstream>
+#include <strings.h>
+#include <sys/epoll.h>
 #include <sys/sendfile.h>
 #include <sys/socket.h>
 #include <sys/stat.h>
 #include <thread>
 #include <unistd.h>
+#include <utility>
+#include <vector>
 
 #include "http_server.hpp"
 #include "logger.hpp"
 
+namespace {
+
+const char kManifest[] = "dist/manifest.tsv";
+// Largest request header accepted and largest amount of buffered pipelined requests
+const std::size_t kMaxRequest = 8 * 1024;
+const std::size_t kMaxInput = 1024 * 1024;
+// Seconds an idle keep-alive connection stays open
+const time_t kIdleTimeout = 10;
+const unsigned kMaxWorkers = 8;
+const int kMaxEvents = 64;
+
+std::string_view trim(std::string_view text) {
+  std::size_t start = text.find_first_not_of(" \t");
+  if (start == std::string_view::npos) {
+    return {};
+  }
+  return text.substr(start, text.find_last_not_of(" \t") + 1 - start);
+}
+
+/**
+ * Value of a request header, empty if missing.
+ */
+std::string_view header(std::string_view request, std::string_view name) {
+  std::size_t start = request.find("\r\n");
+  while (start != std::string_view::npos) {
+    start += 2;
+    std::size_t end = request.find("\r\n", start);
+    if (end == std::string_view::npos || end == start) {
+      break;
+    }
+    std::string_view line = request.substr(start, end - start);
+    if (line.size() > name.size() && line[name.size()] == ':' &&
+        strncasecmp(line.data(), name.data(), name.size()) == 0) {
+      return trim(line.substr(name.size() + 1));
+    }
+    start = end;
+  }
+  return {};
+}
+
+/**
+ * Whether an Accept-Encoding header value allows a content coding.
+ */
+bool accepts(std::string_view codings, std::string_view coding) {
+  while (!codings.empty()) {
+    std::size_t comma = codings.find(',');
+    std::string_view item = codings.substr(0, comma);
+    codings = comma == std::string_view::npos ? std::string_view() : codings.substr(comma + 1);
+    std::size_t semicolon = item.find(';');
+    if (trim(item.substr(0, semicolon)) != coding) {
+      continue;
+    }
+    if (semicolon == std::string_view::npos) {
+      return true;
+    }
+    std::string_view parameter = trim(item.substr(semicolon + 1));
+    return !parameter.starts_with("q=") ||
+      std::strtod(std::string(parameter.substr(2)).c_str(), nullptr) > 0;
+  }
+  return false;
+}
+
+std::string mime_type(const std::string& file_name) {
+  if (file_name.ends_with(".html")) {
+    return "text/html";
+  } else if (file_name.ends_with(".js")) {
+    return "text/javascript";
+  } else if (file_name.ends_with(".css")) {
+    return "text/css";
+  } else if (file_name.ends_with(".svg")) {
+    return "image/svg+xml";
+  } else if (file_name.ends_with(".stl")) {
+    return "model/stl";
+  }
+  return "text/plain";
+}
+
+
+/**
+ * First and past the last byte of a single range of a Range header value
+ * for a file of size bytes. Returns 1 for a satisfiable range, 0 for ranges
+ * to ignore, like multiple or malformed ones, and -1 for unsatisfiable ones.
+ */
+int parse_range(std::string_view range, off_t size, off_t* start, off_t* end) {
+  if (!range.starts_with("bytes=") || range.find(',') != std::string_view::npos) {
+    return 0;
+  }
+  range = trim(range.substr(6));
+  std::size_t dash = range.find('-');
+  if (dash == std::string_view::npos) {
+    return 0;
+  }
+  std::string_view first = trim(range.substr(0, dash));
+  std::string_view last = trim(range.substr(dash + 1));
+  off_t from = 0;
+  off_t to = 0;
+  if (first.empty()) {  // Suffix of the given length
+    if (std::from_chars(last.data(), last.data() + last.size(), to).ec != std::errc() || to == 0) {
+      return to == 0 && !last.empty() ? -1 : 0;
+    }
+    *start = to < size ? size - to : 0;
+    *end = size;
+    return size > 0 ? 1 : -1;
+  }
+  if (std::from_chars(first.data(), first.data() + first.size(), from).ec != std::errc()) {
+    return 0;
+  }
+  to = size - 1;
+  if (!last.empty()) {
+    if (std::from_chars(last.data(), last.data() + last.size(), to).ec != std::errc() || to < from) {
+      return 0;
+    }
+  }
+  if (from >= size) {
+    return -1;
+  }
+  *start = from;
+  *end = std::min(to, size - 1) + 1;
+  return 1;
+}
+
+}  // namespace
+
+/**
+ * Client socket with its unparsed requests and the response being sent.
+ */
+struct Connection {
+  int fd;
+  std::string input;
+  std::string output;  // Response header not sent yet
+  std::size_t output_offset = 0;
+  std::shared_ptr<OpenFile> file;  // Response body not sent yet
+  off_t file_offset = 0;
+  off_t file_end = 0;
+  bool keep_alive = true;
+  time_t last_activity;
+};
+
+OpenFile::~OpenFile() {
+  close(fd);
+}
+
 HTTPServer::HTTPServer() {
 }
 
 void HTTPServer::serve(int port) {
-  int server_fd = socket(AF_INET, SOCK_STREAM, 0);
+  int server_fd = socket(AF_INET, SOCK_STREAM | SOCK_NONBLOCK | SOCK_CLOEXEC, 0);
   if (server_fd == -1) {
     throw std::runtime_error("Failed to create HTTP server socket");
   }
@@ -30,115 +184,390 @@ void HTTPServer::serve(int port) {
   if (bind(server_fd, (struct sockaddr*)&addr, sizeof(addr)) == -1) {
     throw std::runtime_error("Failed to bind HTTP server socket");
   }
-  if (listen(server_fd, 10) == -1) {
+  if (listen(server_fd, SOMAXCONN) == -1) {
     throw std::runtime_error("Failed to listen to HTTP server socket");
   }
-  logger::info("HTTP server started");
-  for ( ; ; ) {
-    struct sockaddr addr;
-    socklen_t addr_len = sizeof(addr);
-    int client_fd = accept(server_fd, &addr, &addr_len);
-    if (client_fd == -1) {
-      logger::last("Failed to accept connection on server socket %d", server_fd);
+  // Peers closing connections are handled where writes fail
+  signal(SIGPIPE, SIG_IGN);
+  load_manifest();
+  unsigned workers = std::clamp(std::thread::hardware_concurrency(), 1u, kMaxWorkers);
+  logger::info("HTTP server started with %d workers", workers);
+  std::vector<std::thread> threads;
+  for (unsigned i = 1; i < workers; i++) {
+    threads.emplace_back(&HTTPServer::event_loop, this, server_fd);
+  }
+  event_loop(server_fd);
+}
+
+void HTTPServer::load_manifest() {
+  struct stat manifest_stat;
+  if (stat(kManifest, &manifest_stat) == -1) {
+    return;
+  }
+  {
+    std::lock_guard<std::mutex> lock(assets_mutex);
+    if (manifest_stat.st_mtime == manifest_time) {
+      return;
+    }
+  }
+  std::unordered_map<std::string, Asset> loaded;
+  std::ifstream manifest(kManifest);
+  std::string line;
+  while (std::getline(manifest, line)) {
+    std::istringstream fields(line);
+    std::string path, gzip_size, brotli_size;
+    Asset asset;
+    if (std::getline(fields, path, '\t') && std::getline(fields, asset.hash, '\t') &&
+        fields >> asset.size && fields.ignore() && std::getline(fields, asset.mime, '\t') &&
+        std::getline(fields, gzip_size, '\t') && std::getline(fields, brotli_size)) {
+      asset.gzip_size = gzip_size == "-" ? -1 : std::stoll(gzip_size);
+      asset.brotli_size = brotli_size == "-" ? -1 : std::stoll(brotli_size);
+      loaded[path] = asset;
+    }
+  }
+  std::lock_guard<std::mutex> lock(assets_mutex);
+  assets.swap(loaded);
+  manifest_time = manifest_stat.st_mtime;
+  logger::info("Loaded manifest of %d assets", assets.size());
+}
+
+bool HTTPServer::find_asset(const std::string& path, Asset* asset) {
+  time_t written;
+  {
+    std::lock_guard<std::mutex> lock(assets_mutex);
+    auto found = assets.find(path);
+    if (found == assets.end()) {
+      return false;
+    }
+    *asset = found->second;
+    written = manifest_time;
+  }
+  struct stat file_stat;
+  if (stat(("dist" + path).c_str(), &file_stat) == -1) {
+    return false;
+  }
+  if (file_stat.st_size != asset->size || file_stat.st_mtime > written) {
+    logger::warn("File '%s' changed since the manifest was written", path.c_str());
+    return false;
+  }
+  return true;
+}
+
+std::shared_ptr<OpenFile> HTTPServer::open_file(const std::string& file_name) {
+  struct stat file_stat;
+  if (stat(file_name.c_str(), &file_stat) == -1) {
+    return nullptr;
+  }
+  std::lock_guard<std::mutex> lock(files_mutex);
+  auto found = files.find(file_name);
+  if (found != files.end() && found->second->inode == file_stat.st_ino &&
+      found->second->size == file_stat.st_size && found->second->mtime == file_stat.st_mtime) {
+    return found->second;
+  }
+  // Files replaced by a rebuild are opened again, responses still sending the old one keep it open
+  int fd = open(file_name.c_str(), O_RDONLY | O_CLOEXEC);
+  if (fd == -1) {
+    logger::last("Failed to open file '%s'", file_name.c_str());
+    return nullptr;
+  }
+  auto file = std::make_shared<OpenFile>();
+  file->fd = fd;
+  if (fstat(fd, &file_stat) == -1) {
+    logger::last("Failed to get size of file '%s'", file_name.c_str());
+    return nullptr;
+  }
+  file->size = file_stat.st_size;
+  file->inode = file_stat.st_ino;
+  file->mtime = file_stat.st_mtime;
+  files[file_name] = file;
+  return file;
+}
+
+void HTTPServer::respond(Connection* connection, std::string_view request) {
+  std::string_view request_line = request.substr(0, request.find("\r\n"));
+  std::size_t method_end = request_line.find(' ');
+  std::size_t target_end = request_line.find(' ', method_end + 1);
+  std::string_view connection_header = header(request, "Connection");
+  auto has_token = [connection_header](std::string_view token) {
+    return std::search(
+      connection_header.begin(), connection_header.end(), token.begin(), token.end(),
+      [](char a, char b) { return std::tolower(a) == b; }) != connection_header.end();
+  };
+  if (target_end == std::string_view::npos) {
+    connection->output = "HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n";
+    connection->keep_alive = false;
+    return;
+  }
+  std::string_view method = request_line.substr(0, method_end);
+  std::string_view target = request_line.substr(method_end + 1, target_end - method_end - 1);
+  connection->keep_alive = request_line.ends_with("HTTP/1.1") ? !has_token("close") : has_token("keep-alive");
+  std::string close_header = connection->keep_alive ? "" : "Connection: close\r\n";
+  logger::info(
+    "Request %s %s from client socket %d",
+    std::string(method).c_str(), std::string(target).c_str(), connection->fd);
+  if (method != "GET" && method != "HEAD") {
+    // The request body, if any, is not read so the connection can't be reused
+    connection->output =
+      "HTTP/1.1 405 Method Not Allowed\r\nAllow: GET, HEAD\r\nContent-Length: 0\r\nConnection: close\r\n\r\n";
+    connection->keep_alive = false;
+    return;
+  }
+  std::string path(target.substr(0, target.find('?')));
+  if (path == "/") {
+    path = "/index.html";
+  }
+  std::string mime = mime_type(path);
+  std::string headers = "Accept-Ranges: bytes\r\n";
+  std::string encoding;
+  std::string suffix;
+  off_t expected_size = -1;
+  std::string etag;
+  Asset asset;
+  std::string_view range = header(request, "Range");
+  std::string_view if_range = header(request, "If-Range");
+  // Ranges are of the uncompressed file, If-Range holds its validator
+  bool ranged = !range.empty() && if_range.empty();
+  if (path.find("..") == std::string::npos && find_asset(path, &asset)) {
+    // Every encoding is a representation of its own with its own strong validator
+    std::string identity_etag = "\"" + asset.hash + "\"";
+    std::pair<std::string, off_t> etags[] = {
+      {identity_etag, asset.size},
+      {"\"" + asset.hash + "-gz\"", asset.gzip_size},
+      {"\"" + asset.hash + "-br\"", asset.brotli_size},
+    };
+    ranged = !range.empty() && (if_range.empty() || if_range == identity_etag);
+    std::string_view codings = header(request, "Accept-Encoding");
+    if (ranged) {
+      expected_size = asset.size;
+    } else if (asset.brotli_size >= 0 && accepts(codings, "br")) {
+      encoding = "br";
+      suffix = ".br";
+      expected_size = asset.brotli_size;
+    } else if (asset.gzip_size >= 0 && accepts(codings, "gzip")) {
+      encoding = "gzip";
+      suffix = ".gz";
+      expected_size = asset.gzip_size;
     } else {
-      char host[INET6_ADDRSTRLEN];
-      struct sockaddr_in* addr_in = (struct sockaddr_in*)&addr;
-      inet_ntop(addr_in->sin_family, &addr_in->sin_addr, host, sizeof(host));
-      logger::info("%s connected", host);
-      std::thread accept_thread(&HTTPServer::client_handler, this, client_fd);
-      accept_thread.detach();
+      expected_size = asset.size;
+    }
+    etag = encoding == "br" ? etags[2].first : encoding == "gzip" ? etags[1].first : identity_etag;
+    mime = asset.mime;
+    // Clients revalidate every time, unchanged files cost a 304 without body
+    headers += "Cache-Control: no-cache\r\nVary: Accept-Encoding\r\n";
+    std::string_view match = header(request, "If-None-Match");
+    for (const auto& [candidate, size] : etags) {
+      if (match == "*" || (size >= 0 && match.find(candidate) != std::string_view::npos)) {
+        std::string matched = match == "*" ? etag : candidate;
+        connection->output =
+          "HTTP/1.1 304 Not Modified\r\nETag: " + matched + "\r\n" + headers + close_header + "\r\n";
+        return;
+      }
     }
+    headers += "ETag: " + etag + "\r\n";
+  }
+  std::shared_ptr<OpenFile> file;
+  if (path.find("..") == std::string::npos) {
+    file = open_file("dist" + path + suffix);
+    if (file && expected_size >= 0 && file->size != expected_size) {
+      // Changed since the manifest was written, serve it as is without validator
+      logger::warn("File '%s' doesn't match manifest", (path + suffix).c_str());
+      headers = "Accept-Ranges: bytes\r\n";
+      etag.clear();
+      encoding.clear();
+      ranged = !range.empty() && if_range.empty();
+      file = open_file("dist" + path);
+    }
+  }
+  if (!file) {
+    connection->output = "HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n" + close_header + "\r\n";
+    return;
+  }
+  if (!encoding.empty()) {
+    headers += "Content-Encoding: " + encoding + "\r\n";
+  }
+  std::string status = "200 OK";
+  off_t start = 0;
+  off_t end = file->size;
+  if (ranged) {
+    int parsed = parse_range(range, file->size, &start, &end);
+    if (parsed < 0) {
+      connection->output =
+        "HTTP/1.1 416 Range Not Satisfiable\r\nContent-Range: bytes */" + std::to_string(file->size) +
+        "\r\nContent-Length: 0\r\n" + headers + close_header + "\r\n";
+      return;
+    } else if (parsed > 0) {
+      status = "206 Partial Content";
+      headers += "Content-Range: bytes " + std::to_string(start) + "-" + std::to_string(end - 1) + "/" +
+        std::to_string(file->size) + "\r\n";
+    }
+  }
+  connection->output =
+    "HTTP/1.1 " + status + "\r\nContent-Type: " + mime + "\r\nContent-Length: " + std::to_string(end - start) +
+    "\r\n" + headers + close_header + "\r\n";
+  if (method == "GET" && end > start) {
+    connection->file = file;
+    connection->file_offset = start;
+    connection->file_end = end;
   }
 }
 
-void HTTPServer::client_handler(int fd) {
-  struct timeval timeout;
-  timeout.tv_sec = 5;
-  timeout.tv_usec = 0;
-  if (setsockopt (fd, SOL_SOCKET, SO_RCVTIMEO, &timeout, sizeof(timeout)) < 0) {
-    logger::last("Failed to set receive timeout for client socket %d", fd);
+bool HTTPServer::transmit(Connection* connection) {
+  while (connection->output_offset < connection->output.size()) {
+    // Hold back a partial packet while the body follows
+    int flags = MSG_NOSIGNAL | (connection->file ? MSG_MORE : 0);
+    ssize_t result = send(
+      connection->fd, connection->output.data() + connection->output_offset,
+      connection->output.size() - connection->output_offset, flags);
+    if (result == -1) {
+      if (errno == EAGAIN) {
+        return true;
+      }
+      logger::last("socket %d: failed send response header", connection->fd);
+      return false;
+    }
+    connection->output_offset += result;
   }
-  if (setsockopt (fd, SOL_SOCKET, SO_SNDTIMEO, &timeout, sizeof(timeout)) < 0) {
-    logger::last("Failed to set send timeout for client socket %d", fd);
+  connection->output.clear();
+  connection->output_offset = 0;
+  while (connection->file && connection->file_offset < connection->file_end) {
+    ssize_t result = sendfile(
+      connection->fd, connection->file->fd, &connection->file_offset,
+      connection->file_end - connection->file_offset);
+    if (result == -1) {
+      if (errno == EAGAIN) {
+        return true;
+      }
+      logger::last("socket %d: file %d: sendfile failed", connection->fd, connection->file->fd);
+      return false;
+    }
+    if (result == 0) {
+      logger::error("socket %d: file %d: truncated while sending", connection->fd, connection->file->fd);
+      return false;
+    }
   }
-  char buf[1024 * 4];
-  int len = 0;
+  connection->file.reset();
+  return true;
+}
+
+bool HTTPServer::handle(Connection* connection) {
+  char buf[1024 * 16];
   for ( ; ; ) {
-    ssize_t result = read(fd, &buf[len], sizeof(buf) - len);
-    if (result < 0) {
-      logger::last("Failed to read from client socket %d", fd);
-      break;
+    ssize_t result = read(connection->fd, buf, sizeof(buf));
+    if (result == -1) {
+      if (errno == EAGAIN) {
+        break;
+      }
+      logger::last("Failed to read from client socket %d", connection->fd);
+      return false;
     }
-    len += result;
-    const std::string_view request(buf, len);
-    if (request.starts_with("GET ") && request.find("\r") != std::string_view::npos) {
-      std::size_t end = request.find(" ", 4);
-      if (end != std::string_view::npos) {
-        const std::string_view path = request.substr(4, end - 4);
-        logger::info("Request for path %s from client socket %d", std::string(path).c_str(), fd);
-        std::string file_name = "dist/index.html";
-        if (path != "/") {
-          file_name = "dist" + std::string(path);
-        }
-        std::string mime = "text/plain";
-        if (file_name.ends_with(".html")) {
-          mime = "text/html";
-        } else if (file_name.ends_with(".js")) {
-          mime = "text/javascript";
-        } else if (file_name.ends_with(".css")) {
-          mime = "text/css";
-        } else if (file_name.ends_with(".svg")) {
-          mime = "image/svg+xml";
-        } else if (file_name.ends_with(".stl")) {
-          mime = "model/stl";
-        }
-        result = snprintf(buf, sizeof(buf),
-          "HTTP/1.1 200 OK\r\nContent-Type: %s\r\n\r\n",
-          mime.c_str());
-        if (result < 0 || result > sizeof(buf)) {
-          logger::last("socket %d: failed generate response header", fd);
-          break;
-        }
-        result = write(fd, buf, result);
-        if (result < 0) {
-          logger::last("socket %d: failed send response header", fd);
-          break;
-        }
-        // TODO: check if all data was send
-
-        int file = open(file_name.c_str(), O_RDONLY);
-        if (file == -1) {
-          logger::last(
-            "socket %d: failed to open file '%s'",
-            fd, file_name.c_str());
-          break;
-        }
-        struct stat file_stat;
-        if (fstat(file, &file_stat) == -1) {
-          logger::last(
-            "socket %d: failed to get size of file '%s'",
-            fd, file_name.c_str());
-          break;
-        }
-        off_t offset = 0;
+    if (result == 0) {
+      return false;
+    }
+    connection->input.append(buf, result);
+    if (connection->input.size() > kMaxInput) {
+      logger::error("Too many pipelined requests from client socket %d", connection->fd);
+      return false;
+    }
+  }
+  for ( ; ; ) {
+    if (!transmit(connection)) {
+      return false;
+    }
+    if (!connection->output.empty() || connection->file) {
+      return true;  // Continue when the socket is writable again
+    }
+    if (!connection->keep_alive) {
+      return false;
+    }
+    std::size_t end = connection->input.find("\r\n\r\n");
+    if (end == std::string::npos) {
+      if (connection->input.size() > kMaxRequest) {
+        logger::error("HTTP request > %d for client socket %d", kMaxRequest, connection->fd);
+        return false;
+      }
+      return true;
+    }
+    respond(connection, std::string_view(connection->input).substr(0, end + 4));
+    connection->input.erase(0, end + 4);
+  }
+}
+
+void HTTPServer::event_loop(int server_fd) {
+  int epoll_fd = epoll_create1(EPOLL_CLOEXEC);
+  if (epoll_fd == -1) {
+    throw std::runtime_error("Failed to create epoll instance for HTTP server");
+  }
+  // Only one of the workers is woken up for each new connection
+  struct epoll_event event;
+  event.events = EPOLLIN | EPOLLEXCLUSIVE;
+  event.data.fd = server_fd;
+  if (epoll_ctl(epoll_fd, EPOLL_CTL_ADD, server_fd, &event) == -1) {
+    throw std::runtime_error("Failed to watch HTTP server socket");
+  }
+  std::unordered_map<int, Connection> connections;
+  auto disconnect = [&connections, epoll_fd](int fd) {
+    epoll_ctl(epoll_fd, EPOLL_CTL_DEL, fd, nullptr);
+    close(fd);
+    connections.erase(fd);
+  };
+  time_t swept = time(nullptr);
+  struct epoll_event events[kMaxEvents];
+  for ( ; ; ) {
+    int count = epoll_wait(epoll_fd, events, kMaxEvents, 1000);
+    if (count == -1 && errno != EINTR) {
+      logger::last("epoll_wait failed for HTTP server");
+    }
+    time_t now = time(nullptr);
+    for (int i = 0; i < count; i++) {
+      if (events[i].data.fd == server_fd) {
         for ( ; ; ) {
-          result = sendfile(fd, file, &offset, file_stat.st_size - offset);
-          if (result == -1) {
-            logger::last("socket %d: file %d: sendfile failed", fd, file);
+          struct sockaddr addr;
+          socklen_t addr_len = sizeof(addr);
+          int client_fd = accept4(server_fd, &addr, &addr_len, SOCK_NONBLOCK | SOCK_CLOEXEC);
+          if (client_fd == -1) {
+            if (errno != EAGAIN) {
+              logger::last("Failed to accept connection on server socket %d", server_fd);
+            }
             break;
           }
-          if (offset == file_stat.st_size) {
-            break;
+          char host[INET6_ADDRSTRLEN];
+          struct sockaddr_in* addr_in = (struct sockaddr_in*)&addr;
+          inet_ntop(addr_in->sin_family, &addr_in->sin_addr, host, sizeof(host));
+          logger::info("%s connected", host);
+          event.events = EPOLLIN | EPOLLOUT | EPOLLRDHUP | EPOLLET;
+          event.data.fd = client_fd;
+          if (epoll_ctl(epoll_fd, EPOLL_CTL_ADD, client_fd, &event) == -1) {
+            logger::last("Failed to watch client socket %d", client_fd);
+            close(client_fd);
+            continue;
           }
+          Connection& connection = connections[client_fd];
+          connection.fd = client_fd;
+          connection.last_activity = now;
         }
-        close(file);
-        break;
+        continue;
+      }
+      auto found = connections.find(events[i].data.fd);
+      if (found == connections.end()) {
+        continue;
+      }
+      found->second.last_activity = now;
+      if ((events[i].events & EPOLLERR) || !handle(&found->second)) {
+        disconnect(found->first);
       }
     }
-    if (len == sizeof(buf)) {
-      logger::error("HTTP request > %d for client socket %d", sizeof(buf), fd);
-      break;
+    if (now != swept) {
+      swept = now;
+      load_manifest();
+      std::vector<int> idle;
+      for (auto& [fd, connection] : connections) {
+        if (now - connection.last_activity > kIdleTimeout) {
+          idle.push_back(fd);
+        }
+      }
+      for (int fd : idle) {
+        disconnect(fd);
+      }
     }
   }
-  close(fd);
 }
@@ -1,12 +1,61 @@
 #ifndef SRC_HTTP_SERVER_HPP_
 #define SRC_HTTP_SERVER_HPP_
 
+#include <sys/types.h>
+
+#include <ctime>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+
+/**
+ * File listed in dist/manifest.tsv written by cad/compress.py.
+ */
+struct Asset {
+  std::string hash;
+  std::string mime;
+  off_t size;
+  off_t gzip_size;  // -1 without gzip compressed copy
+  off_t brotli_size;  // -1 without brotli compressed copy
+};
+
+/**
+ * File kept open for responses, closed when the last one using it is done.
+ */
+struct OpenFile {
+  int fd;
+  off_t size;
+  ino_t inode;
+  time_t mtime;
+  ~OpenFile();
+};
+
+struct Connection;
+
+/**
+ * Serves files from dist over HTTP/1.1 with keep-alive and pipelining. A
+ * fixed number of worker threads each run an epoll loop over non-blocking
+ * sockets, accepting from the shared listening socket.
+ */
 class HTTPServer {
  public:
   HTTPServer();
   void serve(int port);
  private:
-  void client_handler(int fd);
+  std::mutex assets_mutex;
+  std::unordered_map<std::string, Asset> assets;
+  time_t manifest_time = 0;
+  std::mutex files_mutex;
+  std::unordered_map<std::string, std::shared_ptr<OpenFile>> files;
+  void load_manifest();
+  bool find_asset(const std::string& path, Asset* asset);
+  std::shared_ptr<OpenFile> open_file(const std::string& file_name);
+  void respond(Connection* connection, std::string_view request);
+  bool transmit(Connection* connection);
+  bool handle(Connection* connection);
+  void event_loop(int server_fd);
 };
 
 #endif  // SRC_HTTP_SERVER_HPP_
@@ -1,6 +1,7 @@
 import * as THREE from 'https://esm.sh/three@0.164.1'
 import { OrbitControls } from 'https://esm.sh/three@0.164.1/addons/controls/OrbitControls.js'
 import { STLLoader } from 'https://esm.sh/three@0.164.1/addons/loaders/STLLoader.js'
+import { GLTFLoader } from 'https://esm.sh/three@0.164.1/addons/loaders/GLTFLoader.js'
 import URDFLoader from 'https://esm.sh/urdf-loader@0.12.1'
 
 const scene = new THREE.Scene()
@@ -51,30 +52,90 @@ const meshes = []
 const stls = new Map()
 
 const stl2mesh = (stl) => {
-  const mesh = new THREE.Mesh(stl, new THREE.MeshPhongMaterial())
+  const mesh = new THREE.Mesh(stl.geometry, new THREE.MeshPhongMaterial())
   meshes.push(mesh)
+  stl.meshes.push(mesh)
   return mesh
 }
 
+// Compact variants of STL files produced by cad/kmesh.py, see meshes.json
+let compactMeshes = {}
+
+const decodeOctahedral = (x, y) => {
+  x = Math.max(x / 127, -1)
+  y = Math.max(y / 127, -1)
+  const z = 1 - Math.abs(x) - Math.abs(y)
+  if (z < 0) {
+    [x, y] = [(1 - Math.abs(y)) * Math.sign(x || 1), (1 - Math.abs(x)) * Math.sign(y || 1)]
+  }
+  const length = Math.hypot(x, y, z)
+  return [x / length, y / length, z / length]
+}
+
+const parseKmesh = (buffer) => {
+  const view = new DataView(buffer)
+  const indexSize = view.getUint16(6, true)
+  const vertexCount = view.getUint32(8, true)
+  const indexCount = view.getUint32(12, true)
+  const min = [0, 1, 2].map(i => view.getFloat32(16 + i * 4, true))
+  const extent = [0, 1, 2].map(i => (view.getFloat32(28 + i * 4, true) - min[i]) || 1)
+  let offset = 40
+  const quantized = new Uint16Array(buffer, offset, vertexCount * 3)
+  offset += quantized.byteLength
+  const octahedral = new Int8Array(buffer, offset, vertexCount * 2)
+  offset += octahedral.byteLength
+  offset += (4 - offset % 4) % 4
+  const indices = indexSize === 2
+    ? new Uint16Array(buffer, offset, indexCount)
+    : new Uint32Array(buffer, offset, indexCount)
+  const positions = new Float32Array(vertexCount * 3)
+  const normals = new Float32Array(vertexCount * 3)
+  for (let i = 0; i < vertexCount; i++) {
+    for (let j = 0; j < 3; j++) {
+      positions[i * 3 + j] = min[j] + quantized[i * 3 + j] / 0xffff * extent[j]
+    }
+    normals.set(decodeOctahedral(octahedral[i * 2], octahedral[i * 2 + 1]), i * 3)
+  }
+  const geometry = new THREE.BufferGeometry()
+  geometry.setAttribute('position', new THREE.BufferAttribute(positions, 3))
+  geometry.setAttribute('normal', new THREE.BufferAttribute(normals, 3))
+  geometry.setIndex(new THREE.BufferAttribute(indices, 1))
+  return geometry
+}
+
+const loadGeometry = (path, manager, onLoad, query = '') => {
+  const compact = compactMeshes[path.split('/').pop()]
+  if (compact === undefined) {
+    new STLLoader(manager).load(path + query, onLoad)
+  } else {
+    new THREE.FileLoader(manager)
+      .setResponseType('arraybuffer')
+      .load(path.replace(/[^/]*$/, compact.kmesh) + query, buffer => onLoad(parseKmesh(buffer)))
+  }
+}
+
 loader.loadMeshCb = (path, manager, onComplete) => {
   if (stls.has(path)) {
     const stl = stls.get(path)
     if (stl.geometry != null) {
-      onComplete(stl2mesh(stl.geometry))
+      onComplete(stl2mesh(stl))
     } else {
       stl.onLoadCallbacks.push(onComplete)
     }
   } else {
     const stl = {
       geometry: null,
-      onLoadCallbacks: [onComplete]
+      onLoadCallbacks: [onComplete],
+      meshes: []
     }
     stls.set(path, stl)
-    new STLLoader(manager).load(
+    loadGeometry(
       path,
+      manager,
       result => {
+        stl.geometry = result
         for (const callback of stl.onLoadCallbacks) {
-          callback(stl2mesh(result))
+          callback(stl2mesh(stl))
         }
       }
     )
@@ -83,13 +144,117 @@ loader.loadMeshCb = (path, manager, onComplete) => {
 
 let robot = null
 
-loader.load(
-  'robot.urdf',
-  r => {
+// Articulate joint nodes of a scene produced by cad/gltf.py like URDFRobot
+const loadGlb = (path) => {
+  new GLTFLoader(manager).load(path, gltf => {
+    const joints = []
+    gltf.scene.traverse(node => {
+      if (node.userData.axis !== undefined) {
+        node.userData.origin = node.quaternion.clone()
+        joints.push(node)
+      }
+      if (node.isMesh) {
+        meshes.push(node)
+      }
+    })
+    const rotation = new THREE.Quaternion()
+    const axis = new THREE.Vector3()
+    gltf.scene.setJointValue = (name, value) => {
+      for (const joint of joints) {
+        const { mimic, multiplier, offset, origin } = joint.userData
+        if (joint.name === name || mimic === name) {
+          const angle = joint.name === name ? value : value * multiplier + offset
+          rotation.setFromAxisAngle(axis.fromArray(joint.userData.axis), angle)
+          joint.quaternion.copy(origin).multiply(rotation)
+        }
+      }
+    }
+    robot = gltf.scene
+    scene.add(robot)
+  })
+}
+
+const loadManifest = (query = '') => fetch('meshes.json' + query)
+  .then(response => response.ok ? response.json() : {})
+  .catch(() => ({}))
+  .then(manifest => {
+    compactMeshes = manifest
+  })
+
+const loadUrdf = (path) => {
+  loader.load(path, r => {
     robot = r
     scene.add(robot)
+  })
+}
+
+const params = new URLSearchParams(window.location.search)
+const glbPath = params.get('glb') || 'robot.glb'
+const urdfPath = params.get('urdf') ?? 'robot.urdf'
+if (params.has('glb')) {
+  loadGlb(glbPath)
+} else {
+  loadManifest().then(() => loadUrdf(urdfPath))
+}
+
+// Files rebuilt by cad/watch.py are listed in changes.json with the number of the rebuild
+const reload = (files, version) => {
+  const query = `?v=${version}`
+  const name = path => path.split('/').pop()
+  if (params.has('glb')) {
+    if (files.has(name(glbPath))) {
+      scene.remove(robot)
+      meshes.length = 0
+      loadGlb(glbPath + query)
+    }
+    return
   }
-)
+  const manifest = files.has('meshes.json') ? loadManifest(query) : Promise.resolve()
+  manifest.then(() => {
+    const changed = [...stls.keys()].filter(path => files.has(name(path)) || files.has(compactMeshes[name(path)]?.kmesh))
+    if (files.has(name(urdfPath))) {
+      for (const path of changed) {
+        stls.delete(path)
+      }
+      scene.remove(robot)
+      meshes.length = 0
+      for (const stl of stls.values()) {
+        stl.meshes.length = 0
+      }
+      loadUrdf(urdfPath + query)
+      return
+    }
+    for (const path of changed) {
+      const stl = stls.get(path)
+      loadGeometry(path, manager, geometry => {
+        stl.geometry.dispose()
+        stl.geometry = geometry
+        for (const mesh of stl.meshes) {
+          mesh.geometry = geometry
+        }
+      }, query)
+    }
+  })
+}
+
+if (params.has('watch')) {
+  let version = null
+  setInterval(() => {
+    fetch('changes.json', { cache: 'no-store' })
+      .then(response => response.ok ? response.json() : null)
+      .catch(() => null)
+      .then(changes => {
+        if (changes === null || changes.version === version) {
+          return
+        }
+        if (version !== null) {
+          const files = Object.keys(changes.files).filter(file => changes.files[file] > version)
+          reload(new Set(files), changes.version)
+        }
+        version = changes.version
+      })
+  }, 1000)
+}
 
 let angle = 0
 const maxAngle = Math.PI / 2